@@ -1,21 +1,44 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import logging
+import multiprocessing
+import os
+import time
+import traceback
 import unittest
 import importlib
-import time
 from tests.test_general import GeneralGraphTestCase
 from dipper.utils.TestUtils import TestUtils
 from dipper.utils.GraphUtils import GraphUtils
+from dipper.utils.RunMetrics import RunMetrics
+from dipper.utils.Checkpoint import Checkpoint
+from dipper.utils import compression
+from dipper.utils import property_cache
+from dipper.graph.StreamedGraph import StreamedGraph
+from dipper.sources.Source import Source
 
 logging.basicConfig()
 
+logger = logging.getLogger(__name__)
+
 requests_log = logging.getLogger("requests.packages.urllib3")
 requests_log.setLevel(logging.ERROR)
 
 test_suite = unittest.TestLoader().loadTestsFromTestCase(GeneralGraphTestCase)
 
+# seconds each source took on its last --jobs run, to start the longest first
+DURATIONS_FILE = 'out/source_durations.json'
+# started first until they have a recorded duration
+LONG_SOURCES = ['panther', 'omim', 'mgi', 'zfin', 'clinvar']
+# semaphores shared by --jobs workers, hosts hashed onto them
+HOST_SLOTS = 64
+# options recorded in a source's build state, a change means a rebuild
+BUILD_OPTIONS = [
+    'graph', 'limit', 'use_bnodes', 'taxon', 'dest_fmt', 'compress',
+    'compress_level', 'shards', 'version']
+
 
 def main():
     # TODO this should be generated by looking in the dipper/sources directory
@@ -66,14 +89,12 @@ def main():
         'ebi': 'EBIGene2Phen',
     }
 
-    logger = logging.getLogger(__name__)
-
     parser = argparse.ArgumentParser(
         description='Dipper: Data Ingestion Pipeline for SciGraph',
         formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument(
         '-g', '--graph', type=str, default="rdf_graph",
-        help='graph type: rdf_graph, streamed_graph')
+        help='graph type: rdf_graph, streamed_graph, compact_graph')
     parser.add_argument(
         '-s', '--sources', type=str, required=True,
         help='comma separated list of sources')
@@ -128,6 +149,83 @@ def main():
         help='serialization format: [turtle], nt, nquads, rdfxml, n3, raw',
         type=str)
 
+    parser.add_argument(
+        '--write_workers', type=int, default=1,
+        help='number of processes formatting nt output in parallel')
+
+    parser.add_argument(
+        '--compress', type=str, nargs='?', const='auto',
+        choices=['auto', 'gzip', 'zstd'],
+        help='compress output files; zstd when the zstandard module\n'
+        'is installed, otherwise gzip (default auto)')
+    parser.add_argument(
+        '--compress_level', type=int,
+        help='compression level (defaults gzip: 6, zstd: 3)')
+    parser.add_argument(
+        '--compress_block_size', type=int,
+        help='bytes handed to the compressor at a time (default 1MiB)')
+
+    parser.add_argument(
+        '--gunzip', type=str,
+        help='program writing a decompressed gzip input to stdout,\n'
+        'e.g. "pigz -dc", instead of decompressing in process')
+
+    parser.add_argument(
+        '--refresh_property_cache', action='store_true',
+        help='re-read the ontologies in the cached property axioms')
+
+    parser.add_argument(
+        '--fetch_workers', type=int,
+        help='files, or postgres tables, to download at once\n'
+        '(default: {})'.format(Source.fetch_workers))
+
+    parser.add_argument(
+        '--range_workers', type=int,
+        help='parallel range requests for each large file\n'
+        'from servers that accept them (default: 1)')
+
+    parser.add_argument(
+        '--force_parse', action='store_true',
+        help='parse and write sources even when their inputs, code,\n'
+        'translation tables and options are those of the last output')
+
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='carry on the parse of a source that saves its stages\n'
+        '(Panther, OMIM, MGI) from the last one it finished')
+
+    parser.add_argument(
+        '--fetch_mode', choices=['record', 'replay'],
+        help='record: save every fetched file in --fixture_dir\n'
+        'replay: fetch from those recordings, without network access')
+
+    parser.add_argument(
+        '--fixture_dir',
+        help='recorded files for --fetch_mode (default: {})'.format(
+            Source.fixture_dir))
+
+    parser.add_argument(
+        '--shards', type=int,
+        help='split output into this many nt files by subject\n'
+        'and write a <source>_manifest.json listing them')
+
+    parser.add_argument(
+        '--sort_buffer', type=int,
+        help='streamed_graph: number of triples sorted in memory\n'
+        'before spilling a run to disk while removing duplicates')
+
+    parser.add_argument(
+        '--jobs', type=int,
+        help='run this many sources at once, each in its own process,\n'
+        'longest first; downloads stay limited per host across them')
+
+    parser.add_argument(
+        '--profile', nargs='?', const='metrics',
+        choices=['metrics', 'cprofile'],
+        help='write time, memory, rows and triples per phase and per\n'
+        '_process_* method to out/<source>_metrics.json;\n'
+        'cprofile: also dump out/<source>_<phase>.pstats')
+
     parser.add_argument(
         '--version', '-v',
         help='version of source',
@@ -150,13 +248,7 @@ def main():
         'notation3', 'n3',
         'raw']
 
-    if args.quiet:
-        logging.getLogger().setLevel(logging.WARNING)
-    else:
-        if args.debug:
-            logging.getLogger().setLevel(logging.DEBUG)
-        else:
-            logging.getLogger().setLevel(logging.INFO)
+    configure(args)
 
     if not args.use_bnodes:
         logger.info("Will Skolemize Blank Nodes")
@@ -203,82 +295,280 @@ def main():
     else:
         args.dest_fmt = 'turtle'
 
+    if args.graph == 'compact_graph' and args.dest_fmt not in ['turtle', 'nt']:
+        logger.error(
+            "compact_graph can only be serialized as turtle or nt, not %s",
+            args.dest_fmt)
+        exit(0)
+
+    if args.refresh_property_cache:
+        property_cache.get_properties(refresh=True)
+
+    sources = [source.lower() for source in args.sources.split(',')]
+    if args.jobs is not None and args.jobs > 1:
+        run_jobs(sources, args, source_to_class_map, taxa_supported, tax_ids)
+        return
+
     # iterate through all the sources
-    for source in args.sources.split(','):
+    for source in sources:
         logger.info("\n******* %s *******", source)
-        source = source.lower()
         src = source_to_class_map[source]
+        run_source(source, src, args, src in taxa_supported, tax_ids)
+        logger.info('***** Finished with %s *****', source)
+    # load configuration parameters
+    # for example, keys
 
-        # import source lib
-        module = "dipper.sources.{0}".format(src)
-        imported_module = importlib.import_module(module)
-        source_class = getattr(imported_module, src)
-        mysource = None
-        # arg factory
-        source_args = dict(
-            graph_type=args.graph
-        )
-        source_args['are_bnodes_skolemized'] = not args.use_bnodes
-        if src in taxa_supported:
-            source_args['tax_ids'] = tax_ids
-        if args.version:
-            source_args['version'] = args.version
-
-        mysource = source_class(**source_args)
-        if args.parse_only is False:
-            start_fetch = time.clock()
-            mysource.fetch(args.force)
-            end_fetch = time.clock()
-            logger.info("Fetching time: %d sec", end_fetch-start_fetch)
-
-        mysource.settestonly(args.test_only)
-
-        # run tests first
-        if (args.no_verify or args.skip_tests) is not True:
-            suite = mysource.getTestSuite()
-            if suite is None:
-                logger.warning(
-                    "No tests configured for this source: %s", source)
-            else:
-                unittest.TextTestRunner(verbosity=2).run(suite)
+    Source.ftp_pool.close()
+    logger.info("All done.")
+
+
+def configure(args, host_slots=None):
+    """
+    Set the class wide options given on the command line,
+    in this process or in a --jobs worker
+    :param args: parsed arguments
+    :param host_slots: list of semaphores shared by the workers,
+                       see Source.host_slots
+    """
+    if args.quiet:
+        logging.getLogger().setLevel(logging.WARNING)
+    else:
+        if args.debug:
+            logging.getLogger().setLevel(logging.DEBUG)
         else:
-            logger.info("Skipping Tests for source: %s", source)
+            logging.getLogger().setLevel(logging.INFO)
 
-        if args.test_only is False and args.fetch_only is False:
-            start_parse = time.clock()
+    if args.sort_buffer is not None:
+        StreamedGraph.sort_buffer = args.sort_buffer
+
+    if args.gunzip is not None:
+        compression.GUNZIP_COMMAND = args.gunzip.split()
+
+    if args.fetch_workers is not None:
+        Source.fetch_workers = args.fetch_workers
+    if args.range_workers is not None:
+        Source.range_workers = args.range_workers
+    Source.fetch_mode = args.fetch_mode
+    if args.fixture_dir is not None:
+        Source.fixture_dir = args.fixture_dir
+
+    if host_slots is not None:
+        Source.host_slots = host_slots
+        # tell the workers' interleaved logs apart
+        for handler in logging.getLogger().handlers:
+            handler.setFormatter(logging.Formatter(
+                '%(processName)s %(levelname)s:%(name)s:%(message)s'))
+
+
+def run_source(source, src, args, taxa_supported, tax_ids):
+    """
+    fetch, test, parse and write one source
+    :param source: str name given to --sources
+    :param src: str class name of the source
+    :param args: parsed arguments
+    :param taxa_supported: bool, the source takes tax_ids
+    :param tax_ids: list of int
+    :return: 'skipped' when its output is up to date, else 'done'
+    """
+    # import source lib
+    module = "dipper.sources.{0}".format(src)
+    imported_module = importlib.import_module(module)
+    source_class = getattr(imported_module, src)
+    mysource = None
+    # arg factory
+    source_args = dict(
+        graph_type=args.graph
+    )
+    source_args['are_bnodes_skolemized'] = not args.use_bnodes
+    if taxa_supported:
+        source_args['tax_ids'] = tax_ids
+    if args.version:
+        source_args['version'] = args.version
+
+    mysource = source_class(**source_args)
+    metrics = RunMetrics(
+        mysource, mysource.outdir if args.profile == 'cprofile' else None)
+    if args.profile is not None:
+        metrics.instrument()
+    if args.parse_only is False:
+        # wall clock, downloads run in threads
+        with metrics.phase('fetch') as fetch:
+            mysource.fetch(args.force)
+        fetch['files'] = mysource.fetched_files
+        fetch['fetched_bytes'] = mysource.fetched_bytes
+        logger.info(
+            "Fetching time: %d sec, %d files (%.2f MB/s)",
+            fetch['wall'], mysource.fetched_files,
+            mysource.fetched_bytes / 2**20 / max(fetch['wall'], 1e-6))
+
+    options = {name: getattr(args, name) for name in BUILD_OPTIONS}
+    if args.test_only is False and args.fetch_only is False and \
+            not args.force_parse and mysource.output_current(options):
+        logger.info(
+            "Output of %s is up to date with its inputs, skipping", source)
+        return 'skipped'
+
+    mysource.settestonly(args.test_only)
+
+    # run tests first
+    if (args.no_verify or args.skip_tests) is not True:
+        suite = mysource.getTestSuite()
+        if suite is None:
+            logger.warning(
+                "No tests configured for this source: %s", source)
+        else:
+            unittest.TextTestRunner(verbosity=2).run(suite)
+    else:
+        logger.info("Skipping Tests for source: %s", source)
+
+    if args.test_only is False and args.fetch_only is False:
+        checkpoint = None
+        if mysource.checkpointed:
+            checkpoint = Checkpoint(mysource, options, resume=args.resume)
+            checkpoint.instrument()
+        mysource.graph.node_cache.reset_stats()
+        with metrics.phase('parse') as parse:
             mysource.parse(args.limit)
-            end_parse = time.clock()
-            logger.info("Parsing time: %d sec", end_parse-start_parse)
-            if args.graph == 'rdf_graph':
-                logger.info("Found %d nodes", len(mysource.graph))
-
-                # Add property axioms
-                start_axiom_exp = time.clock()
-                logger.info("Adding property axioms")
-
-                properties = GraphUtils.get_properties_from_graph(mysource.graph)
-                GraphUtils.add_property_axioms(mysource.graph, properties)
-                end_axiom_exp = time.clock()
+        logger.info(
+            "Parsing time: %d sec (%d sec cpu)",
+            parse['wall'], parse['cpu'])
+        mysource.graph.node_cache.log_stats(source)
+        if args.graph in ['rdf_graph', 'compact_graph']:
+            logger.info("Found %d nodes", len(mysource.graph))
+            if args.graph == 'compact_graph':
                 logger.info(
-                    "Property axioms added: %d sec", end_axiom_exp-start_axiom_exp)
-
-                start_write = time.clock()
-                mysource.write(fmt=args.dest_fmt)
-                end_write = time.clock()
-                logger.info("Writing time: %d sec", end_write-start_write)
-        # if args.no_verify is not True:
-
-        #    status = mysource.verify()
-        #    if status is not True:
-        #        logger.error(
-        #            'Source %s did not pass verification tests.', source)
-        #        exit(1)
-        # else:
-        #    logger.info('skipping verification step')
-        logger.info('***** Finished with %s *****', source)
-    # load configuration parameters
-    # for example, keys
-
+                    "Graph uses %.1f bytes per triple",
+                    mysource.graph.bytes_per_triple())
+
+            # Add property axioms
+            logger.info("Adding property axioms")
+            with metrics.phase('property_axioms') as axioms:
+                GraphUtils.add_property_axioms(mysource.graph)
+            logger.info("Property axioms added: %d sec", axioms['wall'])
+
+            # wall clock, the work may be spread over several processes
+            with metrics.phase('write') as write:
+                mysource.write(
+                    fmt=args.dest_fmt, write_workers=args.write_workers,
+                    compress=args.compress,
+                    compress_level=args.compress_level,
+                    block_size=args.compress_block_size,
+                    shards=args.shards)
+            logger.info(
+                "Writing time: %d sec (%d triples/s)", write['wall'],
+                len(mysource.graph) / max(write['wall'], 1e-6))
+        elif args.graph == 'streamed_graph':
+            with metrics.phase('write') as write:
+                mysource.write(
+                    fmt='nt', compress=args.compress,
+                    compress_level=args.compress_level,
+                    block_size=args.compress_block_size,
+                    shards=args.shards)
+            logger.info("Writing time: %d sec", write['wall'])
+        mysource.record_build(options)
+        if checkpoint is not None:
+            checkpoint.clear()
+    if args.profile is not None:
+        metrics.write(
+            '/'.join((mysource.outdir, mysource.name + '_metrics.json')))
+    # if args.no_verify is not True:
+
+    #    status = mysource.verify()
+    #    if status is not True:
+    #        logger.error(
+    #            'Source %s did not pass verification tests.', source)
+    #        exit(1)
+    # else:
+    #    logger.info('skipping verification step')
+    return 'done'
+
+
+def run_job(job):
+    """
+    run_source() in a --jobs worker, reporting failure rather than raising
+    :param job: tuple of run_source() arguments
+    :return: tuple of (source, status, seconds, error)
+    """
+    (source, src, args, taxa_supported, tax_ids) = job
+    multiprocessing.current_process().name = source
+    start = time.time()
+    try:
+        status = run_source(source, src, args, taxa_supported, tax_ids)
+        error = None
+    except Exception:
+        logger.exception("%s failed", source)
+        (status, error) = (
+            'failed', traceback.format_exc().strip().splitlines()[-1])
+    finally:
+        Source.ftp_pool.close()
+    return (source, status, time.time() - start, error)
+
+
+def run_jobs(sources, args, source_to_class_map, taxa_supported, tax_ids):
+    """
+    Run sources in args.jobs worker processes, longest first by their
+    durations on earlier runs, then log a summary and exit non zero
+    if any failed
+    """
+    durations = {}
+    if os.path.exists(DURATIONS_FILE):
+        with open(DURATIONS_FILE) as fh:
+            durations = json.load(fh)
+
+    def expected(source):
+        if source in durations:
+            return durations[source]
+        if source in LONG_SOURCES:
+            return float('inf')
+        return 0
+
+    sources = sorted(sources, key=expected, reverse=True)
+    logger.info(
+        "Running %d sources in %d processes: %s",
+        len(sources), args.jobs, ', '.join(sources))
+
+    host_slots = [
+        multiprocessing.BoundedSemaphore(Source.fetch_per_host)
+        for i in range(HOST_SLOTS)]
+    results = []
+    # the semaphores reach the workers as initargs, when the pool starts;
+    # they can not be pickled along with each task
+    pool = multiprocessing.Pool(
+        args.jobs, initializer=configure, initargs=(args, host_slots))
+    jobs = [
+        (source, source_to_class_map[source], args,
+         source_to_class_map[source] in taxa_supported, tax_ids)
+        for source in sources]
+    try:
+        for (source, status, seconds, error) in pool.imap_unordered(
+                run_job, jobs):
+            logger.info(
+                '***** Finished with %s: %s in %d sec *****',
+                source, status, seconds)
+            results.append((source, status, seconds, error))
+            if status == 'done':
+                durations[source] = round(seconds)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    os.makedirs(os.path.dirname(DURATIONS_FILE), exist_ok=True)
+    with open(DURATIONS_FILE, 'w') as fh:
+        json.dump(durations, fh, indent=1, sort_keys=True)
+
+    failed = [result for result in results if result[1] == 'failed']
+    summary = ['{:<20} {:<8} {:>7d} sec {}'.format(
+        source, status, round(seconds), error or '')
+        for (source, status, seconds, error) in results]
+    logger.info("Summary:\n%s", '\n'.join(summary))
+    if failed:
+        logger.error(
+            "%d of %d sources failed: %s", len(failed), len(results),
+            ', '.join(result[0] for result in failed))
+        exit(1)
     logger.info("All done.")
 
 
@@ -7,29 +7,24 @@
 '''
 import os.path
 import logging
-import yaml
+from dipper.utils import yaml_cache
 
 __author__ = 'nicole'
 
 logger = logging.getLogger(__name__)
 
-# read configuration file
-curie_map = None
-
-if os.path.exists(os.path.join(os.path.dirname(__file__), 'curie_map.yaml')):
-    with open(os.path.join(os.path.dirname(__file__), 'curie_map.yaml')) \
-            as yaml_file:
-        curie_map = yaml.load(yaml_file)
-        logger.debug("Finished loading curie maps: %s", curie_map)
-else:
-    logger.debug(
-        "Cannot find 'curie_map.yaml' in  %s",
-        os.path.dirname(__file__))
+# configuration file, read on first use
+CURIE_MAP_FILE = os.path.join(os.path.dirname(__file__), 'curie_map.yaml')
 
 
 def get():
-    return curie_map
+    if not os.path.exists(CURIE_MAP_FILE):
+        logger.debug(
+            "Cannot find 'curie_map.yaml' in  %s",
+            os.path.dirname(__file__))
+        return None
+    return yaml_cache.load(CURIE_MAP_FILE)
 
 
 def get_base():
-    return curie_map['']
+    return get()['']
@@ -0,0 +1,511 @@
+from array import array
+from collections import Counter
+from dipper.graph.Graph import Graph as DipperGraph
+from dipper.graph.NodeCache import NodeCache
+from dipper.utils.CurieUtil import CurieUtil
+from dipper.utils import yaml_cache
+from dipper import curie_map
+import logging
+import re
+import sys
+
+LOG = logging.getLogger(__name__)
+
+# how many serialized lines to join before each write
+WRITE_BATCH = 10000
+# empty slot of the triple hash table
+EMPTY = -1
+# slot of a removed triple, probing continues past it
+DELETED = -2
+
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+RDF_TYPE = '<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>'
+
+
+class CompactGraph(DipperGraph):
+    """
+    Keep triples in memory as integer ids into an interned term dictionary.
+
+    Every distinct term (IRI, blank node or literal) is stored once,
+    already formatted as an ntriple term, and each triple is just three
+    integers in parallel arrays. Duplicate triples are dropped on insert,
+    found through an open addressing hash table of triple positions in
+    the arrays (4 bytes a slot, at most half full) rather than a set of
+    Python objects.
+    Serialization to nt or turtle works directly from the interned
+    strings, no RDFLib node objects are created.
+
+    Only supports the small part of the RDFLib graph api that
+    dipper itself calls (len, add, remove, predicates, serialize).
+    """
+
+    curie_util = yaml_cache.LazyTable(curie_map.CURIE_MAP_FILE, CurieUtil)
+    curie_map = yaml_cache.LazyTable(curie_map.CURIE_MAP_FILE)
+    # curie -> (ntriple term, prefix) shared by all CompactGraphs
+    node_cache = NodeCache()
+
+    # global translation table, available outside the ingest
+    globaltt = yaml_cache.LazyTable('translationtable/GLOBAL_TERMS.yaml')
+    globaltcid = yaml_cache.LazyTable(
+        'translationtable/GLOBAL_TERMS.yaml', yaml_cache.inverse)
+
+    def __init__(self, are_bnodes_skized=True, identifier=None):
+        self.are_bnodes_skized = are_bnodes_skized
+        self.identifier = identifier
+
+        self._term_ids = {}     # ntriple term -> int
+        self._terms = []        # int -> ntriple term
+        self._subjects = array('I')
+        self._predicates = array('I')
+        self._objects = array('I')
+        # hash of (s, p, o) -> position of the triple, for deduplication
+        self._slots = array('i', [EMPTY]) * 1024
+        self._deleted = 0
+        # predicate id -> triples using it
+        self._predicate_uses = Counter()
+        # triples held at the last checkpoint
+        self._checkpointed = 0
+        self.predicate_counts = Counter()
+
+        # prefixes seen while resolving curies, written out for turtle
+        self.namespaces = {'OBO': curie_map.get()['OBO']}
+
+    def __len__(self):
+        return len(self._subjects)
+
+    def addTriple(self, subject_id, predicate_id, obj,
+                  object_is_literal=False, literal_type=None):
+
+        terms = self._makeTerms(
+            subject_id, predicate_id, obj, object_is_literal, literal_type)
+        if terms is not None and self._add_terms(*terms):
+            self.predicate_counts[predicate_id] += 1
+        return
+
+    def addTriples(self, triples):
+        """
+        Add a batch of triples, each a tuple of addTriple() arguments
+        (subject_id, predicate_id, obj[, object_is_literal[, literal_type]])
+        :param triples: iterable of tuples
+        :return: None
+        """
+        for args in triples:
+            terms = self._makeTerms(*args)
+            if terms is not None and self._add_terms(*terms):
+                self.predicate_counts[args[1]] += 1
+        return
+
+    def _makeTerms(self, subject_id, predicate_id, obj,
+                   object_is_literal=False, literal_type=None):
+        """
+        Resolve addTriple() arguments to three ntriple terms
+        :return: tuple or None if any part can not be resolved
+        """
+        if object_is_literal is True:
+            if obj is not None:
+                obj_term = self._getLiteral(obj, literal_type)
+            else:
+                LOG.warning(
+                    "None as literal object for subj: %s and pred: %s",
+                    subject_id, predicate_id)
+                # magic number 3 here is "steps up the stack"
+                LOG.warning(sys._getframe(3).f_code.co_name)
+                return None
+        elif obj is not None and obj != '':
+            obj_term = self._getNode(obj)
+        else:
+            LOG.warning(
+                "None/empty object IRI for subj: %s and pred: %s",
+                subject_id, predicate_id)
+            return None
+
+        subject_term = self._getNode(subject_id)
+        predicate_term = self._getNode(predicate_id)
+        if subject_term is None or predicate_term is None or obj_term is None:
+            return None
+        return (subject_term, predicate_term, obj_term)
+
+    def add(self, triple):
+        """
+        RDFLib style add() for callers (GraphUtils) handing us RDFLib nodes
+        :param triple: tuple of three RDFLib nodes
+        :return: None
+        """
+        self._add_terms(*(self._nodeTerm(node) for node in triple))
+        return
+
+    def _nodeTerm(self, node):
+        """
+        The ntriple form of an RDFLib node. n3() would write a literal
+        holding a newline in triple quotes, which ntriples does not allow
+        """
+        from rdflib import Literal
+
+        if not isinstance(node, Literal):
+            return node.n3()
+        if node.language:
+            return '{}@{}'.format(self._quote_encode(node), node.language)
+        if node.datatype:
+            return '{}^^<{}>'.format(self._quote_encode(node), node.datatype)
+        return self._quote_encode(node)
+
+    def remove(self, triple):
+        """
+        RDFLib style remove() of a single fully specified triple
+        :param triple: tuple of three RDFLib nodes
+        :return: None
+        """
+        ids = [self._term_ids.get(self._nodeTerm(node)) for node in triple]
+        if None in ids:
+            return
+        slot = self._find(*ids)
+        position = self._slots[slot]
+        if position == EMPTY:
+            return
+        self._slots[slot] = DELETED
+        self._deleted += 1
+        self._predicate_uses[ids[1]] -= 1
+
+        # fill the hole with the last triple, keeping the triples
+        # not yet checkpointed at the end
+        if position < self._checkpointed:
+            self._checkpointed -= 1
+            self._move(self._checkpointed, position)
+            position = self._checkpointed
+        self._move(len(self._subjects) - 1, position)
+        self._subjects.pop()
+        self._predicates.pop()
+        self._objects.pop()
+        return
+
+    def _move(self, source, position):
+        """
+        Copy the triple at source over the one at position
+        """
+        if source == position:
+            return
+        ids = (
+            self._subjects[source], self._predicates[source],
+            self._objects[source])
+        self._slots[self._find(*ids)] = position
+        (self._subjects[position], self._predicates[position],
+         self._objects[position]) = ids
+
+    def predicates(self, subject=None, obj=None):
+        """
+        Distinct predicates, optionally constrained by subject and/or object
+        Yields RDFLib URIRefs so results compare equal to ontology terms.
+        Unconstrained this reads an index of predicates in use, with a
+        subject or object it is a scan of every triple
+        :param subject: RDFLib node or None
+        :param obj: RDFLib node or None
+        :return: generator of URIRef
+        """
+        from rdflib import URIRef
+
+        subject_id = obj_id = None
+        if subject is not None:
+            subject_id = self._term_ids.get(self._nodeTerm(subject))
+            if subject_id is None:
+                return
+        if obj is not None:
+            obj_id = self._term_ids.get(self._nodeTerm(obj))
+            if obj_id is None:
+                return
+
+        if subject_id is None and obj_id is None:
+            for pred_id, uses in self._predicate_uses.items():
+                if uses > 0:
+                    yield URIRef(self._terms[pred_id][1:-1])
+            return
+
+        seen = set()
+        for i, pred_id in enumerate(self._predicates):
+            if pred_id in seen:
+                continue
+            if subject_id is not None and self._subjects[i] != subject_id:
+                continue
+            if obj_id is not None and self._objects[i] != obj_id:
+                continue
+            seen.add(pred_id)
+            yield URIRef(self._terms[pred_id][1:-1])
+
+    def skolemizeBlankNode(self, curie):
+        stripped_id = re.sub(r'^_:|^_', '', curie, 1)
+        return "<{0}.well-known/genid/{1}>".format(
+            self.curie_util.get_base(), stripped_id)
+
+    def serialize(self, destination=None, format='turtle', **kwargs):
+        """
+        Write the graph as ntriples or turtle.
+        Matches how GraphUtils.write() calls RDFLib serialize()
+        :param destination: binary file like object, None returns bytes
+        :param format: 'nt' or 'turtle'
+        :return: bytes if no destination is given, else None
+        """
+        if format == 'nt':
+            lines = self.nt_lines()
+        elif format == 'turtle':
+            lines = self._turtle_lines()
+        else:
+            raise ValueError(
+                "CompactGraph can only serialize nt or turtle not {}".format(
+                    format))
+
+        if destination is None:
+            return '\n'.join(lines).encode('utf-8') + b'\n'
+
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) == WRITE_BATCH:
+                destination.write(('\n'.join(batch) + '\n').encode('utf-8'))
+                batch = []
+        if batch:
+            destination.write(('\n'.join(batch) + '\n').encode('utf-8'))
+        return
+
+    def start_checkpoints(self):
+        self._checkpointed = len(self._subjects)
+
+    def _stage_triples(self):
+        # as terms, the ids of a resumed graph may differ
+        terms = self._terms
+        saved = {
+            'triples': [
+                (terms[self._subjects[i]], terms[self._predicates[i]],
+                 terms[self._objects[i]])
+                for i in range(self._checkpointed, len(self._subjects))],
+            'namespaces': self.namespaces}
+        self._checkpointed = len(self._subjects)
+        return saved
+
+    def _add_stage_triples(self, saved):
+        self.namespaces.update(saved['namespaces'])
+        for triple in saved['triples']:
+            self._add_terms(*triple)
+        self._checkpointed = len(self._subjects)
+
+    def memory_size(self):
+        """
+        Approximate bytes held by the term dictionary, the triple arrays,
+        their hash table and the node cache (shared with any other
+        CompactGraph, but in a run the main graph fills it)
+        :return: int
+        """
+        size = sys.getsizeof(self._term_ids) + sys.getsizeof(self._terms)
+        size += sum(sys.getsizeof(term) for term in self._terms)
+        for ids in (
+                self._subjects, self._predicates, self._objects, self._slots):
+            size += sys.getsizeof(ids)
+        size += CompactGraph.node_cache.memory_size()
+        return size
+
+    def bytes_per_triple(self):
+        if len(self) == 0:
+            return 0.0
+        return self.memory_size() / len(self)
+
+    def _getNode(self, curie):
+        """
+        Returns the ntriple form of an IRI or blank node
+        given a curie or iri as a string.
+        Prefixes of resolved curies are remembered for turtle output
+
+        :param curie: str identifier formatted as curie or iri
+        :return: str ntriple term, or None if the curie can not be resolved
+        """
+        node = None
+        if curie[:1] == '_':
+            if self.are_bnodes_skized is True:
+                node = self.skolemizeBlankNode(curie)
+            else:
+                node = '_:' + re.sub(r'^_:|^_', '', curie, 1)
+            return node
+
+        cached = CompactGraph.node_cache.get(curie)
+        if cached is not None:
+            (node, prefix) = cached
+        elif curie.startswith(('http', 'ftp')):
+            node = '<' + curie + '>'
+            prefix = None
+            CompactGraph.node_cache.put(curie, (node, prefix))
+        else:
+            iri = self.curie_util.get_uri(curie)
+            if iri is None:
+                LOG.error("couldn't make URI for %s", curie)
+                return None
+            node = '<' + iri + '>'
+            prefix = curie.split(':')[0]
+            CompactGraph.node_cache.put(curie, (node, prefix))
+
+        if prefix is not None and prefix not in self.namespaces:
+            self.namespaces[prefix] = self.curie_map[prefix]
+        return node
+
+    def _getLiteral(self, obj, literal_type=None):
+        """
+        Format a python value as an ntriple literal,
+        typing non str values the way RDFLib Literal() would
+        """
+        if isinstance(obj, bool):
+            lexical = 'true' if obj else 'false'
+            datatype = '<' + XSD + 'boolean>'
+        elif isinstance(obj, int):
+            lexical = str(obj)
+            datatype = '<' + XSD + 'integer>'
+        elif isinstance(obj, float):
+            lexical = repr(obj)
+            datatype = '<' + XSD + 'double>'
+        else:
+            lexical = str(obj)
+            datatype = None
+
+        if literal_type is not None:
+            datatype = self._getNode(literal_type)
+
+        if datatype is None:
+            return self._quote_encode(lexical)
+        return '{}^^{}'.format(self._quote_encode(lexical), datatype)
+
+    def _intern(self, term):
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self._terms)
+            self._term_ids[term] = term_id
+            self._terms.append(term)
+        return term_id
+
+    def _add_terms(self, subject_term, predicate_term, obj_term):
+        """
+        :return: bool, False if the graph already held the triple
+        """
+        subject_id = self._intern(subject_term)
+        predicate_id = self._intern(predicate_term)
+        obj_id = self._intern(obj_term)
+        slot = self._find(subject_id, predicate_id, obj_id)
+        if self._slots[slot] != EMPTY:
+            return False
+        self._slots[slot] = len(self._subjects)
+        self._subjects.append(subject_id)
+        self._predicates.append(predicate_id)
+        self._objects.append(obj_id)
+        self._predicate_uses[predicate_id] += 1
+        if 2 * (len(self._subjects) + self._deleted) > len(self._slots):
+            if 4 * len(self._subjects) > len(self._slots):
+                self._rehash(2 * len(self._slots))
+            else:
+                # mostly removed triples, clear them at the same size
+                self._rehash(len(self._slots))
+        return True
+
+    def _find(self, subject_id, predicate_id, obj_id):
+        """
+        :return: int slot holding the triple's position,
+                 else the empty slot where it would go
+        """
+        slots = self._slots
+        mask = len(slots) - 1
+        slot = hash((subject_id, predicate_id, obj_id)) & mask
+        while True:
+            position = slots[slot]
+            if position == EMPTY:
+                return slot
+            if position != DELETED and (
+                    self._objects[position] == obj_id and
+                    self._subjects[position] == subject_id and
+                    self._predicates[position] == predicate_id):
+                return slot
+            slot = (slot + 1) & mask
+
+    def _rehash(self, size):
+        """
+        Rebuild the hash table with size (a power of 2) slots
+        """
+        self._slots = array('i', [EMPTY]) * size
+        self._deleted = 0
+        for position in range(len(self._subjects)):
+            self._slots[self._find(
+                self._subjects[position], self._predicates[position],
+                self._objects[position])] = position
+
+    def nt_lines(self):
+        """
+        :return: generator of ntriple lines (without newline)
+        """
+        terms = self._terms
+        for i in range(len(self._subjects)):
+            yield '{} {} {} .'.format(
+                terms[self._subjects[i]], terms[self._predicates[i]],
+                terms[self._objects[i]])
+
+    def _turtle_lines(self):
+        """
+        Turtle grouped by subject, IRIs contracted to bound prefixes
+        when the local part is a safe name
+        """
+        for prefix in sorted(self.namespaces):
+            yield '@prefix {}: <{}> .'.format(prefix, self.namespaces[prefix])
+        yield ''
+
+        bases = sorted(
+            ((iri, prefix) for prefix, iri in self.namespaces.items()),
+            key=lambda x: len(x[0]), reverse=True)
+        qnames = [self._qname(term, bases) for term in self._terms]
+        rdf_type_id = self._term_ids.get(RDF_TYPE)
+        if rdf_type_id is not None:
+            qnames[rdf_type_id] = 'a'
+
+        order = sorted(
+            range(len(self._subjects)),
+            key=lambda i: (self._subjects[i], self._predicates[i]))
+
+        current_subject = current_predicate = None
+        pending = None
+        for i in order:
+            subject_id = self._subjects[i]
+            predicate_id = self._predicates[i]
+            obj = qnames[self._objects[i]]
+            if subject_id != current_subject:
+                if pending is not None:
+                    yield pending + ' .'
+                    yield ''
+                pending = '{} {} {}'.format(
+                    qnames[subject_id], qnames[predicate_id], obj)
+                current_subject = subject_id
+                current_predicate = predicate_id
+            elif predicate_id != current_predicate:
+                yield pending + ' ;'
+                pending = '    {} {}'.format(qnames[predicate_id], obj)
+                current_predicate = predicate_id
+            else:
+                yield pending + ' ,'
+                pending = '        {}'.format(obj)
+        if pending is not None:
+            yield pending + ' .'
+
+    @staticmethod
+    def _qname(term, bases):
+        if term[0] != '<':
+            return term
+        iri = term[1:-1]
+        for (base, prefix) in bases:
+            if iri.startswith(base):
+                local = iri[len(base):]
+                if re.match(r'^[A-Za-z0-9_]([A-Za-z0-9_.-]*[A-Za-z0-9_-])?$',
+                            local):
+                    return '{}:{}'.format(prefix, local)
+                break
+        return term
+
+    @staticmethod
+    def _quote_encode(literal):
+        """
+        Same escaping as StreamedGraph._quote_encode()
+        :param literal:
+        :return:
+        """
+        return '"%s"' % literal.replace('\\', '\\\\')\
+            .replace('\n', '\\n')\
+            .replace('"', '\\"')\
+            .replace('\r', '\\r')
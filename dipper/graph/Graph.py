@@ -1,17 +1,89 @@
 from abc import ABCMeta, abstractmethod
+from collections import Counter
+import os
+import pickle
 
 
 class Graph(metaclass=ABCMeta):
 
+    # Each backend keeps self.predicate_counts, a Counter of
+    # predicate curie (or iri) -> distinct triples added with it, up to
+    # date in addTriple() and addTriples() so the distinct predicates of
+    # a graph are known without scanning it. A deduplicating
+    # StreamedGraph only knows which triples are distinct once
+    # finalize() has merged them, and counts them there; without
+    # dedup it counts every triple it writes, duplicates included.
+
     @abstractmethod
     def addTriple(self, subject_id, predicate_id, object_id,
                   object_is_literal, literal_type):
         pass
 
+    @abstractmethod
+    def addTriples(self, triples):
+        pass
+
     @abstractmethod
     def skolemizeBlankNode(self, curie):
         pass
 
+    def getPredicateCounts(self):
+        """
+        Distinct triples per predicate, keyed by full iri
+        (a predicate passed both as curie and as iri is counted once).
+        :return: Counter of iri -> int
+        """
+        counts = Counter()
+        for predicate, count in self.predicate_counts.items():
+            if predicate.startswith(('http', 'ftp')):
+                iri = predicate
+            else:
+                iri = self.curie_util.get_uri(predicate)
+            if iri is not None:
+                counts[iri] += count
+        return counts
+
+    def start_checkpoints(self):
+        """
+        Note what the graph holds before the first parse stage,
+        so that checkpoint() saves only what each stage adds
+        """
+        pass
+
+    def checkpoint(self, prefix, stage):
+        """
+        Save the triples added since the previous checkpoint (or since
+        start_checkpoints()) as the part <prefix>_<stage>.pickle,
+        for restore()
+        :param prefix: str path without extension
+        :param stage: str name of the stage just finished
+        """
+        part = '{}_{}.pickle'.format(prefix, stage)
+        with open(part + '.tmp', 'wb') as fh:
+            pickle.dump(self._stage_triples(), fh, pickle.HIGHEST_PROTOCOL)
+        os.replace(part + '.tmp', part)
+
+    def restore(self, prefix, stages):
+        """
+        Take up the triples saved by checkpoint()
+        :param prefix: str path without extension
+        :param stages: list of the names of the stages saved, in order
+        """
+        for stage in stages:
+            part = '{}_{}.pickle'.format(prefix, stage)
+            if os.path.exists(part):
+                with open(part, 'rb') as fh:
+                    self._add_stage_triples(pickle.load(fh))
+
+    def _stage_triples(self):
+        """
+        :return: picklable triples added since the previous checkpoint
+        """
+        raise NotImplementedError
+
+    def _add_stage_triples(self, saved):
+        raise NotImplementedError
+
     @abstractmethod
     def serialize(self, subject_iri, predicate_iri, obj,
                   object_is_literal, literal_type):
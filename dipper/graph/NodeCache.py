@@ -0,0 +1,74 @@
+from collections import OrderedDict
+import logging
+import sys
+
+LOG = logging.getLogger(__name__)
+
+
+class NodeCache:
+    """
+    Bounded, least recently used memo of curie (or iri) string
+    to whatever a graph backend resolved it to.
+
+    The same few million curies are resolved over and over during a parse;
+    each graph class keeps one of these as a class attribute so every
+    instance (main graph, test graph, dataset graph) shares it.
+    Hits and misses are counted so the effect can be reported per source.
+    """
+
+    def __init__(self, maxsize=2**20):
+        self.maxsize = maxsize
+        self._nodes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def get(self, curie):
+        """
+        :param curie: str curie or iri
+        :return: the cached value or None
+        """
+        value = self._nodes.get(curie)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._nodes.move_to_end(curie)
+        return value
+
+    def put(self, curie, value):
+        self._nodes[curie] = value
+        if len(self._nodes) > self.maxsize:
+            self._nodes.popitem(last=False)
+
+    def memory_size(self):
+        """
+        Approximate bytes held by the memo itself; the objects the cached
+        values refer to are left out, the graphs hold those anyway
+        :return: int
+        """
+        return sys.getsizeof(self._nodes) + sum(
+            sys.getsizeof(curie) + sys.getsizeof(value)
+            for (curie, value) in self._nodes.items())
+
+    def clear(self):
+        self._nodes.clear()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def log_stats(self, name=None):
+        LOG.info(
+            "Node cache%s: %d hits, %d misses (%.1f%% hit rate), %d entries",
+            '' if name is None else ' for ' + name,
+            self.hits, self.misses, 100 * self.hit_rate(), len(self))
@@ -1,11 +1,13 @@
+from collections import Counter
 from rdflib import ConjunctiveGraph, Literal, URIRef, BNode, Namespace
 from dipper.graph.Graph import Graph as DipperGraph
+from dipper.graph.NodeCache import NodeCache
 from dipper.utils.CurieUtil import CurieUtil
+from dipper.utils import yaml_cache
 from dipper import curie_map
 import re
 import logging
 import sys
-import yaml
 
 logger = logging.getLogger(__name__)
 
@@ -24,13 +26,15 @@ class RDFGraph(ConjunctiveGraph, DipperGraph):
     Bnodes, and literals from an input curie
     """
 
-    curie_map = curie_map.get()
-    curie_util = CurieUtil(curie_map)
+    curie_util = yaml_cache.LazyTable(curie_map.CURIE_MAP_FILE, CurieUtil)
+    curie_map = yaml_cache.LazyTable(curie_map.CURIE_MAP_FILE)
+    # curie -> (URIRef, prefix) shared by all RDFGraphs
+    node_cache = NodeCache()
 
-    # make global translation table available outside the ingest
-    with open('translationtable/GLOBAL_TERMS.yaml') as fh:
-        globaltt = yaml.safe_load(fh)
-        globaltcid = {v: k for k, v in globaltt.items()}
+    # global translation table, available outside the ingest
+    globaltt = yaml_cache.LazyTable('translationtable/GLOBAL_TERMS.yaml')
+    globaltcid = yaml_cache.LazyTable(
+        'translationtable/GLOBAL_TERMS.yaml', yaml_cache.inverse)
 
     def __init__(self, are_bnodes_skized=True, identifier=None):
         # print("in RDFGraph  with id: ", identifier)
@@ -41,6 +45,10 @@ class RDFGraph(ConjunctiveGraph, DipperGraph):
         # https://github.com/RDFLib/rdflib/issues/632
         obo_map = curie_map.get()['OBO']
         self.bind('OBO', Namespace(obo_map))
+        self._bound_prefixes = {'OBO'}
+        self.predicate_counts = Counter()
+        # triples added since the last checkpoint, when checkpointing
+        self._journal = None
 
         # try adding them all
         # self.bind_all_namespaces()  # too much
@@ -48,31 +56,85 @@ class RDFGraph(ConjunctiveGraph, DipperGraph):
     def addTriple(self, subject_id, predicate_id, obj,
                   object_is_literal=False, literal_type=None):
 
+        triple = self._makeTriple(
+            subject_id, predicate_id, obj, object_is_literal, literal_type)
+        if triple is not None:
+            self._addNew(triple, predicate_id)
+        return
+
+    def _addNew(self, triple, predicate_id):
+        """
+        add() a triple, counting and journaling it if it is new
+        """
+        size = len(self)
+        self.add(triple)
+        if len(self) > size:
+            self.predicate_counts[predicate_id] += 1
+            if self._journal is not None:
+                self._journal.append(triple)
+
+    def addTriples(self, triples):
+        """
+        Add a batch of triples, each a tuple of addTriple() arguments
+        (subject_id, predicate_id, obj[, object_is_literal[, literal_type]])
+        :param triples: iterable of tuples
+        :return: None
+        """
+        for args in triples:
+            triple = self._makeTriple(*args)
+            if triple is not None:
+                self._addNew(triple, args[1])
+        return
+
+    def start_checkpoints(self):
+        self._journal = []
+
+    def _stage_triples(self):
+        saved = {'triples': self._journal, 'prefixes': self._bound_prefixes}
+        self._journal = []
+        return saved
+
+    def _add_stage_triples(self, saved):
+        for prefix in saved['prefixes'] - self._bound_prefixes:
+            self.bind(prefix, Namespace(self.curie_map[prefix]))
+            self._bound_prefixes.add(prefix)
+        for triple in saved['triples']:
+            self.add(triple)
+
+    def _makeTriple(self, subject_id, predicate_id, obj,
+                    object_is_literal=False, literal_type=None):
+        """
+        Resolve addTriple() arguments to a tuple of RDFLib nodes
+        :return: tuple or None if there is no usable object
+        :raises AssertionError: if a curie can not be resolved, as RDFLib
+                                add() would, rather than match as a wildcard
+        """
         if object_is_literal is True:
             if literal_type is not None and obj is not None:
                 literal_type_iri = self._getNode(literal_type)
-                self.add(
-                    (self._getNode(subject_id), self._getNode(predicate_id),
-                     Literal(obj, datatype=literal_type_iri)))
+                obj_node = Literal(obj, datatype=literal_type_iri)
             elif obj is not None:
-                self.add(
-                    (self._getNode(subject_id), self._getNode(predicate_id),
-                     Literal(obj)))
+                obj_node = Literal(obj)
             else:
                 logger.warning(
                     "None as literal object for subj: %s and pred: %s",
                     subject_id, predicate_id)
-                # magic number 2 here is "steps up the stack"
-                logger.warning(sys._getframe(2).f_code.co_name)
+                # magic number 3 here is "steps up the stack"
+                logger.warning(sys._getframe(3).f_code.co_name)
+                return None
         elif obj is not None and obj != '':
-            self.add((
-                self._getNode(subject_id), self._getNode(predicate_id),
-                self._getNode(obj)))
+            obj_node = self._getNode(obj)
         else:
             logger.warning(
                 "None/empty object IRI for subj: %s and pred: %s",
                 subject_id, predicate_id)
-        return
+            return None
+        triple = (
+            self._getNode(subject_id), self._getNode(predicate_id), obj_node)
+        if triple[0] is None or triple[1] is None or triple[2] is None:
+            raise AssertionError("Can not make a triple of {} {} {}".format(
+                subject_id, predicate_id, obj))
+        return triple
 
     def skolemizeBlankNode(self, curie):
         stripped_id = re.sub(r'^_:|^_', '', curie, 1)
@@ -94,26 +156,34 @@ class RDFGraph(ConjunctiveGraph, DipperGraph):
         :return: node: RDFLib URIRef or BNode object
         """
         node = None
-        if re.match(r'^_', curie):
+        if curie[:1] == '_':
             if self.are_bnodes_skized is True:
                 node = self.skolemizeBlankNode(curie)
             else:  # delete the leading underscore to make it cleaner
                 node = BNode(re.sub(r'^_:|^_', '', curie, 1))
+            return node
 
+        cached = RDFGraph.node_cache.get(curie)
+        if cached is not None:
+            (node, prefix) = cached
         # Check if curie actually an IRI
-        elif re.match(r'^http|^ftp', curie):
+        elif curie.startswith(('http', 'ftp')):
             node = URIRef(curie)
+            prefix = None
+            RDFGraph.node_cache.put(curie, (node, prefix))
         else:
             iri = RDFGraph.curie_util.get_uri(curie)
-            if iri is not None:
-                node = URIRef(RDFGraph.curie_util.get_uri(curie))
-                # Bind prefix map to graph
-                prefix = curie.split(':')[0]
-                if prefix not in self.namespace_manager.namespaces():
-                    mapped_iri = curie_map.get()[prefix]
-                    self.bind(prefix, Namespace(mapped_iri))
-            else:
+            if iri is None:
                 logger.error("couldn't make URI for %s", curie)
+                return None
+            node = URIRef(iri)
+            prefix = curie.split(':')[0]
+            RDFGraph.node_cache.put(curie, (node, prefix))
+
+        # Bind prefix map to graph, once per prefix
+        if prefix is not None and prefix not in self._bound_prefixes:
+            self.bind(prefix, Namespace(self.curie_map[prefix]))
+            self._bound_prefixes.add(prefix)
         return node
 
     def bind_all_namespaces(self):
@@ -1,9 +1,15 @@
+from collections import Counter
 from dipper.graph.Graph import Graph as DipperGraph
+from dipper.graph.NodeCache import NodeCache
 from dipper.utils.CurieUtil import CurieUtil
+from dipper.utils import yaml_cache
 from dipper import curie_map
+import heapq
 import logging
-import re
-import yaml
+import os
+import shutil
+import sys
+import tempfile
 
 LOG = logging.getLogger(__name__)
 
@@ -11,32 +17,89 @@ LOG = logging.getLogger(__name__)
 class StreamedGraph(DipperGraph):
     """
     Stream rdf triples to file or stdout
-    Assumes a downstream process will sort then uniquify triples
+    Assumes a downstream process will sort then uniquify triples,
+    unless dedup is set, in which case triples are held in a bounded buffer,
+    spilled to disk as sorted runs and merged by finalize()
+    into a sorted, unique ntriple stream.
 
     Theoretically could support both ntriple, rdfxml formats, for now
     just support nt
     """
 
-    curie_map = curie_map.get()
-    curie_util = CurieUtil(curie_map)
-    
-    with open('translationtable/GLOBAL_TERMS.yaml') as fh:
-        globaltt = yaml.safe_load(fh).copy()
-        globaltcid = {v: k for k, v in globaltt.items()}
+    # triples held in memory in dedup mode before a sorted run is spilled
+    sort_buffer = 1000000
+    # most run files open at once during the merge
+    merge_width = 64
+
+    curie_util = yaml_cache.LazyTable(curie_map.CURIE_MAP_FILE, CurieUtil)
+    curie_map = yaml_cache.LazyTable(curie_map.CURIE_MAP_FILE)
+    # curie -> iri shared by all StreamedGraphs
+    node_cache = NodeCache()
+
+    # global translation table, available outside the ingest
+    globaltt = yaml_cache.LazyTable('translationtable/GLOBAL_TERMS.yaml')
+    globaltcid = yaml_cache.LazyTable(
+        'translationtable/GLOBAL_TERMS.yaml', yaml_cache.inverse)
 
     def __init__(self,
                 are_bnodes_skized=True,
                 identifier=None,
                 file_handle=None,
-                fmt='nt'):
+                fmt='nt',
+                dedup=False,
+                buffer_size=None,
+                tmpdir=None):
         self.are_bnodes_skized = are_bnodes_skized
         self.fmt = fmt
         self.file_handle = file_handle
         self.identifier = identifier
-   
+        self.dedup = dedup
+        if buffer_size is not None:
+            self.sort_buffer = buffer_size
+        self.tmpdir = tmpdir
+        self._buffer = set()
+        self._runs = []
+        self._run_dir = None
+        self._stage_start = 0   # first run spilled since the last checkpoint
+        self.predicate_counts = Counter()
+
     def addTriple(
         self, subject_id, predicate_id, object_id, object_is_literal=False,
         literal_type=None):
+        triple = self._makeTriple(
+            subject_id, predicate_id, object_id, object_is_literal,
+            literal_type)
+        if triple is not None:
+            self.serialize(*triple)
+        return
+
+    def addTriples(self, triples):
+        """
+        Add a batch of triples, each a tuple of addTriple() arguments
+        (subject_id, predicate_id, obj[, object_is_literal[, literal_type]])
+        The batch is formatted first, then written (or buffered) at once
+        :param triples: iterable of tuples
+        :return: None
+        """
+        lines = []
+        for args in triples:
+            triple = self._makeTriple(*args)
+            if triple is not None:
+                lines.append(self._format_triple(*triple))
+        self._write_triples(lines)
+        return
+
+    def _makeTriple(
+        self, subject_id, predicate_id, object_id, object_is_literal=False,
+        literal_type=None):
+        """
+        Resolve addTriple() arguments to the arguments of serialize()
+        :return: tuple or None if the object is missing
+        """
+        if object_id is None:
+            LOG.warning("Null value passed as object")
+            return None
+
         subject_iri = self._getNode(subject_id)
         predicate_iri = self._getNode(predicate_id)
         if not object_is_literal:
@@ -47,21 +110,26 @@ class StreamedGraph(DipperGraph):
         if literal_type is not None:
             literal_type = self._getNode(literal_type)
 
-        if object_id is not None:
-            self.serialize(
-                subject_iri, predicate_iri, obj, object_is_literal, literal_type)
-        else:
-            LOG.warn("Null value passed as object")
-        return
+        if not self.dedup:
+            # every triple is written, duplicates included;
+            # in dedup mode finalize() counts the unique ones
+            self.predicate_counts[predicate_id] += 1
+        return (
+            subject_iri, predicate_iri, obj, object_is_literal, literal_type)
 
     def skolemizeBlankNode(self, curie):
-        base_iri = StreamedGraph.curie_map.get_base()
+        base_iri = StreamedGraph.curie_util.get_base()
         curie_id = curie.split(':')[1]
         skolem_iri = "{0}.wellknown/genid/{1}".format(base_iri, curie_id)
         return skolem_iri
 
     def serialize(self, subject_iri, predicate_iri, obj,
                   object_is_literal=False, literal_type=None):
+        self._write_triples([self._format_triple(
+            subject_iri, predicate_iri, obj, object_is_literal, literal_type)])
+
+    def _format_triple(self, subject_iri, predicate_iri, obj,
+                       object_is_literal=False, literal_type=None):
         if not object_is_literal:
             triple = "<{}> <{}> <{}> .".format(subject_iri, predicate_iri, obj)
         elif literal_type is not None:
@@ -74,16 +142,155 @@ class StreamedGraph(DipperGraph):
                     subject_iri, predicate_iri, self._quote_encode(obj))
             else:
                 lit_type = self._getLiteralXSDType(obj)
-                if type is not None:
+                if lit_type is not None:
                     triple = '<{}> <{}> "{}"^^<{}> .'.format(
                         subject_iri, predicate_iri, obj, lit_type)
                 else:
                     raise TypeError("Cannot determine type of {}".format(obj))
+        return triple
+
+    def _write_triples(self, triples):
+        if self.dedup:
+            self._buffer.update(triples)
+            if len(self._buffer) >= self.sort_buffer:
+                self._spill()
+        elif self.file_handle is None:
+            for triple in triples:
+                print(triple)
+        elif triples:
+            self.file_handle.write("\n".join(triples) + "\n")
+
+    def finalize(self):
+        """
+        In dedup mode, merge the buffered and spilled triples and write
+        each distinct triple once, in sorted order, to the file handle
+        (or stdout), and count them per predicate. Does nothing otherwise.
+        :return: int, number of unique triples written (None if not dedup)
+        """
+        if not self.dedup:
+            return None
 
-        if self.file_handle is None:
-            print(triple)
+        if self._runs:
+            if self._buffer:
+                self._spill()
+            runs = self._runs
+            while len(runs) > self.merge_width:
+                runs = [
+                    self._merge_runs(runs[i:i + self.merge_width])
+                    for i in range(0, len(runs), self.merge_width)]
+            handles = [open(run, 'r', encoding='utf-8') for run in runs]
+            try:
+                count = self._write_lines(
+                    self._unique(heapq.merge(*handles)))
+            finally:
+                for handle in handles:
+                    handle.close()
+            if self._run_dir is not None:
+                shutil.rmtree(self._run_dir)
+            self._run_dir = None
+            self._runs = []
+            self._stage_start = 0
         else:
-            self.file_handle.write("{}\n".format(triple))
+            count = self._write_lines(
+                triple + '\n' for triple in sorted(self._buffer))
+            self._buffer = set()
+
+        LOG.info("Wrote %d unique triples", count)
+        return count
+
+    def checkpoint(self, prefix, stage):
+        """
+        Save the triples added since the last checkpoint, buffered or
+        spilled, as one sorted part file <prefix>_<stage>.nt. The part is
+        one of the runs merged by finalize(), and is left in place
+        for restore() until the checkpoint is cleared.
+        """
+        if not self.dedup:
+            raise ValueError("Only a dedup StreamedGraph can be checkpointed")
+        if self._buffer:
+            self._spill()
+        part = '{}_{}.nt'.format(prefix, stage)
+        self._merge_runs(self._runs[self._stage_start:], part + '.tmp')
+        os.replace(part + '.tmp', part)
+        self._runs[self._stage_start:] = [part]
+        self._stage_start = len(self._runs)
+
+    def start_checkpoints(self):
+        # the first part also holds what came before the first stage
+        pass
+
+    def restore(self, prefix, stages):
+        """
+        Take up the part files of the given finished stages as runs
+        """
+        for stage in stages:
+            part = '{}_{}.nt'.format(prefix, stage)
+            if os.path.exists(part):
+                self._runs.append(part)
+        self._stage_start = len(self._runs)
+
+    def _sort_dir(self):
+        if self._run_dir is None:
+            self._run_dir = tempfile.mkdtemp(
+                prefix='dipper-sort-', dir=self.tmpdir)
+        return self._run_dir
+
+    def _spill(self):
+        """
+        Write the current buffer to disk as a sorted run
+        """
+        run = os.path.join(
+            self._sort_dir(), 'run{:06d}'.format(len(self._runs)))
+        with open(run, 'w', encoding='utf-8') as run_fh:
+            for triple in sorted(self._buffer):
+                run_fh.write(triple + '\n')
+        LOG.debug("Spilled %d triples to %s", len(self._buffer), run)
+        self._runs.append(run)
+        self._buffer = set()
+
+    def _merge_runs(self, runs, merged=None):
+        """
+        Merge sorted runs into a single sorted, unique run,
+        removing those spilled here (checkpoint parts are kept)
+        """
+        if merged is None:
+            (handle, merged) = tempfile.mkstemp(
+                prefix='merge', dir=self._sort_dir())
+            os.close(handle)
+        handles = [open(run, 'r', encoding='utf-8') for run in runs]
+        try:
+            with open(merged, 'w', encoding='utf-8') as merged_fh:
+                for line in self._unique(heapq.merge(*handles)):
+                    merged_fh.write(line)
+        finally:
+            for handle in handles:
+                handle.close()
+        for run in runs:
+            if os.path.dirname(run) == self._run_dir:
+                os.remove(run)
+        return merged
+
+    @staticmethod
+    def _unique(lines):
+        previous = None
+        for line in lines:
+            if line != previous:
+                yield line
+                previous = line
+
+    def _write_lines(self, lines):
+        out = self.file_handle
+        if out is None:
+            out = sys.stdout
+        count = 0
+        counts = Counter()
+        for line in lines:
+            out.write(line)
+            count += 1
+            counts[line.split(' ', 2)[1][1:-1]] += 1
+        out.flush()
+        self.predicate_counts = counts
+        return count
 
     def _getNode(self, curie):
         """
@@ -93,17 +300,24 @@ class StreamedGraph(DipperGraph):
         :param curie: str id as curie or iri
         :return:
         """
-        if re.match(r'^_:', curie):
+        if curie.startswith('_:'):
             if self.are_bnodes_skized is True:
                 node = self.skolemizeBlankNode(curie)
             else:
                 node = curie
-        elif re.match(r'^http|^ftp', curie):
+            return node
+
+        node = StreamedGraph.node_cache.get(curie)
+        if node is not None:
+            return node
+        if curie.startswith(('http', 'ftp')):
             node = curie
-        elif len(curie.split(':')) == 2:
+        elif curie.count(':') == 1:
             node = StreamedGraph.curie_util.get_uri(curie)
         else:
             raise TypeError("Cannot process curie {}".format(curie))
+        if node is not None:
+            StreamedGraph.node_cache.put(curie, node)
         return node
 
     def _getLiteralXSDType(self, literal):
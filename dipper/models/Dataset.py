@@ -2,6 +2,7 @@ import logging
 from datetime import datetime
 from dipper.graph.RDFGraph import RDFGraph
 from dipper.graph.StreamedGraph import StreamedGraph
+from dipper.graph.CompactGraph import CompactGraph
 from dipper.models.Model import Model
 
 __author__ = 'nlw'
@@ -27,7 +28,7 @@ class Dataset:
             ingest_desc=None,
             license_url=None,
             data_rights=None,
-            graph_type='rdf_graph',     # rdf_graph, streamed_graph
+            graph_type='rdf_graph',     # rdf_graph, streamed_graph, compact_graph
             file_handle=None):
 
         if graph_type is None:
@@ -37,6 +38,8 @@ class Dataset:
                 True, identifier, file_handle=file_handle)
         elif graph_type == 'rdf_graph':
             self.graph = RDFGraph(True, identifier)
+        elif graph_type == 'compact_graph':
+            self.graph = CompactGraph(True, identifier)
 
         self.model = Model(self.graph)
         self.globaltt = self.graph.globaltt
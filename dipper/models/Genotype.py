@@ -395,13 +395,13 @@ class Genotype():
 
             self.globaltt['reagent_targeted_gene'], description)
 
+        triples = [
+            (targeted_gene_id, self.globaltt['is_targeted_by'], reagent_id)]
         if gene_id is not None:
-            self.graph.addTriple(
+            triples.append((
                 targeted_gene_id, self.globaltt['is_expression_variant_of'],
-                gene_id)
-
-        self.graph.addTriple(
-            targeted_gene_id, self.globaltt['is_targeted_by'], reagent_id)
+                gene_id))
+        self.graph.addTriples(triples)
 
         return
 
@@ -27,6 +27,15 @@ class Model():
         self.graph.addTriple(
             subject_id, predicate_id, obj, object_is_literal, literal_type)
 
+    def addTriples(self, triples):
+        """
+        Add a batch of triples,
+        each a tuple of the same arguments as addTriple()
+        :param triples: iterable of tuples
+        :return: None
+        """
+        self.graph.addTriples(triples)
+
     def addType(self, subject_id, subject_type):
         self.graph.addTriple(
             subject_id, self.globaltt['type'], subject_type)
@@ -57,41 +66,34 @@ class Model():
         """
         assert class_id is not None
 
-        self.graph.addTriple(
-            class_id, self.globaltt['type'], self.globaltt['class'])
+        triples = [(class_id, self.globaltt['type'], self.globaltt['class'])]
         if label is not None:
-            self.graph.addTriple(
-                class_id, self.globaltt['label'], label, object_is_literal=True)
+            triples.append((class_id, self.globaltt['label'], label, True))
 
         if class_type is not None:
-            self.graph.addTriple(
-                class_id, self.globaltt['subclass_of'], class_type)
+            triples.append(
+                (class_id, self.globaltt['subclass_of'], class_type))
         if description is not None:
-            self.graph.addTriple(
-                class_id, self.globaltt['description'], description,
-                object_is_literal=True)
+            triples.append(
+                (class_id, self.globaltt['description'], description, True))
+        self.graph.addTriples(triples)
         return
 
     def addIndividualToGraph(self, ind_id, label, ind_type=None, description=None):
 
+        triples = []
         if label is not None:
-            self.graph.addTriple(
-                ind_id, self.globaltt['label'], label,
-                object_is_literal=True
-            )
+            triples.append((ind_id, self.globaltt['label'], label, True))
         if ind_type is not None:
-            self.graph.addTriple(
-                ind_id, self.globaltt['type'], ind_type
-            )
+            triples.append((ind_id, self.globaltt['type'], ind_type))
         else:
-            self.graph.addTriple(
-                ind_id, self.globaltt['type'],
-                self.globaltt['named_individual']
-            )
+            triples.append(
+                (ind_id, self.globaltt['type'],
+                 self.globaltt['named_individual']))
         if description is not None:
-            self.graph.addTriple(
-                ind_id, self.globaltt['description'], description,
-                object_is_literal=True)
+            triples.append(
+                (ind_id, self.globaltt['description'], description, True))
+        self.graph.addTriples(triples)
         return
 
     def addEquivalentClass(self, sub, obj):
@@ -111,14 +113,11 @@ class Model():
         bnode = '_:'+re.sub(
             r':', '', property_id)+re.sub(r':', '', property_value)
 
-        self.graph.addTriple(
-            bnode, self.globaltt['type'], self.globaltt['restriction'])
-        self.graph.addTriple(
-            bnode, self.globaltt['on_property'], property_id)
-        self.graph.addTriple(
-            bnode, self.globaltt['some_values_from'], property_value)
-        self.graph.addTriple(
-            class_id, self.globaltt['subclass_of'], bnode)
+        self.graph.addTriples([
+            (bnode, self.globaltt['type'], self.globaltt['restriction']),
+            (bnode, self.globaltt['on_property'], property_id),
+            (bnode, self.globaltt['some_values_from'], property_value),
+            (class_id, self.globaltt['subclass_of'], bnode)])
 
         return
 
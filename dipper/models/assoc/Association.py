@@ -71,58 +71,61 @@ class Assoc:
         if not self._is_valid():
             return
 
-        self.graph.addTriple(self.sub, self.rel, self.obj)
-
         if self.assoc_id is None:
             self.set_association_id()
 
-        self.model.addType(self.assoc_id, self.model.globaltt['association'])
-
-        self.graph.addTriple(
-            self.assoc_id, self.globaltt['association has subject'], self.sub)
-        self.graph.addTriple(
-            self.assoc_id, self.globaltt['association has object'], self.obj)
-        self.graph.addTriple(
-            self.assoc_id, self.globaltt['association has predicate'], self.rel)
+        triples = [
+            (self.sub, self.rel, self.obj),
+            (self.assoc_id, self.globaltt['type'],
+             self.globaltt['association']),
+            (self.assoc_id, self.globaltt['association has subject'],
+             self.sub),
+            (self.assoc_id, self.globaltt['association has object'],
+             self.obj),
+            (self.assoc_id, self.globaltt['association has predicate'],
+             self.rel)]
 
         if self.description is not None:
-            self.model.addDescription(self.assoc_id, self.description)
+            triples.append((
+                self.assoc_id, self.globaltt['description'],
+                self.description.strip(), True))
 
         if self.evidence is not None and len(self.evidence) > 0:
             for e in self.evidence:
-                self.graph.addTriple(
-                    self.assoc_id, self.globaltt['has evidence'], e)
+                triples.append(
+                    (self.assoc_id, self.globaltt['has evidence'], e))
 
         if self.source is not None and len(self.source) > 0:
             for src in self.source:
                 if re.match(r'http', src):
                     # TODO assume that the source is a publication?
                     # use Reference class here
-                    self.graph.addTriple(
-                        self.assoc_id, self.globaltt['source'], src, True)
+                    triples.append(
+                        (self.assoc_id, self.globaltt['source'], src, True))
                 else:
-                    self.graph.addTriple(
-                        self.assoc_id, self.globaltt['source'], src)
+                    triples.append(
+                        (self.assoc_id, self.globaltt['source'], src))
 
         if self.provenance is not None and len(self.provenance) > 0:
             for prov in self.provenance:
-                self.graph.addTriple(
-                    self.assoc_id, self.globaltt['has_provenance'], prov)
+                triples.append(
+                    (self.assoc_id, self.globaltt['has_provenance'], prov))
 
         if self.date is not None and len(self.date) > 0:
             for dt in self.date:
-                self.graph.addTriple(
-                    object_is_literal=True, subject_id=self.assoc_id,
-                    predicate_id=self.globaltt['created_on'], obj=dt)
+                triples.append(
+                    (self.assoc_id, self.globaltt['created_on'], dt, True))
 
         if self.score is not None:
-            self.graph.addTriple(
-                self.assoc_id, self.globaltt['has measurement value'], self.score,
-                True, 'xsd:float')
+            triples.append((
+                self.assoc_id, self.globaltt['has measurement value'],
+                self.score, True, 'xsd:float'))
             # TODO
             # update with some kind of instance of scoring object
             # that has a unit and type
 
+        self.graph.addTriples(triples)
+
         return
 
     def add_association_to_graph(self):
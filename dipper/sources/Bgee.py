@@ -2,7 +2,6 @@ import logging
 import os
 import re
 import time
-import ftplib
 import pandas as pd
 from stat import ST_SIZE
 import gzip
@@ -75,22 +74,26 @@ class Bgee(Source):
         :return:
         """
         for group in self.files:
-            files_to_download, ftp = self._get_file_list(
-                self.files[group]['path'], self.files[group]['pattern'])
-            for name, info in files_to_download:
-                localfile = '/'.join((self.rawdir, name))
-                if not os.path.exists(localfile)\
-                        or is_dl_forced or self.checkIfRemoteIsNewer(
-                            localfile, info['size'], info['modify']):
-                    logger.info("Fetching {}".format(name))
-                    logger.info("Writing to {}".format(localfile))
-                    ftp.retrbinary('RETR {}'.format(name), open(localfile, 'wb').write)
-                    remote_dt = Bgee._convert_ftp_time_to_iso(info['modify'])
-                    os.utime(localfile, (
-                        time.mktime(remote_dt.timetuple()),
-                        time.mktime(remote_dt.timetuple())))
-
-        ftp.quit()
+            with self.ftp_pool.connection(
+                    Bgee.BGEE_FTP, 'anonymous',
+                    'info@monarchinitiative.edu') as ftp:
+                files_to_download = self._get_file_list(
+                    self.files[group]['path'], self.files[group]['pattern'],
+                    ftp)
+                for name, info in files_to_download:
+                    localfile = '/'.join((self.rawdir, name))
+                    if not os.path.exists(localfile)\
+                            or is_dl_forced or self.checkIfRemoteIsNewer(
+                                localfile, info['size'], info['modify']):
+                        logger.info("Fetching {}".format(name))
+                        logger.info("Writing to {}".format(localfile))
+                        with open(localfile, 'wb') as fh:
+                            ftp.retrbinary('RETR {}'.format(name), fh.write)
+                        remote_dt = Bgee._convert_ftp_time_to_iso(
+                            info['modify'])
+                        os.utime(localfile, (
+                            time.mktime(remote_dt.timetuple()),
+                            time.mktime(remote_dt.timetuple())))
 
         return
 
@@ -102,9 +105,12 @@ class Bgee(Source):
         :param limit: int Limit to top ranked anatomy associations per group
         :return: None
         """
-        files_to_download, ftp = self._get_file_list(
-            self.files['anat_entity']['path'],
-            self.files['anat_entity']['pattern'])
+        with self.ftp_pool.connection(
+                Bgee.BGEE_FTP, 'anonymous',
+                'info@monarchinitiative.edu') as ftp:
+            files_to_download = self._get_file_list(
+                self.files['anat_entity']['path'],
+                self.files['anat_entity']['pattern'], ftp)
         for name, info in files_to_download:
             localfile = '/'.join((self.rawdir, name))
             with gzip.open(localfile, 'rt', encoding='ISO-8859-1') as fh:
@@ -198,24 +204,20 @@ class Bgee(Source):
             int(ftp_time[8:10]), int(ftp_time[10:12]), int(ftp_time[12:14]))
         return date_time
 
-    def _get_file_list(self, working_dir, file_regex=re.compile(r'.*'), ftp=None):
+    def _get_file_list(self, working_dir, file_regex, ftp):
         """
         Get file list from ftp server filtered by taxon
-        :return: Tuple of (Generator object with Tuple(
-            file name, info object), ftp object)
+        :param ftp: connection from the source's ftp_pool
+        :return: list of Tuple(file name, info object)
         """
-        if ftp is None:
-            ftp = ftplib.FTP(Bgee.BGEE_FTP)
-            ftp.login("anonymous", "info@monarchinitiative.edu")
-
         working_dir = "{}{}".format(self.version, working_dir)
 
         ftp.cwd(working_dir)
 
         directory = ftp.mlsd()
         files = (value for value in directory if value[1]['type'] == 'file')
-        files_to_download = (
+        files_to_download = [
             value for value in files if re.match(file_regex, value[0]) and
-            int(re.findall(r'^\d+', value[0])[0]) in self.tax_ids)
+            int(re.findall(r'^\d+', value[0])[0]) in self.tax_ids]
 
-        return files_to_download, ftp
+        return files_to_download
@@ -9,6 +9,7 @@ from zipfile import ZipFile
 from dipper import config
 from dipper.sources.Source import Source
 from dipper.models.Model import Model
+from dipper.utils import compression
 from dipper.models.assoc.InteractionAssoc import InteractionAssoc
 
 __author__ = 'nicole'
@@ -121,19 +122,17 @@ class BioGrid(Source):
         logger.info("getting interactions")
         line_counter = 0
         f = '/'.join((self.rawdir, self.files['interactions']['file']))
-        myzip = ZipFile(f, 'r')
-        # assume that the first entry is the item
-        fname = myzip.namelist()[0]
         matchcounter = 0
 
-        with myzip.open(fname, 'r') as csvfile:
+        # assume that the first entry is the item
+        with compression.open_input(f) as csvfile:
             for line in csvfile:
                 # skip comment lines
-                if re.match(r'^#', line.decode()):
+                if re.match(r'^#', line):
                     logger.debug("Skipping header line")
                     continue
                 line_counter += 1
-                line = line.decode().strip()
+                line = line.strip()
                 # print(line)
                 (interactor_a, interactor_b, alt_ids_a, alt_ids_b, aliases_a,
                  aliases_b, detection_method, pub_author, pub_id, taxid_a,
@@ -199,8 +198,6 @@ class BioGrid(Source):
                         limit is not None and line_counter > limit):
                     break
 
-        myzip.close()
-
         return
 
     def _get_identifiers(self, limit):
@@ -217,9 +214,6 @@ class BioGrid(Source):
         logger.info("getting identifier mapping")
         line_counter = 0
         f = '/'.join((self.rawdir, self.files['identifiers']['file']))
-        myzip = ZipFile(f, 'r')
-        # assume that the first entry is the item
-        fname = myzip.namelist()[0]
         foundheader = False
 
         # TODO align this species filter with the one above
@@ -227,15 +221,16 @@ class BioGrid(Source):
         # Danio rerio, Caenorhabditis elegans,Xenopus laevis'.split(',')
 
         speciesfilters = 'Homo sapiens,Mus musculus'.split(',')
-        with myzip.open(fname, 'r') as csvfile:
+        # assume that the first entry is the item
+        with compression.open_input(f) as csvfile:
             for line in csvfile:
                 # skip header lines
                 if not foundheader:
-                    if re.match(r'BIOGRID_ID', line.decode()):
+                    if re.match(r'BIOGRID_ID', line):
                         foundheader = True
                     continue
 
-                line = line.decode().strip()
+                line = line.strip()
                 # BIOGRID_ID
                 # IDENTIFIER_VALUE
                 # IDENTIFIER_TYPE
@@ -281,8 +276,6 @@ class BioGrid(Source):
                 if not self.testMode and limit is not None and line_counter > limit:
                     break
 
-        myzip.close()
-
         return
 
     def getTestSuite(self):
@@ -1,11 +1,10 @@
 import logging
 import re
-import io
 import csv
-from zipfile import ZipFile
 
 from dipper.sources.Source import Source
 from dipper.models.Model import Model
+from dipper.utils import compression
 from dipper.models.Reference import Reference
 from dipper import config
 from dipper.models.assoc.G2PAssoc import G2PAssoc
@@ -131,16 +130,14 @@ class Decipher(Source):
         hgnc = HGNC()
         hgnc_symbol_id_map = hgnc.get_symbol_id_map()
 
-        myzip = ZipFile(
-            '/'.join((self.rawdir, self.files['annot']['file'])), 'r')
+        myfile = '/'.join((self.rawdir, self.files['annot']['file']))
 
         # use the ddg2p.txt file
         fname = 'ddg2p.txt'
 
         unmapped_omim_counter = 0
         unmapped_gene_count = 0
-        with myzip.open(fname, 'r') as f:
-            f = io.TextIOWrapper(f)
+        with compression.open_input(myfile, member=fname) as f:
             reader = csv.reader(f, delimiter='\t', quotechar='\"')
             # score_means_by_measure = {}
             # strain_scores_by_measure = {}   # TODO theseare unused
@@ -216,7 +213,6 @@ class Decipher(Source):
                 if not self.testMode and limit is not None and line_counter > limit:
                     break
 
-        myzip.close()
         logger.warning(
             "gene-disorder associations with no omim id: %d",
             unmapped_omim_counter)
@@ -2061,12 +2061,9 @@ class FlyBase(PostgreSQLSource):
 
         base_url = 'ftp.flybase.net'
         human_disease_dir = 'releases/current/precomputed_files/human_disease'
-        from ftplib import FTP
-        ftp = FTP(base_url)     # connect to host
-        ftp.login()
-        ftp.cwd(human_disease_dir)
-        l = ftp.nlst()          # get list of files
-        ftp.quit()
+        with self.ftp_pool.connection(base_url) as ftp:
+            ftp.cwd(human_disease_dir)
+            l = ftp.nlst()          # get list of files
         f = None
         f_list = [
             i for i, x in enumerate(l)
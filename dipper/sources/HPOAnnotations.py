@@ -8,7 +8,7 @@ from stat import ST_CTIME
 from git import Repo
 from git import GitCommandError
 
-from dipper.utils import pysed
+from dipper.utils import scrub
 from dipper.sources.Source import Source
 from dipper.models.assoc.D2PAssoc import D2PAssoc
 from dipper.models.assoc.DispositionAssoc import DispositionAssoc
@@ -64,6 +64,21 @@ class HPOAnnotations(Source):
         }
     }
 
+    # oddities in the annotation file, lots of publication rewriting,
+    # fixed as it is parsed
+    scrubs = {
+        'annot': [
+            scrub.sub(r'PubMed:', 'PMID:'),             # PubMed:12345
+            scrub.sub(r'pmid:', 'PMID:'),               # pmid:12345
+            scrub.sub(r'PMID:  *', 'PMID:'),            # PMID:    12345
+            scrub.sub(r'PMID([0-9][0-9]*)', r'PMID:\1'),  # PMID12345
+            scrub.sub(r'MIM([0-9][0-9]*)', r'OMIM:\1'),   # MIM12345
+            scrub.sub(r';MIM', ';OMIM'),                # ;MIM:12345
+            scrub.sub(r'ORPHANET', 'Orphanet'),
+            scrub.sub(r'ORPHA', 'Orphanet'),
+        ]
+    }
+
     # note, two of these codes are awaiting term requests.  see #114 and
     # https://code.google.com/p/evidenceontology/issues/detail?id=32
     # TODO TEC see if the GC issue translated into a GH issue
@@ -113,8 +128,6 @@ class HPOAnnotations(Source):
 
         self.get_files(is_dl_forced)
 
-        self.scrub()
-
         # get the latest build from jenkins
 
         # use the files['version'] file as the version
@@ -140,43 +153,6 @@ class HPOAnnotations(Source):
 
         return
 
-    def scrub(self):
-        """
-        Perform various data-scrubbing on the raw data files prior to parsing.
-        For this resource, this currently includes:
-        * revise errors in identifiers for some OMIM and PMIDs
-
-        :return: None
-
-        """
-
-        # scrub file of the oddities...lots of publication rewriting
-        f = '/'.join((self.rawdir, self.files['annot']['file']))
-        LOG.info('scrubbing PubMed:12345 --> PMID:12345')
-        pysed.replace(r'PubMed:', 'PMID:', f)
-
-        LOG.info('scrubbing pmid:12345 --> PMID:12345')
-        pysed.replace(r'pmid:', 'PMID:', f)
-
-        LOG.info('scrubbing PMID:    12345 --> PMID:12345')
-        pysed.replace(r'PMID:  *', 'PMID:', f)
-
-        LOG.info('scrubbing PMID12345 --> PMID:12345')
-        pysed.replace(r'PMID([0-9][0-9]*)', r'PMID:\1', f)
-
-        LOG.info('scrubbing MIM12345 --> OMIM:12345')
-        pysed.replace(r'MIM([0-9][0-9]*)', r'OMIM:\1', f)
-
-        LOG.info('scrubbing MIM:12345 --> OMIM:12345')
-        pysed.replace(r";MIM", ";OMIM", f)
-
-        LOG.info('scrubbing ORPHANET --> Orphanet')
-        pysed.replace("ORPHANET", "Orphanet", f)
-
-        LOG.info('scrubbing ORPHA --> Orphanet')
-        pysed.replace("ORPHA", "Orphanet", f)
-        return
-
     def parse(self, limit=None):
         if limit is not None:
             LOG.info("Only parsing first %s rows", limit)
@@ -231,7 +207,9 @@ class HPOAnnotations(Source):
         model = Model(graph)
         line_counter = 0
         with open(raw, 'r', encoding="utf8") as csvfile:
-            filereader = csv.reader(csvfile, delimiter='\t', quotechar='\"')
+            filereader = csv.reader(
+                self.scrubbed_lines('annot', csvfile),
+                delimiter='\t', quotechar='\"')
             for row in filereader:
                 line_counter += 1
                 row = [str(col).strip() for col in row]
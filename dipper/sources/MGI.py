@@ -212,6 +212,12 @@ class MGI(PostgreSQLSource):
             107251870, 107255383, 107256603]
     }
 
+    # the id maps the later views are joined through
+    checkpointed = True
+    checkpoint_attrs = (
+        'idhash', 'markers', 'label_hash', 'geno_bkgd',
+        'strain_to_genotype_map', 'wildtype_alleles')
+
     def __init__(
         self,
         graph_type,
@@ -1,10 +1,10 @@
 import re
-import gzip
 import logging
 from dipper.sources.Source import Source
 from dipper.models.GenomicFeature import Feature, makeChromID, makeChromLabel
 from dipper.models.Genotype import Genotype
 from dipper.models.Model import Model
+from dipper.utils import compression
 
 
 logger = logging.getLogger(__name__)
@@ -202,10 +202,10 @@ class Monochrom(Source):
             genome_id, self.globaltt['in taxon'],
             taxon_id)
 
-        with gzip.open(myfile, 'rb') as f:
+        with compression.open_input(myfile) as f:
             for line in f:
                 # skip comments
-                line = line.decode().strip()
+                line = line.strip()
                 if re.match(r'^#', line):
                     continue
 
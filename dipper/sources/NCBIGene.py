@@ -1,8 +1,6 @@
 import re
-import gzip
 import logging
 import csv
-import io
 
 from dipper.sources.Source import Source
 from dipper.models.Model import Model
@@ -12,6 +10,7 @@ from dipper import config
 from dipper.models.GenomicFeature import Feature, makeChromID, makeChromLabel
 from dipper.models.Reference import Reference
 from dipper.utils.DipperUtil import DipperUtil
+from dipper.utils import compression
 
 
 logger = logging.getLogger(__name__)
@@ -167,12 +166,12 @@ class NCBIGene(Source):
             geno.addGenome(tax_id, str(tax_num))
             # label added elsewhere
             model.addClassToGraph(tax_id, None)
-        with gzip.open(gene_info, 'rb') as f:
-            row = f.readline().decode().strip().split('\t')
+        with compression.open_input(gene_info) as f:
+            row = f.readline().strip().split('\t')
             logger.info("Header has %i columns", len(row))
             for line in f:
                 # skip comments
-                line = line.decode().strip()
+                line = line.strip()
                 if re.match(r'^#', line):
                     continue
                 (tax_num, gene_num, symbol, locustag, synonyms, xrefs, chrom,
@@ -412,10 +411,10 @@ class NCBIGene(Source):
         line_counter = 0
         myfile = '/'.join((self.rawdir, self.files['gene_history']['file']))
         logger.info("FILE: %s", myfile)
-        with gzip.open(myfile, 'rb') as f:
+        with compression.open_input(myfile) as f:
             for line in f:
                 # skip comments
-                line = line.decode().strip()
+                line = line.strip()
                 if re.match(r'^#', line):
                     continue
                 (tax_num, gene_num, discontinued_num, discontinued_symbol,
@@ -488,10 +487,10 @@ class NCBIGene(Source):
         myfile = '/'.join((self.rawdir, self.files['gene2pubmed']['file']))
         logger.info("FILE: %s", myfile)
         assoc_counter = 0
-        with gzip.open(myfile, 'rb') as f:
+        with compression.open_input(myfile) as f:
             for line in f:
                 # skip comments
-                line = line.decode().strip()
+                line = line.strip()
                 if re.match(r'^#', line):
                     continue
                 (tax_num, gene_num, pubmed_num) = line.split('\t')
@@ -610,9 +609,9 @@ class NCBIGene(Source):
         gene_to_group = {}
         gene_to_taxon = {}
 
-        with gzip.open(f, 'rb') as csvfile:
+        with compression.open_input(f, newline="") as csvfile:
             filereader = csv.reader(
-                io.TextIOWrapper(csvfile, newline=""),
+                csvfile,
                 delimiter='\t',
                 quotechar='\"')
 
@@ -2,8 +2,6 @@ import logging
 import xml.etree.ElementTree as ET
 import re
 import gzip
-import io
-import shutil
 import csv
 
 from dipper.sources.Source import Source, USER_AGENT
@@ -14,6 +12,8 @@ from dipper.models.Genotype import Genotype
 from dipper.models.Reference import Reference
 from dipper.sources.NCBIGene import NCBIGene
 from dipper.utils.DipperUtil import DipperUtil
+from dipper.utils import compression
+from dipper.utils import scrub
 from dipper.models.Model import Model
 from dipper import config
 
@@ -215,21 +215,13 @@ class OMIA(Source):
         LOG.info("Scrubbing out the nasty characters that break our parser.")
 
         myfile = '/'.join((self.rawdir, self.files['data']['file']))
-        tmpfile = '/'.join((self.rawdir, self.files['data']['file']+'.tmp.gz'))
-        tmp = gzip.open(tmpfile, 'wb')
         du = DipperUtil()
-        with gzip.open(myfile, 'rb') as fh:
-            filereader = io.TextIOWrapper(fh, newline="")
-            for line in filereader:
-                line = du.remove_control_characters(line) + '\n'
-                tmp.write(line.encode('utf-8'))
-        tmp.close()
         # TEC I do not like this at all. original data must be preserved as is.
         # also may be heavy handed as chars which do not break the parser
         # are stripped as well (i.e. tabs and newlines)
-        # move the temp file
-        LOG.info("Replacing the original data with the scrubbed file.")
-        shutil.move(tmpfile, myfile)
+        scrub.rewrite(
+            myfile, [lambda line: du.remove_control_characters(line) + '\n'],
+            opener=gzip.open)
         return
 
     def find_omim_type(self):
@@ -312,8 +304,7 @@ class OMIA(Source):
 
         myfile = '/'.join((self.rawdir, self.files['data']['file']))
 
-        fh = gzip.open(myfile, 'rb')
-        filereader = io.TextIOWrapper(fh, newline="")
+        filereader = compression.open_input(myfile, newline="")
 
         filereader.readline()  # remove the xml declaration line
 
@@ -322,7 +313,7 @@ class OMIA(Source):
             self.process_xml_table(
                 elem, 'Species_gb', self._process_species_table_row, limit)
 
-        fh.close()
+        filereader.close()
 
         return
 
@@ -342,8 +333,7 @@ class OMIA(Source):
 
         myfile = '/'.join((self.rawdir, self.files['data']['file']))
 
-        fh = gzip.open(myfile, 'rb')
-        filereader = io.TextIOWrapper(fh, newline="")
+        filereader = compression.open_input(myfile, newline="")
 
         filereader.readline()  # remove the xml declaration line
 
@@ -358,7 +348,7 @@ class OMIA(Source):
             self.process_xml_table(
                 elem, 'Omim_Xref', self._process_omia_omim_map, limit)
 
-        fh.close()
+        filereader.close()
 
         # post-process the omia-omim associations to filter out the genes
         # (keep only phenotypes/diseases)
@@ -378,8 +368,7 @@ class OMIA(Source):
 
         myfile = '/'.join((self.rawdir, self.files['data']['file']))
 
-        f = gzip.open(myfile, 'rb')
-        filereader = io.TextIOWrapper(f, newline="")
+        filereader = compression.open_input(myfile, newline="")
 
         filereader.readline()  # remove the xml declaration line
 
@@ -397,7 +386,7 @@ class OMIA(Source):
             self.process_xml_table(
                 elem, 'Group_MPO', self._process_group_mpo_row, limit)
 
-        f.close()
+        filereader.close()
 
         return
 
@@ -102,6 +102,9 @@ class OMIM(Source):
         # disease with known locus
         102480]
 
+    checkpointed = True
+    checkpoint_attrs = ('omim_type', 'omim_ncbigene_idmap')
+
     def __init__(self, graph_type, are_bnodes_skolemized):
         super().__init__(
             graph_type,
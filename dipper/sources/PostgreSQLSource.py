@@ -1,7 +1,10 @@
 
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import psycopg2
+import psycopg2.pool
 from dipper.sources.Source import Source
 
 logger = logging.getLogger(__name__)
@@ -45,68 +48,147 @@ class PostgreSQLSource(Source):
             in the cxn connection parameters.
         This will save them to a local file named the same as the table,
             in tab-delimited format, including a header.
+        Up to fetch_workers tables are copied at once, each over a pooled
+            connection of its own. All of them read the snapshot exported
+            by a first connection, so the files agree with each other as if
+            they were copied in a single transaction.
         :param tables: Names of tables to fetch
         :param cxn: database connection details
         :param limit: A max row count to fetch for each table
         :return: None
         """
 
-        con = None
+        workers = max(1, min(self.fetch_workers, len(tables)))
+        pool = psycopg2.pool.ThreadedConnectionPool(
+            1, workers + 1, host=cxn['host'], database=cxn['database'],
+            port=cxn['port'], user=cxn['user'], password=cxn['password'])
+        start = time.time()
         try:
-            con = psycopg2.connect(host=cxn['host'], database=cxn['database'],
-                                   port=cxn['port'], user=cxn['user'],
-                                   password=cxn['password'])
+            con = pool.getconn()
+            con.set_session(isolation_level='REPEATABLE READ', readonly=True)
             cur = con.cursor()
-            for tab in tables:
-                logger.info("Fetching data from table %s", tab)
-                self._getcols(cur, tab)
-                query = ' '.join(("SELECT * FROM", tab))
-                countquery = ' '.join(("SELECT COUNT(*) FROM", tab))
-                if limit is not None:
-                    query = ' '.join((query, "LIMIT", str(limit)))
-                    countquery = ' '.join((countquery, "LIMIT", str(limit)))
-
-                outfile = '/'.join((self.rawdir, tab))
-
-                filerowcount = -1
-                tablerowcount = -1
-                if not force:
-                    # check local copy.  assume that if the # rows are the same,
-                    # that the table is the same
-                    # TODO may want to fix this assumption
-                    if os.path.exists(outfile):
-                        # get rows in the file
-                        filerowcount = self.file_len(outfile)
-                        logger.info(
-                            "(%s) rows in local file for table %s",
-                            filerowcount, tab)
-
-                    # get rows in the table
-                    # tablerowcount=cur.rowcount
-                    cur.execute(countquery)
-                    tablerowcount = cur.fetchone()[0]
-
-                # rowcount-1 because there's a header
-                if force or filerowcount < 0 or (filerowcount-1) != tablerowcount:
-                    if force:
-                        logger.info("Forcing download of %s", tab)
-                    else:
-                        logger.info(
-                            "%s local (%d) different from remote (%d); fetching.",
-                            tab, filerowcount, tablerowcount)
-                    # download the file
-                    logger.info("COMMAND:%s", query)
-                    outputquery = "COPY ({0}) TO STDOUT WITH DELIMITER AS '\t' CSV HEADER".format(query)
-                    with open(outfile, 'w') as f:
-                        cur.copy_expert(outputquery, f)
-                else:
-                    logger.info("local data same as remote; reusing.")
-
+            snapshot = None
+            if workers > 1:
+                try:
+                    cur.execute("SELECT pg_export_snapshot()")
+                    snapshot = cur.fetchone()[0]
+                except psycopg2.Error as err:
+                    # e.g. a hot standby older than postgres 10
+                    logger.warning(
+                        "Cannot export a snapshot (%s); "
+                        "copying tables one at a time", err)
+                    con.rollback()
+            if snapshot is None:
+                sizes = [
+                    self._fetch_table(cur, tab, limit, force)
+                    for tab in tables]
+            else:
+                # the exporting transaction stays open until all are copied
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(
+                            self._fetch_table_in_snapshot,
+                            pool, snapshot, tab, limit, force)
+                        for tab in tables]
+                    try:
+                        sizes = [future.result() for future in futures]
+                    except BaseException:
+                        # leaving the with waits for the copies under way,
+                        # so none is left using the pool once it is closed
+                        for future in futures:
+                            future.cancel()
+                        raise
         finally:
-            if con:
-                con.close()
+            pool.closeall()
+        elapsed = time.time() - start
+        fetched = [size for size in sizes if size is not None]
+        self.fetched_files += len(fetched)
+        self.fetched_bytes += sum(fetched)
+        logger.info(
+            "Copied %d of %d tables, %.1f MB in %.1f sec (%.2f MB/s)",
+            len(fetched), len(tables), sum(fetched) / 2**20, elapsed,
+            sum(fetched) / 2**20 / max(elapsed, 1e-6))
         return
 
+    def _fetch_table_in_snapshot(self, pool, snapshot, tab, limit, force):
+        """
+        Copy one table over a pooled connection,
+        as of the exported snapshot
+        """
+        con = pool.getconn()
+        try:
+            con.set_session(isolation_level='REPEATABLE READ', readonly=True)
+            cur = con.cursor()
+            cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+            return self._fetch_table(cur, tab, limit, force)
+        finally:
+            con.rollback()
+            pool.putconn(con)
+
+    def _fetch_table(self, cur, tab, limit=None, force=False):
+        """
+        Copy a table to a local file of the same name,
+        unless the file has as many rows as the table already
+        :return: int bytes copied, None if the local file was kept
+        """
+        logger.info("Fetching data from table %s", tab)
+        self._getcols(cur, tab)
+        query = ' '.join(("SELECT * FROM", tab))
+        countquery = ' '.join(("SELECT COUNT(*) FROM", tab))
+        if limit is not None:
+            query = ' '.join((query, "LIMIT", str(limit)))
+            countquery = ' '.join((countquery, "LIMIT", str(limit)))
+
+        outfile = '/'.join((self.rawdir, tab))
+
+        filerowcount = -1
+        tablerowcount = -1
+        if not force:
+            # check local copy.  assume that if the # rows are the same,
+            # that the table is the same
+            # TODO may want to fix this assumption
+            if os.path.exists(outfile):
+                # get rows in the file
+                filerowcount = self.file_len(outfile)
+                logger.info(
+                    "(%s) rows in local file for table %s",
+                    filerowcount, tab)
+
+            # get rows in the table
+            # tablerowcount=cur.rowcount
+            cur.execute(countquery)
+            tablerowcount = cur.fetchone()[0]
+
+        # rowcount-1 because there's a header
+        if force or filerowcount < 0 or (filerowcount-1) != tablerowcount:
+            if force:
+                logger.info("Forcing download of %s", tab)
+            else:
+                logger.info(
+                    "%s local (%d) different from remote (%d); fetching.",
+                    tab, filerowcount, tablerowcount)
+            # download the file
+            logger.info("COMMAND:%s", query)
+            outputquery = "COPY ({0}) TO STDOUT WITH DELIMITER AS '\t' CSV HEADER".format(query)
+            start = time.time()
+            # a copy cut short is not left where it would be taken as done
+            try:
+                with open(outfile + '.part', 'w') as f:
+                    cur.copy_expert(outputquery, f)
+            except BaseException:
+                os.remove(outfile + '.part')
+                raise
+            os.replace(outfile + '.part', outfile)
+            elapsed = time.time() - start
+            size = os.path.getsize(outfile)
+            logger.info(
+                "Copied %s, %.1f MB in %.1f sec (%.2f MB/s)",
+                tab, size / 2**20, elapsed, size / 2**20 / max(elapsed, 1e-6))
+            return size
+
+        logger.info("local data same as remote; reusing.")
+        return None
+
     def fetch_query_from_pgdb(self, qname, query, con, cxn, limit=None,
                               force=False):
         """
@@ -1,21 +1,40 @@
 import re
+import errno
+import glob
 import hashlib
+import inspect
 import os
+import shutil
 import time
 import logging
+import threading
 import urllib
 import csv
+import json
 import yaml
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.error import HTTPError
+from urllib.parse import urlparse
 from stat import ST_CTIME, ST_SIZE
 from dipper.graph.RDFGraph import RDFGraph
 from dipper.graph.StreamedGraph import StreamedGraph
+from dipper.graph.CompactGraph import CompactGraph
 from dipper.utils.GraphUtils import GraphUtils
+from dipper.utils import compression
+from dipper.utils import scrub
+from dipper.utils import yaml_cache
+from dipper.utils.FTPPool import FTPPool
+from dipper.utils.ShardWriter import ShardWriter
 from dipper.models.Model import Model
 from dipper.models.Dataset import Dataset
 
 LOG = logging.getLogger(__name__)
 CHUNK = 16 * 1024  # read remote urls of unkown size in 16k chunks
+RANGE_CHUNK = 64 * 1024 * 1024  # size of each range of a parallel download
+# what is known about each url's download, shared by sources in raw/.blobs/
+BLOB_FIELDS = ('etag', 'last_modified', 'size', 'md5', 'fetched')
 USER_AGENT = "The Monarch Initiative (https://monarchinitiative.org/; " \
              "info@monarchinitiative.org)"
 
@@ -36,10 +55,43 @@ class Source:
 
     namespaces = {}
     files = {}
+    # file key -> list of dipper.utils.scrub functions, applied by
+    # scrubbed_lines() as the file is parsed rather than in a separate pass
+    scrubs = {}
+    # save each _process_* stage of parse() as it finishes, so a parse
+    # that dies can be resumed (see dipper.utils.Checkpoint), along with
+    # these attributes built up by the stages
+    checkpointed = False
+    checkpoint_attrs = ()
+
+    # files get_files() downloads at once, and at most this many per host
+    fetch_workers = 4
+    fetch_per_host = 2
+    # attempts per file, waiting fetch_backoff sec (doubling) in between
+    fetch_retries = 3
+    fetch_backoff = 2
+    # parallel ranges per file, for servers that accept range requests
+    range_workers = 1
+    # downloads stored by md5, linked from each source's raw directory
+    blob_dir = 'raw/.blobs'
+    # None, 'record' fetched files into fixture_dir or 'replay' them from it
+    fetch_mode = None
+    fixture_dir = 'tests/resources/fixtures'
+    _replay_server = None
+    # logged in ftp connections, shared by all sources
+    ftp_pool = FTPPool(max_per_host=fetch_per_host)
+    # host -> semaphore, shared by all sources
+    _host_slots = {}
+    # semaphores shared with other processes (dipper-etl --jobs),
+    # used instead when set, hosts hashed onto them
+    host_slots = None
+    _host_lock = threading.Lock()
+    # md5 of the dipper package, see package_md5()
+    _package_md5 = None
 
     def __init__(
         self,
-        graph_type='rdf_graph',     # or streamed_graph
+        graph_type='rdf_graph',     # or streamed_graph, compact_graph
         are_bnodes_skized=False,    # typically True
         name=None,                  # identifier; make an IRI for nquads
         ingest_title=None,
@@ -65,6 +117,14 @@ class Source:
         self.path = ""
         # to be used to store a subset of data for testing downstream.
         self.triple_count = 0
+        # downloaded by get_files(), files already up to date are not counted
+        self.fetched_files = 0
+        self.fetched_bytes = 0
+        # files written by write()
+        self.outfiles = []
+        # url -> validators of the last download, see fetch_from_url()
+        self._fetch_metadata = None
+        self._fetch_metadata_lock = threading.RLock()
         self.outdir = 'out'
         self.testdir = 'tests'
         self.rawdir = 'raw'
@@ -100,13 +160,21 @@ class Source:
 
         elif graph_type == 'streamed_graph':
             # need to expand on export formats
-            source_file = open(self.outfile.replace(".ttl", ".nt"), 'w')
-            self.graph = StreamedGraph(are_bnodes_skized, source_file)
+            # sorted, unique triples are written to <name>.nt by write()
+            self.graph = StreamedGraph(
+                are_bnodes_skized, self.name, dedup=True, tmpdir=self.outdir)
             # leave test files as turtle (better human readibility)
+        elif graph_type == 'compact_graph':
+            graph_id = ':MONARCH_' + str(self.name) + "_" + \
+                datetime.now().isoformat(' ').split()[0]
+
+            LOG.info("Creating compact graph  %s", graph_id)
+            self.graph = CompactGraph(are_bnodes_skized, graph_id)
         else:
             LOG.error(
                 "{} graph type not supported\n"
-                "valid types: rdf_graph, streamed_graph".format(graph_type))
+                "valid types: rdf_graph, streamed_graph, compact_graph".format(
+                    graph_type))
 
         # pull in global ontology mapping datastructures
         self.globaltt = self.graph.globaltt
@@ -119,6 +187,11 @@ class Source:
         self.testOnly = False
         self.testMode = False
 
+        # the dataset description is always written as turtle
+        dataset_graph_type = graph_type
+        if graph_type == 'streamed_graph':
+            dataset_graph_type = 'rdf_graph'
+
         # this may eventually support Bagits
         self.dataset = Dataset(
             self.archive_url,
@@ -127,7 +200,7 @@ class Source:
             None,    # description
             license_url,
             data_rights,
-            graph_type,
+            dataset_graph_type,
             file_handle
         )
 
@@ -154,7 +227,9 @@ class Source:
         """
         raise NotImplementedError
 
-    def write(self, fmt='turtle', stream=None):
+    def write(
+            self, fmt='turtle', stream=None, write_workers=1, compress=None,
+            compress_level=None, block_size=None, shards=None):
         """
         This convenience method will write out all of the graphs
         associated with the source.
@@ -162,9 +237,21 @@ class Source:
         and a "src_dataset.ttl" and a "src_test.ttl"
         If you do not supply stream='stdout'
         it will default write these to files.
+        A streamed_graph is always written as ntriples, its sorted,
+        unique triples are merged from the buffered and spilled runs here.
 
         In addition, if the version number isn't yet set in the dataset,
         it will be set to the date on file.
+        :param write_workers: processes formatting ntriples in parallel
+        :param compress: None, 'gzip', 'zstd' or 'auto' compress output files
+                         (the codec's extension is added to each file name)
+        :param compress_level: compression level, codec default if None
+        :param block_size: bytes handed to the compressor at a time
+        :param shards: split the graph into this many ntriple files
+                       <name>_<n>.nt by a hash of the subject, and list them
+                       with their triple counts and md5 in <name>_manifest.json
+        A <name>_predicates.tsv report of triples per predicate
+        is written next to the graph.
         :return: None
 
         """
@@ -175,6 +262,19 @@ class Source:
             'nquads':  'nq',
             'n3': 'n3'
         }
+        if shards is not None and shards > 1 and stream is None:
+            if fmt != 'nt':
+                LOG.warning("Sharded output is always written as nt")
+            fmt = 'nt'
+        else:
+            shards = None
+        if self.graph_type == 'streamed_graph':
+            fmt = 'nt'
+        compress = compression.resolve_codec(compress)
+        suffix = compression.extension(compress)
+        compress_args = dict(
+            compress=compress, compress_level=compress_level,
+            block_size=block_size)
 
         # make the regular graph output file
         dest = None
@@ -184,11 +284,12 @@ class Source:
                 dest = '.'.join((dest, fmt_ext.get(fmt)))
             else:
                 dest = '.'.join((dest, fmt))
+            dest += suffix
             LOG.info("Setting outfile to %s", dest)
 
             # make the dataset_file name, always format as turtle
             self.datasetfile = '/'.join(
-                (self.outdir, self.name + '_dataset.ttl'))
+                (self.outdir, self.name + '_dataset.ttl' + suffix))
             LOG.info("Setting dataset file to %s", self.datasetfile)
 
             if self.dataset is not None and self.dataset.version is None:
@@ -200,14 +301,19 @@ class Source:
             stream = 'stdout'
 
         gu = GraphUtils(None)
+        self.outfiles = [self.datasetfile]
 
         # the  _dataset description is always turtle
-        gu.write(self.dataset.getGraph(), 'turtle', file=self.datasetfile)
+        gu.write(
+            self.dataset.getGraph(), 'turtle', file=self.datasetfile,
+            **compress_args)
 
         if self.testMode:
             # unless we stop hardcoding, the test dataset is always turtle
-            LOG.info("Setting testfile to %s", self.testfile)
-            gu.write(self.testgraph, 'turtle', file=self.testfile)
+            testfile = self.testfile + suffix
+            LOG.info("Setting testfile to %s", testfile)
+            gu.write(self.testgraph, 'turtle', file=testfile, **compress_args)
+            self.outfiles.append(testfile)
 
         # print graph out
         if stream is None:
@@ -218,7 +324,69 @@ class Source:
             LOG.error("I don't understand our stream.")
             return
 
-        gu.write(self.graph, fmt, file=f)
+        if shards is not None:
+            self._write_shards(shards, **compress_args)
+        elif self.graph_type == 'streamed_graph':
+            if f is not None:
+                self.outfiles.append(f)
+                LOG.info("Writing unique triples to %s", f)
+                self.graph.file_handle = compression.open_output(
+                    f, compress, compress_level, block_size, text=True)
+            self.graph.finalize()
+            if f is not None:
+                self.graph.file_handle.close()
+                self.graph.file_handle = None
+        else:
+            if f is not None:
+                self.outfiles.append(f)
+            gu.write(
+                self.graph, fmt, file=f, workers=write_workers,
+                **compress_args)
+
+        # after the output, which is when a StreamedGraph counts its triples
+        if self.name is not None:
+            GraphUtils.write_predicate_stats(
+                self.graph,
+                '/'.join((self.outdir, self.name + '_predicates.tsv')))
+        return
+
+    def _write_shards(
+            self, shards, compress=None, compress_level=None, block_size=None):
+        """
+        Partition the graph by subject into ntriple shards
+        and write a manifest describing them
+        :param shards: int number of files
+        :return: None
+        """
+        pattern = '/'.join((self.outdir, self.name + '_{:03d}.nt')) + \
+            compression.extension(compress)
+        LOG.info("Writing %d shards to %s", shards, pattern)
+        writer = ShardWriter(
+            pattern, shards, compress, compress_level, block_size)
+
+        if self.graph_type == 'streamed_graph':
+            self.graph.file_handle = writer
+            self.graph.finalize()
+            self.graph.file_handle = None
+        else:
+            GraphUtils.write_nt_shards(self.graph, writer)
+        writer.close()
+
+        manifest = {
+            'source': self.name,
+            'format': 'nt',
+            'compression': compress,
+            'shards': [{
+                'file': os.path.basename(path),
+                'triples': count,
+                'md5': self.get_file_md5(self.outdir, os.path.basename(path))
+            } for path, count in zip(writer.paths, writer.counts)]
+        }
+        manifest_file = '/'.join((self.outdir, self.name + '_manifest.json'))
+        with open(manifest_file, 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+        LOG.info("Wrote shard manifest to %s", manifest_file)
+        self.outfiles.append(manifest_file)
         return
 
     def whoami(self):
@@ -275,7 +443,9 @@ class Source:
         if headers is None:
             headers = self._get_default_request_headers()
 
-        req = urllib.request.Request(remote, headers=headers)
+        # only the headers are needed
+        method = 'HEAD' if remote.startswith('http') else None
+        req = urllib.request.Request(remote, headers=headers, method=method)
         LOG.debug("Request header: %s", str(req.header_items()))
 
         response = urllib.request.urlopen(req)
@@ -326,6 +496,9 @@ class Source:
         Given a set of files for this source, it will go fetch them, and
         set a default version by date.  If you need to set the version number
         by another method, then it can be set again.
+        Up to fetch_workers files are downloaded at once
+        (no more than fetch_per_host from any one server),
+        each is retried with backoff on failure.
         :param is_dl_forced - boolean
         :param files dict - override instance files dict
         :return: None
@@ -334,12 +507,24 @@ class Source:
         st = None
         if files is None:
             files = self.files
+        start = time.time()
+        workers = max(1, min(self.fetch_workers, len(files)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self._fetch_file, files.get(fname), is_dl_forced)
+                for fname in files.keys()]
+            sizes = [future.result() for future in futures]
+        elapsed = time.time() - start
+        fetched = [size for size in sizes if size is not None]
+        self.fetched_files += len(fetched)
+        self.fetched_bytes += sum(fetched)
+        LOG.info(
+            "Fetched %d of %d files, %.1f MB in %.1f sec (%.2f MB/s)",
+            len(fetched), len(files), sum(fetched) / 2**20, elapsed,
+            sum(fetched) / 2**20 / max(elapsed, 1e-6))
+
         for fname in files.keys():
-            LOG.info("Getting %s", fname)
             filesource = files.get(fname)
-            self.fetch_from_url(
-                filesource['url'], '/'.join((self.rawdir, filesource['file'])),
-                is_dl_forced, filesource.get('headers'))
             # if the key 'clean' exists in the sources `files` dict
             # expose that instead of the longer url
             if 'clean' in filesource and filesource['clean'] is not None:
@@ -357,55 +542,582 @@ class Source:
 
         return
 
+    def _fetch_file(self, filesource, is_dl_forced):
+        """
+        Fetch one entry of a `files` dict while holding one of its host's
+        slots, retrying after fetch_backoff, 2*fetch_backoff ... sec.
+        Client errors (http 4xx) are not retried.
+        :param filesource: dict with 'url', 'file' and maybe 'headers'
+        :return: int bytes downloaded, None if the local file was up to date
+        """
+        remotefile = filesource['url']
+        localfile = '/'.join((self.rawdir, filesource['file']))
+        LOG.info("Getting %s", localfile)
+        slot = self._host_slot(remotefile)
+        delay = self.fetch_backoff
+        attempt = 1
+        while True:
+            start = time.time()
+            try:
+                with slot:
+                    response = self.fetch_from_url(
+                        remotefile, localfile, is_dl_forced,
+                        filesource.get('headers'), filesource.get('md5'))
+                break
+            except Exception as e:  # URLError, timeouts, short downloads
+                if attempt >= self.fetch_retries or (
+                        isinstance(e, HTTPError) and e.code < 500):
+                    raise
+                LOG.warning(
+                    "Attempt %d to fetch %s failed (%s), retrying in %d sec",
+                    attempt, remotefile, e, delay)
+                time.sleep(delay)
+                delay *= 2
+                attempt += 1
+
+        if response is None:
+            return None
+        size = os.stat(localfile)[ST_SIZE]
+        LOG.info(
+            "Fetched %s: %d bytes in %.1f sec",
+            remotefile, size, time.time() - start)
+        return size
+
+    def _host_slot(self, url):
+        """
+        :return: the semaphore limiting concurrent downloads from url's host
+        """
+        host = urlparse(url).netloc
+        if Source.host_slots is not None:
+            return Source.host_slots[
+                zlib.crc32(host.encode('utf-8')) % len(Source.host_slots)]
+        with Source._host_lock:
+            slot = Source._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.fetch_per_host)
+                Source._host_slots[host] = slot
+        return slot
+
     def fetch_from_url(
             self, remotefile, localfile=None, is_dl_forced=False,
-            headers=None):
+            headers=None, md5=None):
         """
         Given a remote url and a local filename, attempt to determine
         if the remote file is newer; if it is,
         fetch the remote file and save it to the specified localfile,
         reporting the basic file information once it is downloaded
+
+        The ETag, Last-Modified and size of each download are kept in
+        raw/<source>/fetch_metadata.json; a file fetched before is checked
+        with a single conditional GET that only returns a body if it changed,
+        and the recorded size is what the downloaded file is checked against.
+
+        Downloads go to <localfile>.part, which is moved into the
+        content addressed store raw/.blobs/ once its size (and md5, when
+        given) is verified; localfile is then a symlink to the blob, so a
+        file used by several sources is stored, and fetched, only once.
+        An interrupted download is continued from where it stopped,
+        with an http Range request or ftp REST, as long as the remote
+        file has not changed.
         :param remotefile: URL of remote file to fetch
         :param localfile: pathname of file to save locally
-        :return: None
+        :param md5: str expected hex md5 of the file, if known
+        :return: the response if the file was downloaded, else None
 
         """
         # The 'file' dict in the ingest script is where 'headers' may be found
         # e.g.  OMIM.py has:  'headers': {'User-Agent': 'Mozilla/5.0'}
+        if headers is None:
+            headers = self._get_default_request_headers()
+        headers = dict(headers)
+
+        url = remotefile
+        if self.fetch_mode == 'replay':
+            url = self._fixture_server().url_for(remotefile)
+
+        meta = None
+        if localfile is not None and is_dl_forced is not True:
+            # what we, or another source, last downloaded from this url
+            meta = self._get_fetch_metadata(remotefile) or \
+                self._get_shared_metadata(remotefile)
+            if meta is not None and (
+                    meta['md5'] is None or
+                    not os.path.exists(self._blob_path(meta['md5'])) or
+                    not (meta['etag'] or meta['last_modified'])):
+                meta = None
+            if url.startswith('ftp'):
+                if self._ftp_unchanged(remotefile, localfile, meta):
+                    LOG.info("Using existing file %s", localfile)
+                    if meta is not None:
+                        self._use_blob(remotefile, localfile, meta)
+                    self._record(remotefile, localfile)
+                    return None
+            elif meta is not None:
+                if meta['etag'] is not None:
+                    headers['If-None-Match'] = meta['etag']
+                if meta['last_modified'] is not None:
+                    headers['If-Modified-Since'] = meta['last_modified']
+            elif os.path.exists(localfile) and not self.checkIfRemoteIsNewer(
+                    url, localfile, headers):
+                LOG.info("Using existing file %s", localfile)
+                self._record(remotefile, localfile)
+                return None
+
+        LOG.info("Fetching from %s", remotefile)
+        # TODO url verification, etc
+        if localfile is None:
+            request = urllib.request.Request(url, headers=headers)
+            return urllib.request.urlopen(request)
+
+        part = localfile + '.part'
+        if url.startswith('ftp'):
+            (response, size, checksum) = self._fetch_ftp(remotefile, part)
+        else:
+            download = self._fetch_http(remotefile, part, headers, url)
+            if download is None:
+                LOG.info("Not modified, using existing file %s", localfile)
+                self._use_blob(remotefile, localfile, meta)
+                self._record(remotefile, localfile)
+                return None
+            (response, size, checksum) = download
+
+        if md5 is not None and checksum != md5:
+            os.remove(part)
+            self._update_fetch_metadata(remotefile, partial=None)
+            raise Exception(
+                "Error when downloading files: md5 of {} is {} not {}".format(
+                    remotefile, checksum, md5))
+        self._store_blob(part, checksum)
+        self._link_blob(checksum, localfile)
+        LOG.info("Finished.  Wrote file to %s", localfile)
+        meta = self._get_fetch_metadata(remotefile)
+        self._update_fetch_metadata(
+            remotefile, file=os.path.basename(localfile),
+            etag=meta['partial']['etag'],
+            last_modified=meta['partial']['last_modified'],
+            size=size, md5=checksum,
+            fetched=datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            partial=None)
+        self._set_shared_metadata(remotefile, self._get_fetch_metadata(
+            remotefile))
+        self._record(remotefile, localfile)
+        st = os.stat(localfile)
+        LOG.info("file size: %s", st[ST_SIZE])
+        LOG.info("file created: %s", time.asctime(time.localtime(st[ST_CTIME])))
 
-        response = None
-        if ((is_dl_forced is True) or localfile is None or
-                (self.checkIfRemoteIsNewer(remotefile, localfile, headers))):
-            LOG.info("Fetching from %s", remotefile)
-            # TODO url verification, etc
-            if headers is None:
-                headers = self._get_default_request_headers()
+        return response
 
-            request = urllib.request.Request(remotefile, headers=headers)
+    def _fetch_http(self, remotefile, part, headers, url=None):
+        """
+        Download remotefile into part, continuing an earlier partial download
+        when the server still has the same file (If-Range).
+        Large files are fetched as range_workers parallel ranges
+        when the server accepts ranges.
+        :param url: where to request it from, if not remotefile itself
+        :return: tuple of the response, size and md5 of the file,
+                 or None if the server answered 304 Not Modified
+        """
+        if url is None:
+            url = remotefile
+        partial = (self._get_fetch_metadata(remotefile) or {}).get('partial')
+        offset = 0
+        if os.path.exists(part) and partial is not None and (
+                partial['etag'] or partial['last_modified']):
+            offset = os.path.getsize(part)
+            headers['Range'] = 'bytes={}-'.format(offset)
+            headers['If-Range'] = partial['etag'] or partial['last_modified']
+
+        request = urllib.request.Request(url, headers=headers)
+        try:
             response = urllib.request.urlopen(request)
+        except HTTPError as e:
+            if e.code == 304:
+                self._remove_parts(part)
+                return None
+            if e.code == 416 and offset > 0:
+                # the partial file is not a prefix of the remote one
+                LOG.warning("Can not resume %s, starting over", remotefile)
+                os.remove(part)
+                del headers['Range']
+                del headers['If-Range']
+                return self._fetch_http(remotefile, part, headers, url)
+            raise
+
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')}
+        total = response.headers.get('Content-Length')
+        md5 = hashlib.md5()
+        if response.getcode() == 206:
+            LOG.info("Resuming %s at byte %d", remotefile, offset)
+            content_range = response.headers.get('Content-Range', '')
+            total = content_range.split('/')[-1]
+            total = None if total in ('', '*') else int(total)
+            with open(part, 'rb') as fd:
+                for chunk in iter(lambda: fd.read(CHUNK), b''):
+                    md5.update(chunk)
+            mode = 'ab'
+        else:
+            offset = 0
+            total = None if total is None else int(total)
+            if partial != validators:
+                self._remove_parts(part)
+            mode = 'wb'
+        self._update_fetch_metadata(remotefile, partial=validators)
+
+        if response.getcode() == 200 and self.range_workers > 1 and \
+                total is not None and total >= 2 * RANGE_CHUNK and \
+                response.headers.get('Accept-Ranges') == 'bytes' and \
+                (validators['etag'] or validators['last_modified']):
+            response.close()
+            self._fetch_ranges(
+                url, part, headers, total,
+                validators['etag'] or validators['last_modified'], md5)
+        else:
+            with open(part, mode) as fd:
+                for chunk in iter(lambda: response.read(CHUNK), b''):
+                    fd.write(chunk)
+                    md5.update(chunk)
+
+        size = self.get_local_file_size(part)
+        if total is not None and size != total:
+            LOG.error(
+                'local file and remote file different sizes\n'
+                '%s has size %s, %s has size %s',
+                part, size, remotefile, total)
+            raise Exception(
+                "Error when downloading files: local file size " +
+                "does not match remote file size")
+        return (response, size, md5.hexdigest())
 
-            if localfile is not None:
-                with open(localfile, 'wb') as fd:
-                    while True:
-                        chunk = response.read(CHUNK)
-                        if not chunk:
-                            break
+    def _fetch_ranges(self, url, part, headers, total, validator, md5):
+        """
+        Fetch RANGE_CHUNK sized ranges of a file in parallel,
+        each into its own <part>.<n> file (kept and continued if interrupted),
+        then join them into part
+        """
+        ranges = [
+            (start, min(start + RANGE_CHUNK, total) - 1)
+            for start in range(0, total, RANGE_CHUNK)]
+        LOG.info(
+            "Fetching %s as %d ranges, %d at a time",
+            url, len(ranges), self.range_workers)
+
+        def fetch_range(i):
+            (start, end) = ranges[i]
+            chunk_file = '{}.{}'.format(part, i)
+            have = 0
+            if os.path.exists(chunk_file):
+                have = os.path.getsize(chunk_file)
+            if have == end - start + 1:
+                return
+            range_headers = dict(headers)
+            range_headers['Range'] = 'bytes={}-{}'.format(start + have, end)
+            range_headers['If-Range'] = validator
+            response = urllib.request.urlopen(
+                urllib.request.Request(url, headers=range_headers))
+            if response.getcode() != 206:
+                response.close()
+                raise Exception(
+                    "{} changed while it was downloaded".format(url))
+            with open(chunk_file, 'ab') as fd:
+                for chunk in iter(lambda: response.read(CHUNK), b''):
+                    fd.write(chunk)
+
+        with ThreadPoolExecutor(max_workers=self.range_workers) as pool:
+            for result in pool.map(fetch_range, range(len(ranges))):
+                pass
+
+        with open(part, 'wb') as fd:
+            for i in range(len(ranges)):
+                chunk_file = '{}.{}'.format(part, i)
+                with open(chunk_file, 'rb') as chunk_fd:
+                    for chunk in iter(lambda: chunk_fd.read(2**20), b''):
                         fd.write(chunk)
+                        md5.update(chunk)
+                os.remove(chunk_file)
+
+    def _ftp_unchanged(self, remotefile, localfile, meta=None):
+        """
+        Compare an ftp file's size and modification time (MLST or MDTM)
+        with those recorded when it was downloaded (meta),
+        or else with the local file
+        :return: True if there is no need to download it again
+        """
+        url = urlparse(remotefile)
+        with self.ftp_pool.connection(
+                url.hostname, url.username, url.password) as ftp:
+            remote = FTPPool.stat(ftp, url.path)
+        if meta is not None:
+            return remote['size'] == meta['size'] and \
+                remote['modify'] == meta['last_modified']
+        if not os.path.exists(localfile):
+            return False
+        st = os.stat(localfile)
+        if remote['size'] is not None and remote['size'] != st[ST_SIZE]:
+            LOG.info("Object on server is difference size to local file")
+            return False
+        if remote['modify'] is not None and datetime.strptime(
+                remote['modify'], '%Y%m%d%H%M%S') > \
+                datetime.utcfromtimestamp(st[ST_CTIME]):
+            LOG.info("New Remote file exists")
+            return False
+        return True
+
+    def _fetch_ftp(self, remotefile, part):
+        """
+        Download an ftp url into part over a pooled connection,
+        continuing a partial file with REST
+        when the remote file's size and modification time are unchanged.
+        :return: tuple of the server's reply, size and md5 of the file
+        """
+        url = urlparse(remotefile)
+        with self.ftp_pool.connection(
+                url.hostname, url.username, url.password) as ftp:
+            remote = FTPPool.stat(ftp, url.path)
+            total = remote['size']
+            validators = {'etag': None, 'last_modified': remote['modify']}
+            partial = (
+                self._get_fetch_metadata(remotefile) or {}).get('partial')
+            md5 = hashlib.md5()
+            offset = 0
+            if os.path.exists(part) and partial == validators:
+                offset = os.path.getsize(part)
+                LOG.info("Resuming %s at byte %d", remotefile, offset)
+                with open(part, 'rb') as fd:
+                    for chunk in iter(lambda: fd.read(CHUNK), b''):
+                        md5.update(chunk)
+            self._update_fetch_metadata(remotefile, partial=validators)
+
+            def write(chunk):
+                fd.write(chunk)
+                md5.update(chunk)
+
+            with open(part, 'ab' if offset else 'wb') as fd:
+                reply = ftp.retrbinary(
+                    'RETR ' + url.path, write, blocksize=CHUNK,
+                    rest=offset or None)
+
+        size = self.get_local_file_size(part)
+        if total is not None and size != total:
+            raise Exception(
+                "Error when downloading files: local file size " +
+                "does not match remote file size")
+        return (reply, size, md5.hexdigest())
 
-                LOG.info("Finished.  Wrote file to %s", localfile)
-                if self.compare_local_remote_bytes(remotefile, localfile, headers):
-                    LOG.debug("local file is same size as remote after download")
-                else:
-                    raise Exception(
-                        "Error when downloading files: local file size " +
-                        "does not match remote file size")
-                st = os.stat(localfile)
-                LOG.info("file size: %s", st[ST_SIZE])
-                LOG.info("file created: %s", time.asctime(time.localtime(st[ST_CTIME])))
+    @staticmethod
+    def _remove_parts(part):
+        for stale in glob.glob(glob.escape(part) + '*'):
+            os.remove(stale)
+
+    def _blob_path(self, checksum):
+        return os.path.join(self.blob_dir, checksum[:2], checksum)
+
+    def _store_blob(self, path, checksum):
+        """
+        Move a verified download into the blob store,
+        dropping it if the same content is already there
+        """
+        blob = self._blob_path(checksum)
+        if os.path.exists(blob):
+            os.remove(path)
         else:
-            LOG.info("Using existing file %s", localfile)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            shutil.move(path, blob)
+        return blob
 
-        return response
+    def _record(self, remotefile, localfile):
+        """
+        In record mode, save the file fetched from remotefile as a fixture
+        """
+        if self.fetch_mode == 'record':
+            from dipper.utils.FixtureServer import FixtureServer
+            FixtureServer.record(
+                self.fixture_dir, remotefile, localfile,
+                self._get_fetch_metadata(remotefile) or {})
+
+    @staticmethod
+    def _fixture_server():
+        """
+        :return: the FixtureServer replaying Source.fixture_dir
+        """
+        if Source._replay_server is None or \
+                Source._replay_server.fixture_dir != Source.fixture_dir:
+            from dipper.utils.FixtureServer import FixtureServer
+            Source._replay_server = FixtureServer(Source.fixture_dir)
+        return Source._replay_server
+
+    def _use_blob(self, remotefile, localfile, meta):
+        """
+        The remote file is the one recorded in meta (ours or another
+        source's), link localfile to its blob and record it as ours
+        """
+        self._link_blob(meta['md5'], localfile)
+        self._update_fetch_metadata(
+            remotefile, file=os.path.basename(localfile),
+            **{key: meta[key] for key in BLOB_FIELDS})
+
+    def _link_blob(self, checksum, localfile):
+        """
+        Point localfile at a blob, replacing whatever file is there
+        """
+        blob = self._blob_path(checksum)
+        if os.path.islink(localfile) and \
+                os.path.realpath(localfile) == os.path.realpath(blob):
+            return
+        link = localfile + '.link'
+        # left by an interrupted run, copyfile() would write through it
+        if os.path.lexists(link):
+            os.remove(link)
+        try:
+            os.symlink(
+                os.path.relpath(blob, os.path.dirname(localfile)), link)
+        except NotImplementedError:  # no symlinks here
+            shutil.copyfile(blob, link)
+        except OSError as err:
+            if err.errno not in (errno.EPERM, errno.EOPNOTSUPP):
+                raise
+            shutil.copyfile(blob, link)
+        os.replace(link, localfile)
+
+    def _shared_metadata_file(self, remotefile):
+        return os.path.join(
+            self.blob_dir, 'urls',
+            hashlib.sha1(remotefile.encode('utf-8')).hexdigest() + '.json')
+
+    def _get_shared_metadata(self, remotefile):
+        """
+        :return: dict of what any source last downloaded from remotefile
+        """
+        shared_file = self._shared_metadata_file(remotefile)
+        if not os.path.exists(shared_file):
+            return None
+        with open(shared_file) as fh:
+            return json.load(fh)
+
+    def _set_shared_metadata(self, remotefile, meta):
+        shared_file = self._shared_metadata_file(remotefile)
+        os.makedirs(os.path.dirname(shared_file), exist_ok=True)
+        # replaced atomically, other processes may be reading it
+        with open(shared_file + '.tmp', 'w') as fh:
+            json.dump(
+                {key: meta[key] for key in BLOB_FIELDS}, fh, sort_keys=True)
+        os.replace(shared_file + '.tmp', shared_file)
+
+    def build_state(self, options=None):
+        """
+        What the output of this source is made from: the md5 of each
+        file of self.files (as fetched, else read here), the md5 of all
+        of the dipper package, of the source's module (which may live
+        elsewhere) and of its translation tables, and the options it is
+        run with
+        :param options: dict of the options that change the output
+        :return: dict
+        """
+        inputs = {}
+        for filesource in self.files.values():
+            meta = self._get_fetch_metadata(filesource['url']) or {}
+            md5 = meta.get('md5')
+            localfile = '/'.join((self.rawdir, filesource['file']))
+            if md5 is None and os.path.exists(localfile):
+                md5 = self.get_file_md5(self.rawdir, filesource['file'])
+            inputs[filesource['url']] = md5
+        code = {'dipper': self.package_md5()}
+        for path in (
+                inspect.getfile(type(self)),
+                'translationtable/GLOBAL_TERMS.yaml',
+                'translationtable/' + self.name + '.yaml'):
+            if os.path.exists(path):
+                code[path] = self.get_file_md5(*os.path.split(path))
+        return {
+            'inputs': inputs,
+            'code': code,
+            'options': options or {}
+        }
+
+    @staticmethod
+    def package_md5():
+        """
+        The md5 of every file of the dipper package (models, graphs,
+        utils, sources, curie map ...), read once per process, so that
+        a change to any of them is a change of code to build_state()
+        :return: str
+        """
+        if Source._package_md5 is None:
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            digest = hashlib.md5()
+            for (dirpath, dirnames, filenames) in os.walk(root):
+                dirnames[:] = sorted(
+                    name for name in dirnames if name != '__pycache__')
+                for name in sorted(filenames):
+                    if name.endswith(('.pyc', '.pyo')):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    digest.update(os.path.relpath(path, root).encode('utf-8'))
+                    with open(path, 'rb') as fh:
+                        digest.update(fh.read())
+            Source._package_md5 = digest.hexdigest()
+        return Source._package_md5
+
+    def _build_state_file(self):
+        return '/'.join((self.outdir, self.name + '_build.json'))
+
+    def output_current(self, options=None):
+        """
+        True if the last output written was made from the same inputs,
+        code and options as now, and is all still there, like make
+        :param options: dict, see build_state()
+        :return: bool
+        """
+        state_file = self._build_state_file()
+        if not self.files or not os.path.exists(state_file):
+            return False
+        with open(state_file) as fh:
+            built = json.load(fh)
+        state = self.build_state(options)
+        if None in state['inputs'].values():
+            return False
+        outputs = built.pop('outputs', [])
+        return built == json.loads(json.dumps(state)) and all(
+            os.path.exists(path) for path in outputs)
+
+    def record_build(self, options=None):
+        """
+        Save the build state of the output just written by write()
+        :param options: dict, see build_state()
+        """
+        state = self.build_state(options)
+        state['outputs'] = self.outfiles
+        with open(self._build_state_file() + '.tmp', 'w') as fh:
+            json.dump(state, fh, indent=1, sort_keys=True)
+        os.replace(self._build_state_file() + '.tmp', self._build_state_file())
+
+    def _fetch_metadata_file(self):
+        return '/'.join((self.rawdir, 'fetch_metadata.json'))
+
+    def _get_fetch_metadata(self, remotefile):
+        """
+        :return: dict of what was recorded when remotefile was last
+                 downloaded (file, etag, last_modified, size, md5, fetched)
+                 and a download in progress (partial), or None
+        """
+        with self._fetch_metadata_lock:
+            if self._fetch_metadata is None:
+                metadata_file = self._fetch_metadata_file()
+                self._fetch_metadata = {}
+                if os.path.exists(metadata_file):
+                    with open(metadata_file) as fh:
+                        self._fetch_metadata = json.load(fh)
+            return self._fetch_metadata.get(remotefile)
+
+    def _update_fetch_metadata(self, remotefile, **fields):
+        self._get_fetch_metadata(remotefile)
+        with self._fetch_metadata_lock:
+            meta = self._fetch_metadata.setdefault(
+                remotefile, dict.fromkeys(('file',) + BLOB_FIELDS))
+            meta.update(fields)
+            with open(self._fetch_metadata_file(), 'w') as fh:
+                json.dump(self._fetch_metadata, fh, indent=1, sort_keys=True)
 
     def process_xml_table(self, elem, table_name, processing_function, limit):
         """
@@ -651,10 +1363,8 @@ class Source:
     def remove_backslash_r(filename, encoding):
         """
         A helpful utility to remove Carriage Return from any file.
-        This will read a file into memory,
-        and overwrite the contents of the original file.
-
-        TODO: This function may be a liability
+        The file is streamed through a temporary file
+        which then replaces the original.
 
         :param filename:
 
@@ -662,16 +1372,20 @@ class Source:
 
         """
 
-        f = open(filename, 'r', encoding=encoding, newline=r'\n')
-        contents = f.read()
-        f.close()
-        contents = re.sub(r'\r', '', contents)
-        with open(filename, "w") as f:
-            f.truncate()
-            f.write(contents)
+        scrub.rewrite(filename, [scrub.strip_cr], encoding)
 
         return
 
+    def scrubbed_lines(self, key, fh):
+        """
+        The lines of an open raw file with the scrubs declared
+        for it in self.scrubs applied as they are read
+        :param key: str key of the file in self.files
+        :param fh: open file
+        :return: generator of str
+        """
+        return scrub.lines(fh, self.scrubs.get(key))
+
     @staticmethod
     def open_and_parse_yaml(file):
         """
@@ -681,9 +1395,7 @@ class Source:
         """
         map = dict()
         if os.path.exists(os.path.join(os.path.dirname(__file__), file)):
-            map_file = open(os.path.join(os.path.dirname(__file__), file), 'r')
-            map = yaml.load(map_file)
-            map_file.close()
+            map = yaml_cache.load(os.path.join(os.path.dirname(__file__), file))
         else:
             LOG.warn("file: {0} not found".format(file))
 
@@ -733,8 +1445,7 @@ class Source:
             with open(localtt_file, 'w') as fh:
                 yaml.dump({name: name}, fh)
         finally:
-            with open(localtt_file, 'r') as fh:
-                localtt = yaml.safe_load(fh)
+            localtt = yaml_cache.load(localtt_file)
 
         # inverse local translation.
         # note: keeping this invertable will be work.
@@ -1,11 +1,11 @@
 import re
-import gzip
 import logging
 from dipper.sources.Source import Source
 from dipper.sources.Monochrom import Monochrom, getChrPartTypeByNotation
 from dipper.models.GenomicFeature import Feature, makeChromID, makeChromLabel
 from dipper.models.Genotype import Genotype
 from dipper.models.Model import Model
+from dipper.utils import compression
 
 
 logger = logging.getLogger(__name__)
@@ -238,10 +238,10 @@ class UCSCBands(Source):
         geno.addReferenceGenome(build_id, build_num, taxon_id)
 
         # process the bands
-        with gzip.open(myfile, 'rb') as f:
+        with compression.open_input(myfile) as f:
             for line in f:
                 # skip comments
-                line = line.decode().strip()
+                line = line.strip()
                 if re.match('^#', line):
                     continue
 
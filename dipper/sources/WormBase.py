@@ -3,7 +3,6 @@ import re
 import logging
 import gzip
 import io
-from ftplib import FTP
 from dipper.sources.Source import Source
 from dipper.models.Genotype import Genotype
 from dipper.models.assoc.G2PAssoc import G2PAssoc
@@ -132,13 +131,11 @@ class WormBase(Source):
         # connect to wormbase ftp
         current_dev_release_dir = \
             'pub/wormbase/releases/current-production-release'
-        ftp = FTP('ftp.wormbase.org')
-        ftp.login()
-        ftp.cwd(current_dev_release_dir)
-        # the current release dir is a redirect to a versioned release.
-        # pull that from the pwd.
-        pwd = ftp.pwd()
-        ftp.quit()
+        with self.ftp_pool.connection('ftp.wormbase.org') as ftp:
+            ftp.cwd(current_dev_release_dir)
+            # the current release dir is a redirect to a versioned release.
+            # pull that from the pwd.
+            pwd = ftp.pwd()
         wsver = re.search(r'releases\/(WS\d+)', pwd)
         if wsver is None or len(wsver.groups()) < 1:
             logger.error(
@@ -3,7 +3,8 @@ import re
 import logging
 from intermine.webservice import Service
 
-from dipper.utils import pysed
+from dipper.utils import scrub
+from dipper.utils import tsv
 from dipper.sources.Source import Source
 from dipper.models.assoc.Association import Assoc
 from dipper.models.Genotype import Genotype
@@ -143,6 +144,15 @@ class ZFIN(Source):
 
     }
 
+    # oddities where there are "\" instead of empty strings,
+    # 2017 May  see two lines with trailing baclslash in genbank.txt
+    scrubs = {
+        'geno': [scrub.sub(r'\\', '')]
+        # pubs has control characters!
+        # not detecting any onntrol chars in pubs 2017 May
+        # 'pubs': [scrub.strip_cr]
+    }
+
     # I do not love putting these here; but I don't know where else to put them
     test_ids = {
         "genotype": [
@@ -308,34 +318,11 @@ class ZFIN(Source):
         # fetch all the files
         # zfin versions are set by the date of download.
         self.get_files(is_dl_forced)
-        self.scrub()
 
         self.get_orthology_sources_from_zebrafishmine()
 
         return
 
-    def scrub(self):
-        """
-        Perform various data-scrubbing on the raw data files prior to parsing.
-        For this resource, this currently includes:
-        * remove oddities where there are "\" instead of empty strings
-        :return: None
-
-        """
-
-        # scrub file of the oddities
-        # where there are "\" instead of empty strings
-        # 2017 May  see two lines with trailing baclslash in genbank.txt
-        pysed.replace(
-            "\\\\", '', '/'.join((self.rawdir, self.files['geno']['file'])))
-
-        # pubs has control characters!
-        # not detecting any onntrol chars in pubs 2017 May
-        # self.remove_backslash_r(
-        #    '/'.join((self.rawdir, self.files['pubs']['file'])), 'latin-1')
-
-        return
-
     def parse(self, limit=None):
         if limit is not None:
             logger.info("Only parsing first %s rows of each file", limit)
@@ -687,7 +674,9 @@ class ZFIN(Source):
         line_counter = 0
         geno = Genotype(graph)
         with open(raw, 'r', encoding="utf8") as csvfile:
-            filereader = csv.reader(csvfile, delimiter='\t', quotechar='\"')
+            filereader = csv.reader(
+                self.scrubbed_lines('geno', csvfile),
+                delimiter='\t', quotechar='\"')
             for row in filereader:
                 line_counter += 1
 
@@ -1195,23 +1184,18 @@ class ZFIN(Source):
             graph = self.graph
         model = Model(graph)
         logger.info("Processing stages")
-        line_counter = 0
         raw = '/'.join((self.rawdir, self.files['stage']['file']))
-        with open(raw, 'r', encoding="iso-8859-1") as csvfile:
-            filereader = csv.reader(csvfile, delimiter='\t', quotechar='\"')
-            for row in filereader:
-                line_counter += 1
-                (stage_id, stage_obo_id, stage_name, begin_hours, end_hours
-                 # ,empty  # till next time
-                 ) = row
-
-                # Add the stage as a class, and it's obo equivalent
-                stage_id = 'ZFIN:' + stage_id.strip()
-                model.addClassToGraph(stage_id, stage_name)
-                model.addEquivalentClass(stage_id, stage_obo_id)
-
-                if not self.testMode and limit is not None and line_counter > limit:
-                    break
+        for row in tsv.rows(
+                raw, columns=['stage_id', 'stage_obo_id', 'stage_name',
+                              'begin_hours', 'end_hours'],
+                select=['stage_id', 'stage_obo_id', 'stage_name'],
+                limit=None if self.testMode else limit,
+                encoding="iso-8859-1"):
+
+            # Add the stage as a class, and it's obo equivalent
+            stage_id = 'ZFIN:' + row.stage_id.strip()
+            model.addClassToGraph(stage_id, row.stage_name)
+            model.addEquivalentClass(stage_id, row.stage_obo_id)
 
         logger.info("Done with stages")
         return
@@ -2259,34 +2243,27 @@ class ZFIN(Source):
             graph = self.testgraph
         else:
             graph = self.graph
-        line_counter = 0
         model = Model(graph)
         geno = Genotype(graph)
         raw = '/'.join((self.rawdir, self.files['uniprot']['file']))
-        with open(raw, 'r', encoding="iso-8859-1") as csvfile:
-            filereader = csv.reader(csvfile, delimiter='\t', quotechar='\"')
-            for row in filereader:
-                line_counter += 1
-
-                (gene_id, gene_so_id, gene_symbol, uniprot_id
-                 # , empty
-                 ) = row
-
-                if self.testMode and gene_id not in self.test_ids['gene']:
-                    continue
-
-                gene_id = 'ZFIN:' + gene_id.strip()
-                uniprot_id = 'UniProtKB:' + uniprot_id.strip()
-
-                geno.addGene(gene_id, gene_symbol)
-                # TODO: Abstract to one of the model utilities
-                model.addIndividualToGraph(
-                    uniprot_id, None, self.globaltt['polypeptide'])
-                graph.addTriple(
-                    gene_id, self.globaltt['has gene product'], uniprot_id)
-
-                if not self.testMode and limit is not None and line_counter > limit:
-                    break
+        for row in tsv.rows(
+                raw, columns=['gene_id', 'gene_so_id', 'gene_symbol',
+                              'uniprot_id'],
+                select=['gene_id', 'gene_symbol', 'uniprot_id'],
+                where={'gene_id': self.test_ids['gene']}
+                if self.testMode else None,
+                limit=None if self.testMode else limit,
+                encoding="iso-8859-1"):
+
+            gene_id = 'ZFIN:' + row.gene_id.strip()
+            uniprot_id = 'UniProtKB:' + row.uniprot_id.strip()
+
+            geno.addGene(gene_id, row.gene_symbol)
+            # TODO: Abstract to one of the model utilities
+            model.addIndividualToGraph(
+                uniprot_id, None, self.globaltt['polypeptide'])
+            graph.addTriple(
+                gene_id, self.globaltt['has gene product'], uniprot_id)
 
         logger.info("Done with UniProt IDs")
         return
@@ -2320,45 +2297,40 @@ class ZFIN(Source):
             graph = self.graph
 
         logger.info("Processing human orthos")
-        line_counter = 0
         geno = Genotype(graph)
         # model = Model(graph)  # unused
         raw = '/'.join((self.rawdir, self.files['human_orthos']['file']))
-        with open(raw, 'r', encoding="iso-8859-1") as csvfile:
-            filereader = csv.reader(csvfile, delimiter='\t', quotechar='\"')
-            for row in filereader:
-                line_counter += 1
-                (zfin_id, zfin_symbol, zfin_name, human_symbol, human_name,
-                 omim_id, gene_id, hgnc_id, evidence_code, pub_id
-                 # , empty
-                 ) = row
-                if self.testMode and zfin_id not in self.test_ids['gene']:
-                    continue
-
-                # Add the zebrafish gene.
-                zfin_id = 'ZFIN:' + zfin_id.strip()
-                geno.addGene(zfin_id, zfin_symbol, None, zfin_name)
-
-                # Add the human gene.
-                gene_id = 'NCBIGene:' + gene_id.strip()
-                geno.addGene(gene_id, human_symbol, None, human_name)
-
-                # make the association
-                assoc = OrthologyAssoc(graph, self.name, zfin_id, gene_id)
-                # we don't know anything about the orthology type,
-                # so we just use the default
-
-                if re.match(r'ZDB', pub_id):
-                    assoc.add_source('ZFIN:'+pub_id)
-
-                eco_id = self.get_orthology_evidence_code(evidence_code)
-                if eco_id is not None:
-                    assoc.add_evidence(eco_id)
-
-                assoc.add_association_to_graph()
-
-                if not self.testMode and limit is not None and line_counter > limit:
-                    break
+        for row in tsv.rows(
+                raw, columns=['zfin_id', 'zfin_symbol', 'zfin_name',
+                              'human_symbol', 'human_name', 'omim_id',
+                              'gene_id', 'hgnc_id', 'evidence_code',
+                              'pub_id'],
+                where={'zfin_id': self.test_ids['gene']}
+                if self.testMode else None,
+                limit=None if self.testMode else limit,
+                encoding="iso-8859-1"):
+
+            # Add the zebrafish gene.
+            zfin_id = 'ZFIN:' + row.zfin_id.strip()
+            geno.addGene(zfin_id, row.zfin_symbol, None, row.zfin_name)
+
+            # Add the human gene.
+            gene_id = 'NCBIGene:' + row.gene_id.strip()
+            geno.addGene(gene_id, row.human_symbol, None, row.human_name)
+
+            # make the association
+            assoc = OrthologyAssoc(graph, self.name, zfin_id, gene_id)
+            # we don't know anything about the orthology type,
+            # so we just use the default
+
+            if re.match(r'ZDB', row.pub_id):
+                assoc.add_source('ZFIN:' + row.pub_id)
+
+            eco_id = self.get_orthology_evidence_code(row.evidence_code)
+            if eco_id is not None:
+                assoc.add_evidence(eco_id)
+
+            assoc.add_association_to_graph()
 
         logger.info("Done with human orthos")
         return
@@ -0,0 +1,177 @@
+import functools
+import json
+from collections import Counter
+import logging
+import os
+import pickle
+import shutil
+
+LOG = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """
+    Resumable parses. The _process_* methods a source's parse() calls
+    are its stages; as each one finishes, what it returned, the source's
+    checkpoint_attrs (the id maps later stages look things up in) and
+    the triples of its graphs are saved in a directory of the source's
+    own. A later run of the same inputs, code and options made with
+    resume set does not run the stages saved there again but restores
+    them, and carries on from the first stage that had not finished.
+
+    Each graph saves only the triples a stage added, as a part file:
+    a StreamedGraph as sorted ntriples, merged with its other runs on
+    write, the graphs held in memory as a pickle. Only calls made while
+    no other stage is running are stages, helpers named _process_*
+    called from within one are part of it. A stage is known by its
+    method name and, when the first argument is a str (the key of a
+    file in self.files, say), by that too, as _process_orthologs:hcop.
+    """
+
+    def __init__(self, source, options=None, resume=False, directory=None):
+        """
+        :param source: Source being parsed
+        :param options: dict of the options that change the output,
+                        see Source.build_state()
+        :param resume: bool, restore the stages already saved,
+                       else start over
+        :param directory: str, default out/<source>_checkpoint
+        """
+        self.source = source
+        self.directory = directory or '/'.join(
+            (source.outdir, source.name + '_checkpoint'))
+        self.manifest = '/'.join((self.directory, 'checkpoint.json'))
+        self.build = json.loads(json.dumps(source.build_state(options)))
+        self.stages = []    # saved, in the order run
+        self.results = {}   # stage -> what it returned
+        self._calls = Counter()
+        self._depth = 0
+        self._restored = False
+        if resume:
+            self._load()
+        else:
+            self.clear()
+        os.makedirs(self.directory, exist_ok=True)
+        for graph in self._graphs().values():
+            graph.start_checkpoints()
+
+    def _load(self):
+        if not os.path.exists(self.manifest):
+            LOG.info("No checkpoint of %s to resume", self.source.name)
+            return
+        with open(self.manifest) as fh:
+            manifest = json.load(fh)
+        state = self._state_file()
+        if manifest['build'] != self.build or not manifest['stages'] or \
+                not os.path.exists(state):
+            LOG.warning(
+                "Checkpoint of %s is not of these inputs, code and options,"
+                " starting over", self.source.name)
+            self.clear()
+            return
+        with open(state, 'rb') as fh:
+            saved = pickle.load(fh)
+        if saved['stage'] != manifest['stages'][-1]:
+            # stopped while saving a stage
+            LOG.warning(
+                "Checkpoint of %s is incomplete, starting over",
+                self.source.name)
+            self.clear()
+            return
+        self.stages = manifest['stages']
+        self.results = saved['results']
+        LOG.info(
+            "Resuming %s after stage %s", self.source.name, self.stages[-1])
+
+    def clear(self):
+        """
+        Remove all that is saved
+        """
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+        self.stages = []
+        self.results = {}
+
+    def instrument(self):
+        """
+        Save or restore each stage run by the source's _process_* methods
+        """
+        for name in dir(self.source):
+            method = getattr(self.source, name)
+            if name.startswith('_process_') and callable(method):
+                setattr(self.source, name, self._staged(name, method))
+
+    def _staged(self, name, method):
+        @functools.wraps(method)
+        def staged(*args, **kwargs):
+            if self._depth:
+                return method(*args, **kwargs)
+            stage = name
+            if args and isinstance(args[0], str):
+                stage = '{}:{}'.format(name, args[0])
+            # the same call may be a stage more than once
+            self._calls[stage] += 1
+            if self._calls[stage] > 1:
+                stage = '{}#{}'.format(stage, self._calls[stage])
+            # all the saved stages at once, before the first stage,
+            # so whatever parse() runs after it sees their attrs
+            if self.stages and not self._restored:
+                self._restore()
+                self._restored = True
+            if stage in self.stages:
+                LOG.info("Skipping %s, restored from checkpoint", stage)
+                return self.results[stage]
+            self._depth += 1
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                self._depth -= 1
+            self._save(stage, result)
+            return result
+        return staged
+
+    def _graphs(self):
+        graphs = {'graph': self.source.graph}
+        if self.source.testgraph is not self.source.graph:
+            graphs['testgraph'] = self.source.testgraph
+        return graphs
+
+    def _state_file(self):
+        return '/'.join((self.directory, 'state.pickle'))
+
+    def _save(self, stage, result):
+        # graphs, then state, then the manifest naming the stage,
+        # so a stage is only ever restored once all of it is saved
+        graphs = self._graphs()
+        for (key, graph) in graphs.items():
+            graph.checkpoint('/'.join((self.directory, key)), stage)
+        self.results[stage] = result
+        state = {
+            'stage': stage,
+            'results': self.results,
+            'attrs': {
+                attr: getattr(self.source, attr)
+                for attr in self.source.checkpoint_attrs},
+            'predicate_counts': {
+                key: graph.predicate_counts
+                for (key, graph) in graphs.items()}
+        }
+        with open(self._state_file() + '.tmp', 'wb') as fh:
+            pickle.dump(state, fh, pickle.HIGHEST_PROTOCOL)
+        os.replace(self._state_file() + '.tmp', self._state_file())
+        self.stages.append(stage)
+        with open(self.manifest + '.tmp', 'w') as fh:
+            json.dump(
+                {'build': self.build, 'stages': self.stages},
+                fh, indent=1, sort_keys=True)
+        os.replace(self.manifest + '.tmp', self.manifest)
+        LOG.info("Saved checkpoint of %s after %s", self.source.name, stage)
+
+    def _restore(self):
+        with open(self._state_file(), 'rb') as fh:
+            state = pickle.load(fh)
+        for (attr, value) in state['attrs'].items():
+            setattr(self.source, attr, value)
+        for (key, graph) in self._graphs().items():
+            graph.restore('/'.join((self.directory, key)), self.stages)
+            graph.predicate_counts = state['predicate_counts'][key]
@@ -19,14 +19,29 @@ class CurieUtil(object):
         self.curie_map = curie_map
         if curie_map is not None:  # inverse the map
             if len(set(curie_map.keys())) != len(set(curie_map.values())):
-                logger.warrning("Curie map is NOT one to one!")
-                logger.warrning(
+                logger.warning("Curie map is NOT one to one!")
+                logger.warning(
                     "`get_curie_prefix(IRI)` may return the same prefix for different base IRI")
             self.uri_map = {}
             for key, value in curie_map.items():
                 self.uri_map[value] = key
+            self.uri_trie = self._make_trie(self.uri_map)
         return
 
+    @staticmethod
+    def _make_trie(uri_map):
+        '''
+        Character trie over the base IRIs; a node holding the key None
+        marks the end of a base IRI and stores its curie prefix
+        '''
+        trie = {}
+        for uri, prefix in uri_map.items():
+            node = trie
+            for char in uri:
+                node = node.setdefault(char, {})
+            node[None] = prefix
+        return trie
+
     def get_curie(self, uri):
         '''Get a CURIE from a URI '''
         prefix = self.get_curie_prefix(uri)
@@ -35,12 +50,21 @@ class CurieUtil(object):
             return '%s:%s' % (prefix, uri[len(key):len(uri)])
         return None
 
+    def get_curies(self, uris):
+        '''Get a CURIE (or None) for each URI in an iterable '''
+        return [self.get_curie(uri) for uri in uris]
+
     def get_curie_prefix(self, uri):
-        ''' Return the CURIE's prefix:'''
-        for key, value in self.uri_map.items():
-            if uri.startswith(key):
-                return value
-        return None
+        ''' Return the CURIE's prefix for the longest matching base IRI'''
+        prefix = None
+        node = self.uri_trie
+        for char in uri:
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                prefix = node[None]
+        return prefix
 
     def get_uri(self, curie):
         ''' Get a URI from a CURIE '''
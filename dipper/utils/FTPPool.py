@@ -0,0 +1,123 @@
+import ftplib
+import logging
+import threading
+from contextlib import contextmanager
+
+LOG = logging.getLogger(__name__)
+
+
+class FTPPool:
+    """
+    Logged in ftp connections kept open between uses, per host and user,
+    with no more than max_per_host in use at once on any one host.
+
+    Sources share one pool (Source.ftp_pool) for freshness checks,
+    downloads and directory listings, so fetching a dozen files from
+    the same server logs in once or twice rather than a dozen times.
+    """
+
+    def __init__(self, max_per_host=2, timeout=60):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._idle = {}     # (host, user) -> list of (FTP, login dir)
+        self._slots = {}    # host -> semaphore
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, host, user=None, passwd=None):
+        """
+        Borrow a connection, in its login directory and binary mode.
+        It goes back to the pool unless the block raised.
+        :param host: str
+        :param user: str or None for anonymous
+        :param passwd: str or None
+        :return: ftplib.FTP
+        """
+        user = user or 'anonymous'
+        key = (host, user)
+        with self._lock:
+            slot = self._slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_per_host)
+                self._slots[host] = slot
+        with slot:
+            (ftp, home) = self._checkout(key, passwd)
+            try:
+                yield ftp
+                ftp.cwd(home)
+            except BaseException:
+                self._close(ftp)
+                raise
+            with self._lock:
+                self._idle.setdefault(key, []).append((ftp, home))
+
+    def _checkout(self, key, passwd):
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                pooled = idle.pop() if idle else None
+            if pooled is None:
+                break
+            try:
+                pooled[0].voidcmd('NOOP')
+                return pooled
+            except (OSError, EOFError, ftplib.Error):
+                LOG.debug("Dropping stale ftp connection to %s", key[0])
+                self._close(pooled[0])
+
+        (host, user) = key
+        LOG.info("Connecting to ftp://%s", host)
+        ftp = ftplib.FTP(host, timeout=self.timeout)
+        ftp.login(user, passwd or '')
+        ftp.voidcmd('TYPE I')
+        return (ftp, ftp.pwd())
+
+    @staticmethod
+    def _close(ftp):
+        try:
+            ftp.quit()
+        except (OSError, EOFError, ftplib.Error):
+            ftp.close()
+
+    def close(self):
+        """
+        Log out of every idle connection
+        """
+        with self._lock:
+            idle = self._idle
+            self._idle = {}
+        for connections in idle.values():
+            for (ftp, home) in connections:
+                self._close(ftp)
+
+    @staticmethod
+    def stat(ftp, path):
+        """
+        Size and modification time of a remote file, from MLST
+        when the server has it, else SIZE and MDTM
+        :param ftp: ftplib.FTP
+        :param path: str
+        :return: dict with 'size' (int) and 'modify' (str YYYYMMDDHHMMSS),
+                 either None if the server does not say
+        """
+        info = {'size': None, 'modify': None}
+        try:
+            facts = ftp.voidcmd('MLST ' + path).splitlines()[1].strip()
+            for fact in facts.split(' ', 1)[0].split(';'):
+                (name, _, value) = fact.partition('=')
+                if name.lower() == 'size':
+                    info['size'] = int(value)
+                elif name.lower() == 'modify':
+                    info['modify'] = value[:14]
+            return info
+        except (ftplib.error_perm, IndexError):
+            pass
+        try:
+            info['size'] = ftp.size(path)
+        except ftplib.error_perm:
+            pass
+        try:
+            info['modify'] = ftp.voidcmd('MDTM ' + path)[4:].strip()[:14]
+        except ftplib.error_perm:
+            pass
+        return info
@@ -0,0 +1,181 @@
+import calendar
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import socketserver
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+LOG = logging.getLogger(__name__)
+
+
+class _Server(socketserver.ThreadingMixIn, HTTPServer):
+    # http.server.ThreadingHTTPServer is 3.7+
+    daemon_threads = True
+
+
+class FixtureServer:
+    """
+    Recorded upstream files, served back over http on localhost.
+
+    In record mode Source.fetch_from_url() stores every file it fetches
+    (http or ftp) in fixture_dir, keyed by a hash of its url, with the
+    validators it came with. In replay mode it asks this server instead
+    of the upstream one, which answers conditional and range requests
+    like a real server would, so the whole fetch, parse, write pipeline
+    runs without network access and always sees the same bytes.
+    """
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+        self._server = None
+
+    @staticmethod
+    def key(remotefile):
+        return hashlib.sha1(remotefile.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def record(fixture_dir, remotefile, localfile, meta):
+        """
+        Save a fetched file and what is known about it as a fixture
+        :param remotefile: str url it was fetched from
+        :param localfile: str path of the file
+        :param meta: dict fetch metadata (etag, last_modified, md5 ...)
+        """
+        fixture = os.path.join(fixture_dir, FixtureServer.key(remotefile))
+        os.makedirs(fixture, exist_ok=True)
+        body = os.path.join(fixture, 'body')
+        shutil.copyfile(localfile, body)
+
+        etag = meta.get('etag')
+        if etag is None:
+            md5 = meta.get('md5')
+            if md5 is None:
+                digest = hashlib.md5()
+                with open(body, 'rb') as fh:
+                    for chunk in iter(lambda: fh.read(2**20), b''):
+                        digest.update(chunk)
+                md5 = digest.hexdigest()
+            etag = '"{}"'.format(md5)
+        last_modified = meta.get('last_modified')
+        if last_modified is not None and re.match(r'^\d{14}$', last_modified):
+            # ftp MDTM, served as an http date
+            last_modified = formatdate(calendar.timegm(time.strptime(
+                last_modified, '%Y%m%d%H%M%S')), usegmt=True)
+
+        with open(os.path.join(fixture, 'meta.json'), 'w') as fh:
+            json.dump({
+                'url': remotefile,
+                'etag': etag,
+                'last_modified': last_modified
+            }, fh, indent=1, sort_keys=True)
+        LOG.info("Recorded %s", remotefile)
+
+    def start(self):
+        """
+        Serve fixture_dir on an unused localhost port, in a daemon thread
+        """
+        fixture_dir = self.fixture_dir
+
+        class Handler(FixtureHandler):
+            directory = fixture_dir
+
+        self._server = _Server(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        LOG.info(
+            "Replaying fetches from %s on port %d",
+            fixture_dir, self._server.server_port)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def url_for(self, remotefile):
+        """
+        :return: str url of remotefile's fixture on this server
+        """
+        if self._server is None:
+            self.start()
+        return 'http://127.0.0.1:{}/{}'.format(
+            self._server.server_port, self.key(remotefile))
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    GET and HEAD of /<key>, with If-None-Match, If-Modified-Since,
+    Range and If-Range handled as an upstream server would
+    """
+    directory = None
+
+    def do_HEAD(self):
+        self._respond(body=False)
+
+    def do_GET(self):
+        self._respond(body=True)
+
+    def _respond(self, body):
+        fixture = os.path.join(self.directory, os.path.basename(self.path))
+        if not os.path.exists(os.path.join(fixture, 'meta.json')):
+            self.send_error(404, "No fixture recorded")
+            return
+        with open(os.path.join(fixture, 'meta.json')) as fh:
+            meta = json.load(fh)
+        path = os.path.join(fixture, 'body')
+        size = os.path.getsize(path)
+        validators = {meta['etag'], meta['last_modified']}
+
+        if self.headers.get('If-None-Match') == meta['etag'] or (
+                self.headers.get('If-None-Match') is None and
+                self.headers.get('If-Modified-Since') is not None and
+                self.headers.get('If-Modified-Since') ==
+                meta['last_modified']):
+            self.send_response(304)
+            self._send_validators(meta)
+            self.end_headers()
+            return
+
+        (start, end) = (0, size - 1)
+        ranged = self.headers.get('Range', '').startswith('bytes=') and (
+            self.headers.get('If-Range') is None or
+            self.headers.get('If-Range') in validators)
+        if ranged:
+            (first, last) = self.headers['Range'][6:].split('-')
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if start >= size:
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header(
+                'Content-Range', 'bytes {}-{}/{}'.format(start, end, size))
+        else:
+            self.send_response(200)
+        self._send_validators(meta)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if body:
+            with open(path, 'rb') as fh:
+                fh.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = fh.read(min(remaining, 2**20))
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+
+    def _send_validators(self, meta):
+        self.send_header('ETag', meta['etag'])
+        if meta['last_modified'] is not None:
+            self.send_header('Last-Modified', meta['last_modified'])
+
+    def log_message(self, fmt, *args):
+        LOG.debug(fmt, *args)
@@ -1,16 +1,26 @@
 import logging
 import hashlib
-from rdflib import URIRef, ConjunctiveGraph
-from rdflib import util as rdflib_util
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from rdflib import URIRef, Literal
+from rdflib import Graph as RDFLibGraph
 from rdflib.namespace import DC, RDF, OWL
-from xml.sax import SAXParseException
 
 from dipper.utils.CurieUtil import CurieUtil
+from dipper.utils import compression
+from dipper.utils import property_cache
 
 __author__ = 'nlw'
 
 logger = logging.getLogger(__name__)
 
+# triples handed to each worker when writing ntriples in parallel
+NT_CHUNK = 50000
+# RDFLib's nt serializer writes these as \uXXXX escapes
+NON_ASCII = re.compile('[^\x00-\x7f]')
+
 
 class GraphUtils:
 
@@ -20,12 +30,18 @@ class GraphUtils:
 
         return
 
-    def write(self, graph, fileformat=None, file=None):
+    def write(
+            self, graph, fileformat=None, file=None, workers=1,
+            compress=None, compress_level=None, block_size=None):
         """
         A basic graph writer (to stdout) for any of the sources.
         this will write raw triples in rdfxml, unless specified.
         to write turtle, specify format='turtle'
         an optional file can be supplied instead of stdout
+        ntriples from an RDFLib graph are formatted by a pool of
+        processes when more than one worker is asked for
+        a file is compressed as it is written when a codec
+        ('gzip', 'zstd', 'auto') is given in compress
         :return: None
 
         """
@@ -34,22 +50,121 @@ class GraphUtils:
         if fileformat is None:
             fileformat = 'rdfxml'
         if file is not None:
-            filewriter = open(file, 'wb')
+            filewriter = compression.open_output(
+                file, compress, compress_level, block_size)
 
             logger.info("Writing triples in %s to %s", fileformat, file)
-            graph.serialize(filewriter, format=fileformat)
+            if fileformat == 'nt' and workers > 1 and \
+                    isinstance(graph, RDFLibGraph):
+                self.write_nt_parallel(graph, filewriter, workers)
+            else:
+                graph.serialize(filewriter, format=fileformat)
             filewriter.close()
         else:
             print(graph.serialize(format=fileformat).decode())
         return
 
     @staticmethod
-    def get_properties_from_graph(graph):
+    def write_nt_parallel(graph, stream, workers, chunk_size=NT_CHUNK):
         """
-        Wrapper for RDFLib.graph.predicates() that returns a unique set
+        Same output as RDFLib's ntriple serializer, but chunks of triples
+        are formatted in a process pool and written back in order.
+        The workers are sent plain strings, see _nt_terms().
+        At most two chunks per worker are in flight at once.
         :param graph: RDFLib.graph
+        :param stream: binary file like object
+        :param workers: int, number of processes
+        :param chunk_size: int, triples per chunk
+        :return: None
+        """
+        triples = (GraphUtils._nt_terms(triple) for triple in graph)
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                chunk = list(islice(triples, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(GraphUtils._format_nt_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    stream.write(pending.popleft().result())
+            while pending:
+                stream.write(pending.popleft().result())
+        stream.write(b'\n')
+        return
+
+    @staticmethod
+    def write_nt_shards(graph, writer):
+        """
+        Send each triple of an RDFLib graph or CompactGraph
+        as an ntriple line to a ShardWriter
+        :param graph: RDFLib.graph or CompactGraph
+        :param writer: ShardWriter
+        :return: None
+        """
+        if isinstance(graph, RDFLibGraph):
+            for triple in graph:
+                writer.write(
+                    GraphUtils._nt_line(GraphUtils._nt_terms(triple)))
+        else:
+            for line in graph.nt_lines():
+                writer.write(line + '\n')
+        return
+
+    @staticmethod
+    def _nt_terms(triple):
+        """
+        An RDFLib triple as plain strings: the ntriple form of the
+        subject and predicate, and of the object unless it is a literal,
+        which is left as a tuple of its lexical form and its
+        ntriple suffix (@lang or ^^<datatype>) to be escaped
+        """
+        (subject, predicate, obj) = triple
+        if isinstance(obj, Literal):
+            if obj.language:
+                suffix = '@' + obj.language
+            elif obj.datatype:
+                suffix = '^^<{}>'.format(obj.datatype)
+            else:
+                suffix = ''
+            obj = (str(obj), suffix)
+        else:
+            obj = obj.n3()
+        return (subject.n3(), predicate.n3(), obj)
+
+    @staticmethod
+    def _nt_line(terms):
+        (subject, predicate, obj) = terms
+        if not isinstance(obj, str):
+            obj = '"{}"{}'.format(
+                obj[0].replace('\\', '\\\\').replace('\n', '\\n')
+                .replace('"', '\\"').replace('\r', '\\r'), obj[1])
+        return '{} {} {} .\n'.format(subject, predicate, obj)
+
+    @staticmethod
+    def _format_nt_chunk(rows):
+        text = ''.join(GraphUtils._nt_line(terms) for terms in rows)
+        return NON_ASCII.sub(GraphUtils._nt_escape, text).encode('ascii')
+
+    @staticmethod
+    def _nt_escape(match):
+        char = ord(match.group())
+        if char > 0xFFFF:
+            return '\\U%08X' % char
+        return '\\u%04X' % char
+
+    @staticmethod
+    def get_properties_from_graph(graph):
+        """
+        The distinct predicates of a graph as a set of URIRefs.
+        Read from the predicate counts a dipper graph keeps as triples
+        are added; other RDFLib graphs fall back to a
+        scan of RDFLib.graph.predicates()
+        :param graph: dipper graph or RDFLib.graph
         :return: set, set of properties
         """
+        if hasattr(graph, 'predicate_counts'):
+            return {URIRef(iri) for iri in graph.getPredicateCounts()}
+
         # collapse to single list
         property_set = set()
         for row in graph.predicates():
@@ -58,78 +173,70 @@ class GraphUtils:
         return property_set
 
     @staticmethod
-    def add_property_axioms(graph, properties):
-        ontology_graph = ConjunctiveGraph()
-        GH = 'https://raw.githubusercontent.com'
-        MI = '/monarch-initiative'
-        ontologies = [
-            GH + MI + '/SEPIO-ontology/master/src/ontology/sepio.owl',
-            GH + MI + '/GENO-ontology/develop/src/ontology/geno.owl',
-            GH + '/oborel/obo-relations/master/ro.owl',
-            'http://purl.obolibrary.org/obo/iao.owl',
-            'http://purl.obolibrary.org/obo/ero.owl',
-            GH + '/jamesmalone/OBAN/master/ontology/oban_core.ttl',
-            'http://purl.obolibrary.org/obo/pco.owl',
-            'http://purl.obolibrary.org/obo/xco.owl'
-        ]
-
-        # random timeouts can waste hours. (too many redirects?)
-        # there is a timeout param in urllib.request,
-        # but it is not exposed by rdflib.parsing
-        # so retry once on URLError
-        for ontology in ontologies:
-            logger.info("parsing: " + ontology)
-            try:
-                ontology_graph.parse(
-                    ontology, format=rdflib_util.guess_format(ontology))
-            except SAXParseException as e:
-                logger.error(e)
-                logger.error('Retrying as turtle: ' + ontology)
-                ontology_graph.parse(ontology, format="turtle")
-            except OSError as e:  # URLError:
-                # simple retry
-                logger.error(e)
-                logger.error('Retrying: ' + ontology)
-                ontology_graph.parse(
-                    ontology, format=rdflib_util.guess_format(ontology))
-
-        # Get object properties
-        graph = GraphUtils.add_property_to_graph(
-            ontology_graph.subjects(RDF['type'], OWL['ObjectProperty']),
-            graph, OWL['ObjectProperty'], properties)
-
-        # Get annotation properties
-        graph = GraphUtils.add_property_to_graph(
-            ontology_graph.subjects(RDF['type'], OWL['AnnotationProperty']),
-            graph, OWL['AnnotationProperty'], properties)
-
-        # Get data properties
-        graph = GraphUtils.add_property_to_graph(
-            ontology_graph.subjects(RDF['type'], OWL['DatatypeProperty']),
-            graph, OWL['DatatypeProperty'], properties)
+    def add_property_axioms(graph, properties=None):
+        """
+        Type the properties used in the graph as they are typed in the
+        ontologies, read from the local property cache
+        (see dipper.utils.property_cache)
+        :param graph: dipper graph
+        :param properties: set of URIRef, the predicates of the graph if None
+        :return: the graph
+        """
+        if properties is None:
+            properties = GraphUtils.get_properties_from_graph(graph)
+        property_types = property_cache.get_properties()
+
+        for property_type in property_cache.PROPERTY_TYPES:
+            graph = GraphUtils.add_property_to_graph(
+                property_types[property_type], graph, OWL[property_type],
+                properties)
 
         for row in graph.predicates(DC['source'], OWL['AnnotationProperty']):
             if row == RDF['type']:
                 graph.remove(
                     (DC['source'], RDF['type'], OWL['AnnotationProperty']))
-        graph.add((DC['source'], RDF['type'], OWL['ObjectProperty']))
+                graph.predicate_counts[RDF['type']] -= 1
 
-        # Hardcoded properties
-        graph.add((
-            URIRef('https://monarchinitiative.org/MONARCH_cliqueLeader'),
-            RDF['type'], OWL['AnnotationProperty']))
-
-        graph.add((URIRef('https://monarchinitiative.org/MONARCH_anonymous'),
-                  RDF['type'], OWL['AnnotationProperty']))
+        graph.addTriples([
+            (DC['source'], RDF['type'], OWL['ObjectProperty']),
+            # Hardcoded properties
+            ('https://monarchinitiative.org/MONARCH_cliqueLeader',
+             RDF['type'], OWL['AnnotationProperty']),
+            ('https://monarchinitiative.org/MONARCH_anonymous',
+             RDF['type'], OWL['AnnotationProperty'])])
 
         return graph
 
     @staticmethod
-    def add_property_to_graph(results, graph, property_type, property_list):
+    def write_predicate_stats(graph, file):
+        """
+        Write a tab separated report of the triples added per predicate,
+        most used first: iri, curie (if the iri contracts to one), count
+        :param graph: dipper graph
+        :param file: str path
+        :return: None
+        """
+        counts = graph.getPredicateCounts()
+        with open(file, 'w') as fh:
+            fh.write('predicate\tcurie\ttriples\n')
+            for iri, count in counts.most_common():
+                curie = graph.curie_util.get_curie(iri)
+                fh.write('{}\t{}\t{}\n'.format(
+                    iri, curie if curie is not None else '', count))
+        logger.info(
+            "Wrote counts for %d predicates to %s", len(counts), file)
+        return
 
-        for row in results:
-            if row in property_list:
-                graph.add((row, RDF['type'], property_type))
+    @staticmethod
+    def add_property_to_graph(results, graph, property_type, property_list):
+        """
+        Type each property of results that is in property_list,
+        added with addTriples() so the graph counts them
+        :param graph: dipper graph
+        """
+        graph.addTriples(
+            (row, RDF['type'], property_type)
+            for row in results if row in property_list)
         return graph
 
     @staticmethod
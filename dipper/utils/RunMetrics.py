@@ -0,0 +1,134 @@
+import cProfile
+import functools
+import json
+import logging
+import platform
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from dipper.utils import compression
+from dipper.utils import tsv
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+LOG = logging.getLogger(__name__)
+
+
+class RunMetrics:
+    """
+    Wall time, CPU time, peak memory, input read and triples made,
+    per phase of a source's run (fetch, parse, write ...) and per
+    _process_* method of the source, written out as a json report
+    so ingests can be compared release over release.
+
+    Rows count those read with dipper.utils.tsv, bytes those read with
+    compression.open_input; parsers reading files otherwise are only
+    timed, and have no rows in the report rather than a misleading 0.
+    Triples count the distinct triples added to the source's graphs;
+    a deduplicating StreamedGraph counts them as it writes them, so its
+    triples show under the write phase.
+    """
+
+    def __init__(self, source, profile_dir=None):
+        """
+        :param source: Source being run
+        :param profile_dir: str directory for a cProfile dump of each phase
+                            (<source>_<phase>.pstats), None for no dumps
+        """
+        self.source = source
+        self.profile_dir = profile_dir
+        self.report = {
+            'source': source.name,
+            'started': datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'phases': {},
+            'methods': {}
+        }
+
+    def _sample(self):
+        graphs = (self.source.graph, self.source.testgraph)
+        return {
+            'wall': time.perf_counter(),
+            'cpu': time.process_time(),
+            'rows': tsv.rows_read,
+            'bytes': compression.bytes_read,
+            'triples': sum(
+                sum(graph.predicate_counts.values()) for graph in graphs)
+        }
+
+    def _record(self, entry, before):
+        after = self._sample()
+        for (key, value) in after.items():
+            entry[key] = round(entry.get(key, 0) + value - before[key], 3)
+        if not entry['rows']:
+            del entry['rows']
+        entry['peak_rss_mb'] = self.peak_rss_mb()
+        entry['calls'] = entry.get('calls', 0) + 1
+
+    @staticmethod
+    def peak_rss_mb():
+        """
+        :return: float peak resident memory of this process so far,
+                 None where the platform does not say
+        """
+        if resource is None:
+            return None
+        # kilobytes on linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if platform.system() == 'Darwin':
+            rss /= 1024
+        return round(rss / 1024, 1)
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Measure the enclosed block as phase `name`
+        :return: dict the phase's measures, filled in on exit
+        """
+        entry = self.report['phases'].setdefault(name, {})
+        profiler = None
+        if self.profile_dir is not None:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        before = self._sample()
+        try:
+            yield entry
+        finally:
+            self._record(entry, before)
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats('/'.join((
+                    self.profile_dir,
+                    '{}_{}.pstats'.format(self.source.name, name))))
+
+    def instrument(self):
+        """
+        Measure each call of the source's _process_* methods
+        """
+        for name in dir(self.source):
+            method = getattr(self.source, name)
+            if name.startswith('_process_') and callable(method):
+                setattr(self.source, name, self._measured(name, method))
+
+    def _measured(self, name, method):
+        @functools.wraps(method)
+        def measured(*args, **kwargs):
+            before = self._sample()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._record(
+                    self.report['methods'].setdefault(name, {}), before)
+        return measured
+
+    def write(self, path):
+        """
+        :param path: str json file for the report
+        """
+        with open(path, 'w') as fh:
+            json.dump(self.report, fh, indent=1, sort_keys=True)
+        LOG.info("Wrote run metrics to %s", path)
@@ -0,0 +1,55 @@
+import logging
+import zlib
+from dipper.utils import compression
+
+LOG = logging.getLogger(__name__)
+
+
+class ShardWriter:
+    '''
+    Write ntriple lines into N files, picking the file from a stable hash
+    (crc32) of the subject term so all triples about a subject land in the
+    same shard, whichever graph type produced them.
+    Has the write()/flush()/close() a graph writer expects of a file handle.
+    '''
+
+    def __init__(
+            self, path_pattern, shards, compress=None, compress_level=None,
+            block_size=None):
+        '''
+        :param path_pattern: str with one {} field for the shard number
+        :param shards: int number of files
+        :param compress: codec passed on to compression.open_output()
+        '''
+        self.shards = shards
+        self.paths = [path_pattern.format(i) for i in range(shards)]
+        self.counts = [0] * shards
+        self.handles = [
+            compression.open_output(
+                path, compress, compress_level, block_size, text=True)
+            for path in self.paths]
+
+    def shard_of(self, subject):
+        '''
+        :param subject: str subject term as written in ntriples
+        :return: int shard number
+        '''
+        return zlib.crc32(subject.encode('utf-8')) % self.shards
+
+    def write(self, line):
+        '''
+        :param line: str a single ntriple line, with its newline
+        '''
+        shard = self.shard_of(line[:line.find(' ')])
+        self.handles[shard].write(line)
+        self.counts[shard] += 1
+
+    def flush(self):
+        for handle in self.handles:
+            handle.flush()
+
+    def close(self):
+        for handle in self.handles:
+            handle.close()
+        LOG.info(
+            "Wrote %d triples in %d shards", sum(self.counts), self.shards)
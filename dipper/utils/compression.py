@@ -0,0 +1,206 @@
+'''
+    Compressed output streams for graph writers,
+    and buffered input streams for parsers
+
+    gzip is always available, zstd is used when the optional
+    `zstandard` module is installed.
+    Inputs may be plain, gzip, bz2, or a member of a zip or tar archive;
+    gzip can be handed to an external program such as pigz.
+
+'''
+import bz2
+import gzip
+import io
+import logging
+import subprocess
+import tarfile
+import zipfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOG = logging.getLogger(__name__)
+
+# file extension per codec
+EXTENSION = {
+    'gzip': '.gz',
+    'zstd': '.zst'
+}
+DEFAULT_LEVEL = {
+    'gzip': 6,
+    'zstd': 3
+}
+# bytes handed to the compressor at a time
+BLOCK_SIZE = 1024 * 1024
+# bytes read from the file or decompressor at a time by open_input
+READ_BUFFER = 4 * 1024 * 1024
+# command writing a decompressed gzip file to stdout, e.g. ['pigz', '-dc'];
+# None to decompress in process
+GUNZIP_COMMAND = None
+
+MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'PK\x03\x04': 'zip'
+}
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2')
+
+# bytes returned by open_input streams, for RunMetrics
+bytes_read = 0
+
+
+def resolve_codec(codec):
+    '''
+    Map a requested codec to one we can use here.
+    'auto' picks zstd when available, else gzip;
+    zstd falls back to gzip when the module is missing.
+    :param codec: str or None
+    :return: str or None (no compression)
+    '''
+    if codec is None:
+        return None
+    if codec == 'auto':
+        codec = 'zstd' if zstandard is not None else 'gzip'
+    if codec == 'zstd' and zstandard is None:
+        LOG.warning("zstandard module not installed, compressing with gzip")
+        codec = 'gzip'
+    if codec not in EXTENSION:
+        raise ValueError("Unknown compression codec: {}".format(codec))
+    return codec
+
+
+def extension(codec):
+    '''
+    :param codec: str or None
+    :return: str suffix to append to the file name ('' when not compressing)
+    '''
+    if codec is None:
+        return ''
+    return EXTENSION[resolve_codec(codec)]
+
+
+def open_output(path, codec=None, level=None, block_size=None, text=False):
+    '''
+    Open a file for writing, compressing with `codec` when given.
+    :param path: str file name, should already carry the codec's extension
+    :param codec: None, 'gzip', 'zstd' or 'auto'
+    :param level: int compression level, codec default if None
+    :param block_size: int bytes buffered before each compressor call
+    :param text: bool, return a utf-8 text stream instead of a binary one
+    :return: writable file object
+    '''
+    codec = resolve_codec(codec)
+    if block_size is None:
+        block_size = BLOCK_SIZE
+    if level is None and codec is not None:
+        level = DEFAULT_LEVEL[codec]
+
+    if codec is None:
+        stream = open(path, 'wb', buffering=block_size)
+    elif codec == 'gzip':
+        stream = io.BufferedWriter(
+            gzip.open(path, 'wb', compresslevel=level), buffer_size=block_size)
+    else:
+        compressor = zstandard.ZstdCompressor(level=level)
+        stream = compressor.stream_writer(
+            open(path, 'wb'), write_size=block_size)
+
+    if text:
+        stream = io.TextIOWrapper(stream, encoding='utf-8')
+    return stream
+
+
+def open_input(path, member=None, text=True, encoding='utf-8', newline=None):
+    '''
+    Open a raw file for reading, whatever it is packed in.
+    gzip, bz2 and zip are recognized by their first bytes,
+    tar archives by their extension or when a member is asked for.
+    :param path: str file name
+    :param member: str name of the archive member to read,
+                   the first one when None
+    :param text: bool, return a text stream, else a binary one
+    :param encoding: str, for text streams
+    :param newline: as open(), for text streams; '' for csv readers
+    :return: readable file object, buffered by READ_BUFFER bytes
+    '''
+    with open(path, 'rb') as fh:
+        codec = None
+        head = fh.read(4)
+        for (magic, name) in MAGIC.items():
+            if head.startswith(magic):
+                codec = name
+
+    closers = []
+    if codec == 'zip':
+        with zipfile.ZipFile(path) as archive:
+            # the member stays readable after the archive is closed
+            stream = archive.open(member or archive.namelist()[0])
+    elif member is not None or path.endswith(TAR_SUFFIXES):
+        archive = tarfile.open(path, 'r:*')
+        if member is None:
+            member = archive.next()
+        stream = archive.extractfile(member)
+        closers.append(archive)
+    elif codec == 'gzip' and GUNZIP_COMMAND is not None:
+        process = subprocess.Popen(
+            GUNZIP_COMMAND + [path], stdout=subprocess.PIPE, bufsize=0)
+        stream = process.stdout
+        closers.append(_Command(process, path))
+    elif codec == 'gzip':
+        stream = gzip.open(path, 'rb')
+    elif codec == 'bz2':
+        stream = bz2.open(path, 'rb')
+    else:
+        stream = open(path, 'rb', buffering=0)
+
+    stream = io.BufferedReader(
+        _Reader(stream, closers), buffer_size=READ_BUFFER)
+    if text:
+        stream = io.TextIOWrapper(stream, encoding=encoding, newline=newline)
+    return stream
+
+
+class _Reader(io.RawIOBase):
+    '''
+    A readable stream, closing what it came from along with it
+    '''
+
+    def __init__(self, stream, closers):
+        super().__init__()
+        self._stream = stream
+        self._closers = closers
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        global bytes_read
+        size = self._stream.readinto(buffer)
+        bytes_read += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stream.close()
+            for closer in self._closers:
+                closer.close()
+        super().close()
+
+
+class _Command:
+    '''
+    An external decompressor, checked when its output is closed
+    '''
+
+    def __init__(self, process, path):
+        self._process = process
+        self._path = path
+
+    def close(self):
+        # a reader stopping early closes the pipe, that is not an error
+        if self._process.wait() > 0:
+            raise IOError("{} failed on {} with status {}".format(
+                ' '.join(GUNZIP_COMMAND), self._path,
+                self._process.returncode))
@@ -0,0 +1,198 @@
+'''
+    Local cache of the property types declared in the ontologies
+    dipper uses to type the predicates of its graphs
+    (see GraphUtils.add_property_axioms)
+
+    The ontologies are downloaded and parsed once, and only the
+    IRIs of their object, annotation and datatype properties are kept,
+    in a small json file along with the ETag, Last-Modified and
+    version of each ontology. The file is written under out/,
+    with the rest of what a run produces, not in the tracked resources/.
+    The file is reused until it is older than MAX_AGE days; then the
+    ontologies are checked with HEAD requests and only re-parsed when
+    one has changed. A rebuild can also be asked for explicitly.
+    Without network access an existing cache is used however old it is.
+
+'''
+import json
+import logging
+import os
+import time
+import urllib.request
+from datetime import datetime
+from xml.sax import SAXParseException
+
+from rdflib import ConjunctiveGraph, URIRef
+from rdflib import util as rdflib_util
+from rdflib.namespace import OWL, RDF
+
+LOG = logging.getLogger(__name__)
+
+GH = 'https://raw.githubusercontent.com'
+MI = '/monarch-initiative'
+ONTOLOGIES = [
+    GH + MI + '/SEPIO-ontology/master/src/ontology/sepio.owl',
+    GH + MI + '/GENO-ontology/develop/src/ontology/geno.owl',
+    GH + '/oborel/obo-relations/master/ro.owl',
+    'http://purl.obolibrary.org/obo/iao.owl',
+    'http://purl.obolibrary.org/obo/ero.owl',
+    GH + '/jamesmalone/OBAN/master/ontology/oban_core.ttl',
+    'http://purl.obolibrary.org/obo/pco.owl',
+    'http://purl.obolibrary.org/obo/xco.owl'
+]
+PROPERTY_TYPES = ['ObjectProperty', 'AnnotationProperty', 'DatatypeProperty']
+
+CACHE_FILE = 'out/property_axioms.json'
+# days before the ontologies are checked for changes
+MAX_AGE = 7
+
+# property type -> set of URIRef, loaded once per process
+_properties = None
+
+
+def get_properties(cache_file=None, refresh=False, max_age=None):
+    '''
+    The IRIs of the properties declared in the ontologies, by type
+    :param cache_file: str path, CACHE_FILE if None
+    :param refresh: bool, rebuild the cache from the ontologies
+    :param max_age: float days before the cache is considered stale
+    :return: dict of property type ('ObjectProperty', ...) -> set of URIRef
+    '''
+    global _properties
+    if _properties is not None and not refresh:
+        return _properties
+
+    if cache_file is None:
+        cache_file = CACHE_FILE
+    if max_age is None:
+        max_age = MAX_AGE
+
+    cache = None
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file) as fh:
+                cache = json.load(fh)
+        except ValueError as e:
+            LOG.warning(e)
+            LOG.warning(
+                "Can not read property cache %s, rebuilding", cache_file)
+
+    if cache is None or refresh:
+        cache = build(cache_file)
+    elif time.time() - cache['checked'] > max_age * 86400:
+        LOG.info("Property cache %s is stale, checking ontologies", cache_file)
+        try:
+            if _changed(cache):
+                cache = build(cache_file)
+            else:
+                cache['checked'] = time.time()
+                _save(cache, cache_file)
+        except OSError as e:
+            LOG.warning(e)
+            LOG.warning("Can not check ontologies, using cached properties")
+
+    _properties = {
+        ptype: {URIRef(iri) for iri in cache['properties'][ptype]}
+        for ptype in PROPERTY_TYPES}
+    LOG.info(
+        "Loaded %d properties from %s",
+        sum(len(iris) for iris in _properties.values()), cache_file)
+    return _properties
+
+
+def build(cache_file=None, ontologies=None):
+    '''
+    Download and parse the ontologies and write their properties to the cache
+    :param cache_file: str path, CACHE_FILE if None
+    :param ontologies: list of urls, ONTOLOGIES if None
+    :return: dict the cache contents
+    '''
+    if cache_file is None:
+        cache_file = CACHE_FILE
+    if ontologies is None:
+        ontologies = ONTOLOGIES
+
+    properties = {ptype: set() for ptype in PROPERTY_TYPES}
+    sources = {}
+    for ontology in ontologies:
+        (ontology_graph, validators) = _parse(ontology)
+        for ptype in PROPERTY_TYPES:
+            properties[ptype].update(
+                str(iri) for iri in
+                ontology_graph.subjects(RDF['type'], OWL[ptype]))
+        version = next(
+            ontology_graph.objects(None, OWL['versionIRI']),
+            next(ontology_graph.objects(None, OWL['versionInfo']), None))
+        validators['version'] = None if version is None else str(version)
+        sources[ontology] = validators
+
+    cache = {
+        'built': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'checked': time.time(),
+        'ontologies': sources,
+        'properties': {
+            ptype: sorted(iris) for ptype, iris in properties.items()}
+    }
+    _save(cache, cache_file)
+    LOG.info("Wrote property cache %s", cache_file)
+    return cache
+
+
+def _parse(ontology):
+    '''
+    :param ontology: str url
+    :return: (ConjunctiveGraph, dict of the response's ETag and Last-Modified)
+    '''
+    LOG.info("parsing: %s", ontology)
+    # random timeouts can waste hours. (too many redirects?)
+    # so retry once on URLError
+    try:
+        (data, validators) = _fetch(ontology)
+    except OSError as e:  # URLError:
+        LOG.error(e)
+        LOG.error('Retrying: %s', ontology)
+        (data, validators) = _fetch(ontology)
+
+    ontology_graph = ConjunctiveGraph()
+    try:
+        ontology_graph.parse(
+            data=data, format=rdflib_util.guess_format(ontology))
+    except SAXParseException as e:
+        LOG.error(e)
+        LOG.error('Retrying as turtle: %s', ontology)
+        ontology_graph.parse(data=data, format="turtle")
+    return (ontology_graph, validators)
+
+
+def _fetch(url, method='GET'):
+    request = urllib.request.Request(url, method=method)
+    with urllib.request.urlopen(request) as response:
+        data = response.read() if method == 'GET' else None
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')}
+    return (data, validators)
+
+
+def _changed(cache):
+    '''
+    :return: True if any ontology reports a different ETag or Last-Modified
+    '''
+    for ontology, cached in cache['ontologies'].items():
+        (_, validators) = _fetch(ontology, method='HEAD')
+        for key in ('etag', 'last_modified'):
+            if validators[key] is not None and validators[key] != cached[key]:
+                LOG.info("%s has changed", ontology)
+                return True
+    return False
+
+
+def _save(cache, cache_file):
+    directory = os.path.dirname(cache_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # readers, in other --jobs workers too, never see it half written
+    tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+    with open(tmp_file, 'w') as fh:
+        json.dump(cache, fh, indent=1)
+    os.replace(tmp_file, cache_file)
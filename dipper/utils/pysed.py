@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import os
 import re
 
 __author__ = 'Mahmoud Adel <mahmoud.adel2@gmail.com>'
@@ -9,6 +10,23 @@ __version__ = 0.4
 # with a few edits from us
 
 
+def _rewrite(infile, linelist):
+    """
+    Replace infile with a new file rather than writing through it,
+    raw files may be links into a store shared by other sources.
+    linelist may be a generator still reading infile.
+    """
+    with open(infile + '.sed', "w") as f:
+        for line in linelist:
+            f.writelines(line)
+    os.replace(infile + '.sed', infile)
+
+
+def _lines(infile):
+    with open(infile) as f:
+        yield from f
+
+
 def replace(oldstr, newstr, infile, dryrun=False):
     """
     Sed-like Replace function..
@@ -21,16 +39,9 @@ def replace(oldstr, newstr, infile, dryrun=False):
 
     """
 
-    linelist = []
-    with open(infile) as f:
-        for item in f:
-            newitem = re.sub(oldstr, newstr, item)
-            linelist.append(newitem)
+    linelist = (re.sub(oldstr, newstr, item) for item in _lines(infile))
     if dryrun is False:
-        with open(infile, "w") as f:
-            f.truncate()
-            for line in linelist:
-                f.writelines(line)
+        _rewrite(infile, linelist)
     elif dryrun is True:
         for line in linelist:
             print(line, end='')
@@ -50,17 +61,11 @@ def rmlinematch(oldstr, infile, dryrun=False):
 
     """
 
-    linelist = []
-    with open(infile) as f:
-        for item in f:
-            rmitem = re.match(r'.*{}'.format(oldstr), item)
-            if isinstance(rmitem) == isinstance(None):
-                linelist.append(item)
+    linelist = (
+        item for item in _lines(infile)
+        if re.match(r'.*{}'.format(oldstr), item) is None)
     if dryrun is False:
-        with open(infile, "w") as f:
-            f.truncate()
-            for line in linelist:
-                f.writelines(line)
+        _rewrite(infile, linelist)
     elif dryrun is True:
         for line in linelist:
             print(line, end='')
@@ -79,20 +84,13 @@ def rmlinenumber(linenumber, infile, dryrun=False):
 
     """
 
-    linelist = []
-    linecounter = 0
-    if isinstance(linenumber) != isinstance(linecounter):
+    if not isinstance(linenumber, int):
         exit("""'linenumber' argument must be an integer.""")
-    with open(infile) as f:
-        for item in f:
-            linecounter = linecounter + 1
-            if linecounter != linenumber:
-                linelist.append(item)
+    linelist = (
+        item for (linecounter, item) in enumerate(_lines(infile), 1)
+        if linecounter != linenumber)
     if dryrun is False:
-        with open(infile, "w") as f:
-            f.truncate()
-            for line in linelist:
-                f.writelines(line)
+        _rewrite(infile, linelist)
     elif dryrun is True:
         for line in linelist:
             print(line, end='')
@@ -0,0 +1,98 @@
+'''
+    Streaming scrubs for raw files
+
+    A scrub is a function taking one line and returning it fixed up,
+    or None to drop the line. Scrubs compose; lines() applies them lazily
+    as a file is read, so a source can fold its fixes into the first
+    parse pass (see Source.scrubs), and rewrite() applies them while
+    copying to a temporary file that is then swapped in, for files that
+    have to be fixed on disk. Neither holds more than a line in memory.
+
+'''
+import os
+import re
+
+
+def sub(pattern, repl):
+    """
+    :param pattern: str regex
+    :param repl: str replacement, as re.sub
+    :return: scrub replacing every match of pattern in a line
+    """
+    regex = re.compile(pattern)
+
+    def scrub(line):
+        return regex.sub(repl, line)
+    return scrub
+
+
+def drop(pattern):
+    """
+    :param pattern: str regex
+    :return: scrub dropping lines that match pattern anywhere
+    """
+    regex = re.compile(pattern)
+
+    def scrub(line):
+        return None if regex.search(line) else line
+    return scrub
+
+
+def strip_cr(line):
+    """
+    Remove carriage returns
+    """
+    return line.replace('\r', '')
+
+
+def compose(scrubs):
+    """
+    :param scrubs: list of scrubs, applied in order
+    :return: one scrub doing all of them
+    """
+    scrubs = tuple(scrubs)
+
+    def scrub(line):
+        for fix in scrubs:
+            line = fix(line)
+            if line is None:
+                break
+        return line
+    return scrub
+
+
+def lines(fh, scrubs):
+    """
+    Scrubbed lines of an open file, as they are read
+    :param fh: iterable of lines
+    :param scrubs: list of scrubs
+    :return: generator of str
+    """
+    if not scrubs:
+        yield from fh
+        return
+    scrub = compose(scrubs)
+    for line in fh:
+        line = scrub(line)
+        if line is not None:
+            yield line
+
+
+def rewrite(path, scrubs, encoding='utf-8', opener=open):
+    """
+    Scrub a file in place, streaming it through a temporary file which
+    replaces the original when done. Raw files may be links into a store
+    shared by other sources, so the original is never written through.
+    Line endings are passed to the scrubs untranslated.
+    :param path: str
+    :param scrubs: list of scrubs
+    :param encoding: str
+    :param opener: open, or gzip.open for gzipped files
+    :return: None
+    """
+    tmpfile = path + '.scrub'
+    with opener(path, 'rt', encoding=encoding, newline='') as src, \
+            opener(tmpfile, 'wt', encoding=encoding, newline='') as dst:
+        for line in lines(src, scrubs):
+            dst.write(line)
+    os.replace(tmpfile, path)
@@ -0,0 +1,85 @@
+'''
+    Tab separated rows for source parsers
+
+    Lines are split as bytes; comment lines are skipped and the where
+    filters (test id allow-lists) are checked before anything is decoded,
+    and only the selected columns ever are. Each row is a namedtuple of
+    those columns, the same class for every row of a file.
+    Fields wrapped in quotes are unwrapped as csv.reader would,
+    but a quoted field may not span lines.
+
+'''
+import csv
+from collections import namedtuple
+
+from dipper.utils import compression
+
+# lines returned or filtered out by rows(), for RunMetrics
+rows_read = 0
+
+
+def rows(
+        path, columns=None, select=None, where=None, limit=None,
+        comment=b'#', encoding='utf-8'):
+    '''
+    :param path: str file name, plain, compressed or an archive
+                 (see compression.open_input)
+    :param columns: list of names for the columns in file order,
+                    None to read them from the first line
+    :param select: list of the columns to return, all when None
+    :param where: dict of column name -> collection of str values;
+                  rows with another value in that column are skipped
+    :param limit: int, stop after this many rows are returned
+    :param comment: bytes prefix of lines to skip
+    :param encoding: str
+    :return: generator of namedtuple
+    '''
+    global rows_read
+    with compression.open_input(path, text=False) as fh:
+        lines = (
+            line.rstrip(b'\r\n') for line in fh
+            if not line.startswith(comment) and line.strip())
+        if columns is None:
+            columns = _split(next(lines, b''), encoding)
+        if select is None:
+            select = columns
+        index = [columns.index(name) for name in select]
+        width = len(columns)
+        Row = namedtuple('Row', select, rename=True)
+        filters = [
+            (columns.index(name), {str(value) for value in values})
+            for (name, values) in (where or {}).items()]
+        byte_filters = [
+            (col, {value.encode(encoding) for value in values})
+            for (col, values) in filters]
+
+        count = 0
+        read = 0
+        try:
+            for line in lines:
+                read += 1
+                if b'"' in line:
+                    fields = _split(line, encoding)
+                    checks = filters
+                else:
+                    fields = line.split(b'\t')
+                    checks = byte_filters
+                if len(fields) < width:
+                    fields += [fields[0][:0]] * (width - len(fields))
+                if any(fields[col] not in values for (col, values) in checks):
+                    continue
+                if checks is filters:
+                    yield Row._make(fields[i] for i in index)
+                else:
+                    yield Row._make(fields[i].decode(encoding) for i in index)
+                count += 1
+                if limit is not None and count >= limit:
+                    break
+        finally:
+            rows_read += read
+
+
+def _split(line, encoding):
+    # the slow path, for lines with quoted fields
+    return next(csv.reader(
+        [line.decode(encoding)], delimiter='\t', quotechar='"'), [])
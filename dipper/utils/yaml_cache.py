@@ -0,0 +1,125 @@
+'''
+    Parsed yaml tables (curie map, translation tables), cached
+
+    PyYAML takes a good part of a second over GLOBAL_TERMS.yaml and
+    curie_map.yaml, which every graph class and every Source used to
+    parse for themselves. load() parses a file once per process and
+    keeps a pickle of the result in CACHE_DIR, used by later processes
+    while the file's mtime and size, or else its md5, are unchanged.
+    LazyTable defers even that to the first use of a class attribute,
+    so importing dipper reads nothing, and then keeps what it loaded
+    for the rest of the process.
+
+'''
+import hashlib
+import logging
+import os
+import pickle
+import threading
+
+import yaml
+
+LOG = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'dipper', 'yaml')
+
+# the C parser when libyaml is there
+LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+_tables = {}    # absolute path -> ((mtime, size), table)
+_lock = threading.Lock()
+
+
+def load(path):
+    '''
+    :param path: str yaml file
+    :return: its contents, the same object for as long as it is unchanged
+    '''
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _tables.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        table = _load(path, key)
+        _tables[path] = (key, table)
+        return table
+
+
+def _cache_file(path):
+    return os.path.join(
+        CACHE_DIR, hashlib.sha1(path.encode('utf-8')).hexdigest() + '.pickle')
+
+
+def _load(path, key):
+    cache_file = _cache_file(path)
+    cached = None
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as fh:
+                cached = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            LOG.debug("Ignoring unreadable cache %s", cache_file)
+    if cached is not None and cached['key'] == key:
+        return cached['table']
+
+    with open(path, 'rb') as fh:
+        content = fh.read()
+    md5 = hashlib.md5(content).hexdigest()
+    if cached is not None and cached['md5'] == md5:
+        table = cached['table']     # touched, not changed
+    else:
+        LOG.debug("Parsing %s", path)
+        table = yaml.load(content, Loader=LOADER)
+    _save(cache_file, {'key': key, 'md5': md5, 'table': table})
+    return table
+
+
+def _save(cache_file, cached):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmpfile = '{}.{}'.format(cache_file, os.getpid())
+        with open(tmpfile, 'wb') as fh:
+            pickle.dump(cached, fh, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpfile, cache_file)
+    except OSError as err:
+        # a read only home still gets the in process cache
+        LOG.debug("Cannot cache %s: %s", cache_file, err)
+
+
+def inverse(table):
+    '''
+    :return: dict of value -> key
+    '''
+    return {value: key for (key, value) in table.items()}
+
+
+class LazyTable:
+    '''
+    A class attribute holding a yaml file's contents,
+    or transform(contents), loaded on first use.
+    Later uses (a curie lookup per node, say) return the same object
+    without checking the file again
+    '''
+
+    def __init__(self, path, transform=None):
+        self.path = path
+        self.transform = transform
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __get__(self, obj, cls=None):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                table = load(self.path)
+                if self.transform is not None:
+                    table = self.transform(table)
+                self._value = table
+                self._loaded = True
+        return self._value
@@ -7,6 +7,10 @@ import copy
 import json
 from collections import OrderedDict
 
+# built once, the prefix index makes get_curie() cheap per call
+curie_util = CurieUtil(curie_map.get())
+
+
 def main():
 
     hpo = RDFGraph()
@@ -35,7 +39,6 @@ def main():
 def hpo_to_tree(cls, hpo_terms, hpo_graph, tree, path):
     tree_path = copy.copy(path)
     tree_path.append(cls)
-    curie_util = CurieUtil(curie_map.get())
     if cls not in hpo_terms:
         hpo_terms[cls] = {
             'label': hpo_graph.label(URIRef(curie_util.get_uri(cls)))
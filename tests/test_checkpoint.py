@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import os
+import pickle
+import shutil
+import tempfile
+from dipper.sources.Source import Source
+from dipper.utils.Checkpoint import Checkpoint
+
+
+class Parser(Source):
+    checkpointed = True
+    checkpoint_attrs = ('idmap',)
+    fail = False
+
+    def parse(self, limit=None):
+        self.idmap = {}
+        self.calls = []
+        self._process_ids()
+        self._process_labels()
+
+    def _process_ids(self):
+        self.calls.append('ids')
+        for key in range(3):
+            self.idmap[key] = 'MGI:{}'.format(key)
+            self._process_id(key)
+
+    def _process_id(self, key):
+        self.graph.addTriple(
+            self.idmap[key], 'rdf:type', 'SO:0000704')
+
+    def _process_labels(self):
+        self.calls.append('labels')
+        if self.fail:
+            raise RuntimeError('out of memory')
+        for (key, curie) in self.idmap.items():
+            self.graph.addTriple(
+                curie, 'rdfs:label', 'gene {}'.format(key),
+                object_is_literal=True)
+        return len(self.idmap)
+
+
+class FileParser(Source):
+    checkpointed = True
+    checkpoint_attrs = ('idmap',)
+    order = ['a', 'b']
+    fail = False
+
+    def parse(self, limit=None):
+        self.idmap = {}
+        self.seen = []
+        for k in self.order:
+            self._process_file(k)
+            # read between stages, needs the maps of the stages skipped
+            self.seen.append(sorted(self.idmap))
+
+    def _process_file(self, k):
+        if self.fail and k == 'b':
+            raise RuntimeError('out of memory')
+        self.idmap[k] = 'MGI:' + k
+        self.graph.addTriple(self.idmap[k], 'rdf:type', 'SO:0000704')
+
+
+class CheckpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def run_parse(self, graph_type, resume, fail, directory=None):
+        source = Parser(graph_type, True, 'udp')
+        source.fail = fail
+        checkpoint = Checkpoint(
+            source, {'limit': None}, resume=resume,
+            directory=directory or self.tmpdir)
+        checkpoint.instrument()
+        if fail:
+            with self.assertRaises(RuntimeError):
+                source.parse()
+            # a crashed run never finalizes its graph, drop its sorted runs
+            if getattr(source.graph, '_run_dir', None) is not None:
+                shutil.rmtree(source.graph._run_dir)
+        else:
+            source.parse()
+        return (source, checkpoint)
+
+    def straight_parse(self, graph_type):
+        return self.run_parse(
+            graph_type, False, False, os.path.join(self.tmpdir, 'straight'))[0]
+
+    def test_resume_rdf_graph(self):
+        self.run_parse('rdf_graph', False, True)
+        (source, checkpoint) = self.run_parse('rdf_graph', True, False)
+        self.assertEqual(source.calls, ['labels'])
+        self.assertEqual(len(source.idmap), 3)
+        self.assertEqual(
+            set(source.graph), set(self.straight_parse('rdf_graph').graph))
+        self.assertEqual(
+            checkpoint.stages, ['_process_ids', '_process_labels'])
+        self.assertEqual(checkpoint.results['_process_labels'], 3)
+        # each part holds only what its stage added
+        with open(os.path.join(
+                self.tmpdir, 'graph__process_labels.pickle'), 'rb') as fh:
+            self.assertEqual(len(pickle.load(fh)['triples']), 3)
+
+    def test_resume_compact_graph(self):
+        self.run_parse('compact_graph', False, True)
+        (source, checkpoint) = self.run_parse('compact_graph', True, False)
+        self.assertEqual(source.calls, ['labels'])
+        self.assertEqual(
+            set(source.graph.nt_lines()),
+            set(self.straight_parse('compact_graph').graph.nt_lines()))
+
+    def test_resume_streamed_graph(self):
+        self.run_parse('streamed_graph', False, True)
+        (source, checkpoint) = self.run_parse('streamed_graph', True, False)
+        self.assertEqual(source.calls, ['labels'])
+        straight = self.straight_parse('streamed_graph')
+        self.assertEqual(
+            source.graph.predicate_counts, straight.graph.predicate_counts)
+        (source.graph.file_handle, straight.graph.file_handle) = (
+            io.StringIO(), io.StringIO())
+        source.graph.finalize()
+        straight.graph.finalize()
+        self.assertEqual(
+            source.graph.file_handle.getvalue(),
+            straight.graph.file_handle.getvalue())
+        # parts are kept until the checkpoint is cleared
+        self.assertTrue(os.path.exists(
+            os.path.join(self.tmpdir, 'graph__process_ids.nt')))
+        checkpoint.clear()
+        self.assertFalse(os.path.exists(self.tmpdir))
+
+    def test_start_over_on_other_options(self):
+        self.run_parse('rdf_graph', False, True)
+        source = Parser('rdf_graph', True, 'udp')
+        checkpoint = Checkpoint(
+            source, {'limit': 10}, resume=True, directory=self.tmpdir)
+        self.assertEqual(checkpoint.stages, [])
+
+    def test_stage_per_file(self):
+        source = FileParser('rdf_graph', True, 'udp')
+        source.fail = True
+        checkpoint = Checkpoint(source, resume=False, directory=self.tmpdir)
+        checkpoint.instrument()
+        with self.assertRaises(RuntimeError):
+            source.parse()
+        self.assertEqual(checkpoint.stages, ['_process_file:a'])
+
+        # the files come in another order this time
+        source = FileParser('rdf_graph', True, 'udp')
+        source.order = ['b', 'a']
+        checkpoint = Checkpoint(source, resume=True, directory=self.tmpdir)
+        checkpoint.instrument()
+        source.parse()
+        self.assertEqual(source.seen, [['a', 'b'], ['a', 'b']])
+        straight = FileParser('rdf_graph', True, 'udp')
+        straight.parse()
+        self.assertEqual(set(source.graph), set(straight.graph))
+        self.assertEqual(
+            checkpoint.stages, ['_process_file:a', '_process_file:b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import unittest
+import logging
+from rdflib import ConjunctiveGraph, Literal
+from dipper.graph.CompactGraph import CompactGraph
+from dipper.graph.RDFGraph import RDFGraph
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+class CompactGraphTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = CompactGraph()
+        self.rdf_graph = RDFGraph()
+        for graph in [self.graph, self.rdf_graph]:
+            graph.addTriple('MGI:1', 'rdfs:label', 'a "quoted"\nlabel', True)
+            graph.addTriple('MGI:1', 'rdf:type', 'owl:Class')
+            graph.addTriple('MGI:1', 'rdf:type', 'owl:Class')
+            graph.addTriple('MGI:1', 'rdfs:subClassOf', '_:b1')
+            graph.addTriple('_:b1', 'OBO:RO_0002200', 'HP:0000001')
+            graph.addTriple(
+                'MGI:1', 'owl:deprecated', True, True, 'xsd:boolean')
+            graph.addTriple('MGI:2', 'foaf:age', 12, True)
+
+    def tearDown(self):
+        self.graph = None
+        self.rdf_graph = None
+
+    def test_deduplication(self):
+        self.assertEqual(len(self.graph), 6)
+        self.assertEqual(len(self.graph), len(self.rdf_graph))
+
+    def test_serialize_matches_rdfgraph(self):
+        for fmt in ['nt', 'turtle']:
+            parsed = ConjunctiveGraph()
+            parsed.parse(
+                data=self.graph.serialize(format=fmt).decode(), format=fmt)
+            self.assertEqual(set(parsed), set(self.rdf_graph), fmt)
+
+    def test_remove(self):
+        from rdflib import URIRef
+        from rdflib.namespace import RDF, OWL
+        subject = URIRef('http://www.informatics.jax.org/accession/MGI:1')
+        self.graph.remove((subject, RDF['type'], OWL['Class']))
+        self.assertEqual(len(self.graph), 5)
+        self.graph.addTriple('MGI:2', 'foaf:age', 12, True)
+        self.assertEqual(len(self.graph), 5)
+        self.graph.addTriple('MGI:1', 'rdf:type', 'owl:Class')
+        self.assertEqual(len(self.graph), 6)
+
+    def test_remove_many(self):
+        from rdflib import URIRef
+        from rdflib.namespace import RDFS
+        for i in range(100):
+            self.graph.addTriple('MGI:' + str(i), 'rdfs:label', str(i), True)
+        for i in range(0, 100, 2):
+            self.graph.remove((
+                URIRef('http://www.informatics.jax.org/accession/MGI:' +
+                       str(i)), RDFS['label'], Literal(str(i))))
+        self.assertEqual(len(self.graph), 56)
+        for i in range(100):
+            self.graph.addTriple('MGI:' + str(i), 'rdfs:label', str(i), True)
+        self.assertEqual(len(self.graph), 106)
+
+    def test_add_multiline_literal(self):
+        from rdflib import URIRef
+        from rdflib.namespace import RDFS
+        triple = (
+            URIRef('http://www.informatics.jax.org/accession/MGI:3'),
+            RDFS['comment'], Literal('two\r\nlines "quoted"', lang='en'))
+        self.graph.add(triple)
+        parsed = ConjunctiveGraph()
+        parsed.parse(
+            data=self.graph.serialize(format='nt').decode(), format='nt')
+        self.assertIn(triple, parsed)
+        self.graph.remove(triple)
+        self.assertEqual(len(self.graph), 6)
+
+    def test_predicates(self):
+        self.assertEqual(
+            set(self.graph.predicates()), set(self.rdf_graph.predicates()))
+
+
+if __name__ == '__main__':
+    unittest.main()
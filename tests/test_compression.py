@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import unittest
+import bz2
+import gzip
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from unittest.mock import patch
+from dipper.utils import compression
+from dipper.utils.ShardWriter import ShardWriter
+
+
+class CompressionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.tmpdir):
+            os.remove(os.path.join(self.tmpdir, name))
+        os.rmdir(self.tmpdir)
+
+    def test_gzip_text_output(self):
+        path = os.path.join(self.tmpdir, 'out.nt.gz')
+        with compression.open_output(
+                path, 'gzip', level=1, block_size=16, text=True) as out:
+            out.write('<a> <b> "é" .\n' * 100)
+        with gzip.open(path, 'rt', encoding='utf-8') as result:
+            self.assertEqual(result.read(), '<a> <b> "é" .\n' * 100)
+
+    def test_zstd_falls_back_to_gzip(self):
+        with patch.object(compression, 'zstandard', None):
+            self.assertEqual(compression.resolve_codec('zstd'), 'gzip')
+            self.assertEqual(compression.extension('auto'), '.gz')
+        self.assertEqual(compression.extension(None), '')
+
+    def test_open_input(self):
+        text = 'a\tb\n' * 100
+        path = os.path.join(self.tmpdir, 'in')
+        with open(path + '.txt', 'w') as fh:
+            fh.write(text)
+        with gzip.open(path + '.gz', 'wt') as fh:
+            fh.write(text)
+        with bz2.open(path + '.bz2', 'wt') as fh:
+            fh.write(text)
+        with zipfile.ZipFile(path + '.zip', 'w') as archive:
+            archive.writestr('other.txt', '')
+            archive.writestr('in.txt', text)
+        with tarfile.open(path + '.tar.gz', 'w:gz') as archive:
+            archive.add(path + '.txt', 'in.txt')
+        inputs = [
+            (path + '.txt', None), (path + '.gz', None),
+            (path + '.bz2', None), (path + '.zip', 'in.txt'),
+            (path + '.tar.gz', None)]
+        for (name, member) in inputs:
+            with compression.open_input(name, member) as result:
+                self.assertEqual(result.read(), text)
+
+        if shutil.which('gzip') is not None:
+            with patch.object(compression, 'GUNZIP_COMMAND', ['gzip', '-dc']):
+                with compression.open_input(path + '.gz') as result:
+                    self.assertEqual(list(result), ['a\tb\n'] * 100)
+
+    def test_shards_keep_subjects_together(self):
+        pattern = os.path.join(self.tmpdir, 'out_{:03d}.nt.gz')
+        writer = ShardWriter(pattern, 3, 'gzip')
+        for i in range(30):
+            writer.write('<s{0}> <p> "a" .\n'.format(i))
+            writer.write('<s{0}> <p> "b" .\n'.format(i))
+            writer.write('<s{0}> <q> <o> .\n'.format(i))
+        writer.close()
+        seen = {}
+        for shard, path in enumerate(writer.paths):
+            with gzip.open(path, 'rt', encoding='utf-8') as result:
+                lines = result.read().splitlines()
+            self.assertEqual(len(lines), writer.counts[shard])
+            for line in lines:
+                self.assertEqual(
+                    seen.setdefault(line.split(' ')[0], shard), shard)
+        self.assertEqual(sum(writer.counts), 90)
+        self.assertEqual(len(seen), 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
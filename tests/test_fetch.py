@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+import unittest
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import (
+    BaseHTTPRequestHandler, HTTPServer, SimpleHTTPRequestHandler)
+from unittest.mock import patch
+from dipper.sources import Source as source_module
+from dipper.sources.Source import Source
+
+
+class GetFilesTestCase(unittest.TestCase):
+    """
+    get_files() downloads concurrently, limited per host, with retries
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = Source('rdf_graph', True, 'udp')
+        self.source.rawdir = self.tmpdir
+        self.source.blob_dir = os.path.join(self.tmpdir, 'blobs')
+        self.files = {}
+        for i in range(6):
+            remote = os.path.join(self.tmpdir, 'remote{}.txt'.format(i))
+            with open(remote, 'w') as fh:
+                fh.write('x' * 100 * (i + 1))
+            self.files[str(i)] = {
+                'file': 'local{}.txt'.format(i), 'url': 'file://' + remote,
+                'clean': 'http://example.org/remote{}.txt'.format(i)}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        self.source = None
+
+    def test_concurrent_fetch(self):
+        active = []
+        most = []
+        lock = threading.Lock()
+        fetch_from_url = Source.fetch_from_url
+
+        def counting_fetch(*args):
+            with lock:
+                active.append(1)
+                most.append(len(active))
+            try:
+                return fetch_from_url(self.source, *args)
+            finally:
+                with lock:
+                    active.pop()
+
+        with patch.object(self.source, 'fetch_from_url', counting_fetch):
+            self.source.get_files(True, self.files)
+        self.assertLessEqual(max(most), Source.fetch_per_host)
+        self.assertEqual(self.source.fetched_files, 6)
+        self.assertEqual(self.source.fetched_bytes, 2100)
+        for i in range(6):
+            self.assertTrue(os.path.exists(
+                os.path.join(self.tmpdir, 'local{}.txt'.format(i))))
+
+    def test_retry(self):
+        fetch_from_url = Source.fetch_from_url
+        failures = [OSError('connection reset')]
+
+        def flaky_fetch(*args):
+            if failures:
+                raise failures.pop()
+            return fetch_from_url(self.source, *args)
+
+        with patch.object(self.source, 'fetch_from_url', flaky_fetch), \
+                patch.object(Source, 'fetch_backoff', 0):
+            self.source.get_files(True, {'0': self.files['0']})
+        self.assertEqual(self.source.fetched_files, 1)
+
+    def test_shared_host_slots(self):
+        slots = [threading.BoundedSemaphore(1) for i in range(4)]
+        with patch.object(Source, 'host_slots', slots):
+            slot = self.source._host_slot('http://example.org/a.txt')
+            self.assertIn(slot, slots)
+            self.assertIs(
+                self.source._host_slot('http://example.org/b.txt'), slot)
+
+
+class FetchMetadataTestCase(unittest.TestCase):
+    """
+    A file fetched before costs one conditional request when unchanged
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = Source('rdf_graph', True, 'udp')
+        self.source.rawdir = self.tmpdir
+        self.source.blob_dir = os.path.join(self.tmpdir, 'blobs')
+        with open(os.path.join(self.tmpdir, 'remote.txt'), 'w') as fh:
+            fh.write('x' * 1000)
+        self.requests = requests = []
+
+        class Handler(SimpleHTTPRequestHandler):
+            def log_message(self, *args):
+                requests.append((self.command, self.headers.get(
+                    'If-Modified-Since') is not None))
+
+        self.server = HTTPServer(
+            ('127.0.0.1', 0), partial(Handler, directory=self.tmpdir))
+        threading.Thread(target=self.server.serve_forever).start()
+        self.url = 'http://127.0.0.1:{}/remote.txt'.format(
+            self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+        self.source = None
+
+    def test_conditional_get(self):
+        localfile = os.path.join(self.tmpdir, 'local.txt')
+        self.assertIsNotNone(self.source.fetch_from_url(self.url, localfile))
+        self.assertEqual(self.requests, [('GET', False)])
+
+        self.source._fetch_metadata = None  # read back from disk
+        self.assertIsNone(self.source.fetch_from_url(self.url, localfile))
+        self.assertEqual(self.requests[1:], [('GET', True)])
+        self.assertEqual(
+            self.source._get_fetch_metadata(self.url)['size'], 1000)
+
+    def test_shared_blob(self):
+        localfile = os.path.join(self.tmpdir, 'local.txt')
+        self.source.fetch_from_url(self.url, localfile)
+
+        other = Source('rdf_graph', True, 'udp')
+        other.rawdir = os.path.join(self.tmpdir, 'other')
+        other.blob_dir = self.source.blob_dir
+        os.makedirs(other.rawdir)
+        other_file = os.path.join(other.rawdir, 'local.txt')
+        self.assertIsNone(other.fetch_from_url(self.url, other_file))
+        self.assertEqual(self.requests[1:], [('GET', True)])
+        self.assertEqual(
+            os.path.realpath(other_file), os.path.realpath(localfile))
+
+    def test_stale_link(self):
+        blobs = {}
+        for content in ['old', 'new']:
+            checksum = hashlib.md5(content.encode()).hexdigest()
+            blobs[content] = self.source._blob_path(checksum)
+            os.makedirs(os.path.dirname(blobs[content]), exist_ok=True)
+            with open(blobs[content], 'w') as fh:
+                fh.write(content)
+        localfile = os.path.join(self.tmpdir, 'local.txt')
+        # left by a run killed between symlink() and replace()
+        os.symlink(blobs['old'], localfile + '.link')
+        self.source._link_blob(
+            os.path.basename(blobs['new']), localfile)
+        with open(localfile) as fh:
+            self.assertEqual(fh.read(), 'new')
+        with open(blobs['old']) as fh:
+            self.assertEqual(fh.read(), 'old')
+
+    def test_build_state(self):
+        self.source.files = {'remote': {'file': 'local.txt', 'url': self.url}}
+        self.source.outdir = self.tmpdir
+        localfile = os.path.join(self.tmpdir, 'local.txt')
+        self.source.fetch_from_url(self.url, localfile)
+        self.assertFalse(self.source.output_current({'limit': None}))
+
+        self.source.outfiles = [localfile]
+        self.source.record_build({'limit': None})
+        self.assertTrue(self.source.output_current({'limit': None}))
+        self.assertFalse(self.source.output_current({'limit': 10}))
+        # any change to the package, not only to the source's module
+        with patch.object(Source, '_package_md5', 'edited'):
+            self.assertFalse(self.source.output_current({'limit': None}))
+
+        remote = os.path.join(self.tmpdir, 'remote.txt')
+        with open(remote, 'w') as fh:
+            fh.write('y' * 1000)
+        os.utime(remote, (time.time() + 10, time.time() + 10))
+        self.source.fetch_from_url(self.url, localfile)
+        self.assertFalse(self.source.output_current({'limit': None}))
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """
+    Serve server.data with an ETag, honouring Range and If-Range
+    """
+    def do_GET(self):
+        data = self.server.data
+        self.server.ranges.append(self.headers.get('Range'))
+        start, end = 0, len(data) - 1
+        partial = self.headers.get('Range') is not None and \
+            self.headers.get('If-Range') == '"v1"'
+        if partial:
+            (first, last) = self.headers['Range'][6:].split('-')
+            start = int(first)
+            end = int(last) if last else end
+            self.send_response(206)
+            self.send_header(
+                'Content-Range', 'bytes {}-{}/{}'.format(start, end, len(data)))
+        else:
+            self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        self.wfile.write(data[start:end + 1])
+
+    def log_message(self, *args):
+        pass
+
+
+class ResumeTestCase(unittest.TestCase):
+    """
+    Interrupted downloads continue from the .part file
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = Source('rdf_graph', True, 'udp')
+        self.source.rawdir = self.tmpdir
+        self.source.blob_dir = os.path.join(self.tmpdir, 'blobs')
+        self.server = HTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.server.data = bytes(range(256)) * 40
+        self.server.ranges = []
+        threading.Thread(target=self.server.serve_forever).start()
+        self.url = 'http://127.0.0.1:{}/big.gz'.format(
+            self.server.server_port)
+        self.localfile = os.path.join(self.tmpdir, 'big.gz')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+        self.source = None
+
+    def test_resume_partial_download(self):
+        with open(self.localfile + '.part', 'wb') as fh:
+            fh.write(self.server.data[:3000])
+        self.source._update_fetch_metadata(
+            self.url, partial={'etag': '"v1"', 'last_modified': None})
+        md5 = hashlib.md5(self.server.data).hexdigest()
+
+        self.source.fetch_from_url(self.url, self.localfile, md5=md5)
+        self.assertEqual(self.server.ranges, ['bytes=3000-'])
+        with open(self.localfile, 'rb') as fh:
+            self.assertEqual(fh.read(), self.server.data)
+        self.assertFalse(os.path.exists(self.localfile + '.part'))
+        meta = self.source._get_fetch_metadata(self.url)
+        self.assertEqual((meta['md5'], meta['partial']), (md5, None))
+
+    def test_parallel_ranges(self):
+        with patch.object(source_module, 'RANGE_CHUNK', 1000), \
+                patch.object(Source, 'range_workers', 3):
+            self.source.fetch_from_url(self.url, self.localfile)
+        self.assertEqual(len(self.server.ranges), 12)
+        with open(self.localfile, 'rb') as fh:
+            self.assertEqual(fh.read(), self.server.data)
+
+    def test_record_replay(self):
+        fixture_dir = os.path.join(self.tmpdir, 'fixtures')
+        with patch.object(Source, 'fetch_mode', 'record'), \
+                patch.object(Source, 'fixture_dir', fixture_dir):
+            self.source.fetch_from_url(self.url, self.localfile)
+        self.server.shutdown()
+
+        replay = Source('rdf_graph', True, 'udp')
+        replay.rawdir = os.path.join(self.tmpdir, 'replay')
+        replay.blob_dir = os.path.join(self.tmpdir, 'replay_blobs')
+        os.makedirs(replay.rawdir)
+        replayed = os.path.join(replay.rawdir, 'big.gz')
+        with patch.object(Source, 'fetch_mode', 'replay'), \
+                patch.object(Source, 'fixture_dir', fixture_dir):
+            replay.fetch_from_url(self.url, replayed)
+            # unchanged on a second run
+            self.assertIsNone(replay.fetch_from_url(self.url, replayed))
+            Source._fixture_server().stop()
+        with open(replayed, 'rb') as fh:
+            self.assertEqual(fh.read(), self.server.data)
+
+    def test_checksum_mismatch(self):
+        with self.assertRaises(Exception):
+            self.source.fetch_from_url(self.url, self.localfile, md5='0' * 32)
+        self.assertFalse(os.path.exists(self.localfile))
+
+
+if __name__ == '__main__':
+    unittest.main()
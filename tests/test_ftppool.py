@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import unittest
+import ftplib
+from unittest.mock import patch
+from dipper.utils import FTPPool as ftppool_module
+from dipper.utils.FTPPool import FTPPool
+
+
+class FakeFTP:
+    """
+    Just enough of ftplib.FTP to count logins
+    """
+    logins = 0
+
+    def __init__(self, host, timeout=None):
+        self.host = host
+        self.dir = '/'
+
+    def login(self, user, passwd):
+        FakeFTP.logins += 1
+
+    def voidcmd(self, cmd):
+        if cmd.startswith('MLST'):
+            if self.host == 'old.example.org':
+                raise ftplib.error_perm('500 Unknown command')
+            return '250-Listing\n type=file;size=42;modify=20180102030405; ' \
+                '/gene_info.gz\n250 End'
+        if cmd.startswith('MDTM'):
+            return '213 20170102030405'
+        return '200 OK'
+
+    def size(self, path):
+        return 7
+
+    def pwd(self):
+        return self.dir
+
+    def cwd(self, path):
+        self.dir = path
+
+    def quit(self):
+        pass
+
+
+class FTPPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        FakeFTP.logins = 0
+        self.patcher = patch.object(ftppool_module.ftplib, 'FTP', FakeFTP)
+        self.patcher.start()
+        self.pool = FTPPool()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_connection_reused(self):
+        for i in range(3):
+            with self.pool.connection('ftp.example.org') as ftp:
+                ftp.cwd('/pub/{}'.format(i))
+        self.assertEqual(FakeFTP.logins, 1)
+        # returned to the pool in its login directory
+        self.assertEqual(ftp.pwd(), '/')
+
+    def test_failed_connection_dropped(self):
+        with self.assertRaises(ftplib.error_temp):
+            with self.pool.connection('ftp.example.org'):
+                raise ftplib.error_temp('421 Timeout')
+        with self.pool.connection('ftp.example.org'):
+            pass
+        self.assertEqual(FakeFTP.logins, 2)
+
+    def test_stat(self):
+        with self.pool.connection('ftp.example.org') as ftp:
+            self.assertEqual(
+                FTPPool.stat(ftp, '/gene_info.gz'),
+                {'size': 42, 'modify': '20180102030405'})
+        with self.pool.connection('old.example.org') as ftp:
+            self.assertEqual(
+                FTPPool.stat(ftp, '/gene_info.gz'),
+                {'size': 7, 'modify': '20170102030405'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+import psycopg2
+from dipper.sources.PostgreSQLSource import PostgreSQLSource
+
+CXN = {
+    'host': 'localhost', 'database': 'db', 'port': 5432,
+    'user': 'user', 'password': 'password'}
+
+
+class FakeCursor:
+    def __init__(self, con):
+        self.con = con
+        self.description = [('key',), ('name',)]
+        self.result = None
+
+    def execute(self, query, args=None):
+        if query == "SELECT pg_export_snapshot()":
+            if self.con.pool.standby:
+                raise psycopg2.OperationalError('cannot export a snapshot')
+            self.result = ('00000003-0000001B-1',)
+        elif query.startswith("SELECT COUNT(*)"):
+            self.result = (2,)
+        self.con.statements.append(query if args is None else (query, args))
+
+    def fetchone(self):
+        return self.result
+
+    def copy_expert(self, query, fh):
+        self.con.statements.append(query)
+        fh.write('key\tname\n1\tone\n')
+        if self.con.pool.failing is not None and \
+                self.con.pool.failing in query:
+            raise psycopg2.OperationalError('server closed the connection')
+        fh.write('2\ttwo\n')
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.statements = []
+
+    def set_session(self, **kwargs):
+        self.statements.append(kwargs)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.statements.append('ROLLBACK')
+
+
+class FakePool:
+    standby = False
+    failing = None
+    pools = []
+
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.maxconn = maxconn
+        self.kwargs = kwargs
+        self.connections = []
+        self.free = []
+        self.closed = False
+        self.lock = threading.Lock()
+        self.pools.append(self)
+
+    def getconn(self):
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+            assert len(self.connections) < self.maxconn
+            con = FakeConnection(self)
+            self.connections.append(con)
+            return con
+
+    def putconn(self, con):
+        with self.lock:
+            self.free.append(con)
+
+    def closeall(self):
+        self.closed = True
+
+
+class PostgreSQLSourceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.source = PostgreSQLSource('rdf_graph', True, 'udp')
+        self.source.rawdir = tempfile.mkdtemp()
+        self.tables = ['mrk_marker', 'all_allele', 'voc_term']
+        FakePool.pools = []
+        FakePool.standby = False
+        FakePool.failing = None
+
+    def tearDown(self):
+        shutil.rmtree(self.source.rawdir)
+
+    def fetch(self, workers):
+        self.source.fetch_workers = workers
+        with patch('psycopg2.pool.ThreadedConnectionPool', FakePool):
+            self.source.fetch_from_pgdb(self.tables, CXN)
+        (pool,) = FakePool.pools
+        self.assertTrue(pool.closed)
+        for tab in self.tables:
+            with open(os.path.join(self.source.rawdir, tab)) as fh:
+                self.assertEqual(len(fh.readlines()), 3)
+        self.assertEqual(self.source.fetched_files, 3)
+        return pool
+
+    def test_copies_in_exported_snapshot(self):
+        pool = self.fetch(3)
+        (exporter, *copiers) = pool.connections
+        self.assertIn("SELECT pg_export_snapshot()", exporter.statements)
+        self.assertTrue(copiers)
+        snapshots = [
+            statement for con in copiers for statement in con.statements
+            if isinstance(statement, tuple)]
+        self.assertEqual(
+            snapshots,
+            [("SET TRANSACTION SNAPSHOT %s", ('00000003-0000001B-1',))] * 3)
+
+    def test_serial_without_snapshot(self):
+        FakePool.standby = True
+        pool = self.fetch(3)
+        self.assertEqual(len(pool.connections), 1)
+
+    def test_reuses_current_files(self):
+        self.fetch(2)
+        self.source.fetched_files = 0
+        FakePool.pools = []
+        with patch('psycopg2.pool.ThreadedConnectionPool', FakePool):
+            self.source.fetch_from_pgdb(self.tables, CXN)
+        copies = [
+            statement for con in FakePool.pools[0].connections
+            for statement in con.statements
+            if isinstance(statement, str) and statement.startswith('COPY')]
+        self.assertEqual(copies, [])
+        self.assertEqual(self.source.fetched_files, 0)
+
+    def test_failed_copy_leaves_no_part(self):
+        FakePool.failing = 'all_allele'
+        self.source.fetch_workers = 3
+        with patch('psycopg2.pool.ThreadedConnectionPool', FakePool):
+            with self.assertRaises(psycopg2.OperationalError):
+                self.source.fetch_from_pgdb(self.tables, CXN)
+        self.assertTrue(FakePool.pools[0].closed)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.source.rawdir, 'all_allele')))
+        self.assertEqual(
+            [name for name in os.listdir(self.source.rawdir)
+             if name.endswith('.part')], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from rdflib import URIRef
+from dipper.graph.RDFGraph import RDFGraph
+from dipper.utils import property_cache
+from dipper.utils.GraphUtils import GraphUtils
+
+ONTOLOGY = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix obo: <http://purl.obolibrary.org/obo/> .
+<http://example.org/test.owl> a owl:Ontology ;
+    owl:versionIRI <http://example.org/test/2018-01-01/test.owl> .
+obo:RO_0002200 a owl:ObjectProperty .
+obo:IAO_0000115 a owl:AnnotationProperty .
+'''
+
+
+class PropertyCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        ontology_file = os.path.join(self.tmpdir, 'test.ttl')
+        with open(ontology_file, 'w') as fh:
+            fh.write(ONTOLOGY)
+        self.ontologies = ['file://' + ontology_file]
+        # written to a directory of its own, made when first needed
+        self.cache_file = os.path.join(
+            self.tmpdir, 'out', 'property_axioms.json')
+        property_cache._properties = None
+
+    def tearDown(self):
+        property_cache._properties = None
+        shutil.rmtree(self.tmpdir)
+
+    def test_build_and_reuse(self):
+        cache = property_cache.build(self.cache_file, self.ontologies)
+        self.assertEqual(
+            cache['ontologies'][self.ontologies[0]]['version'],
+            'http://example.org/test/2018-01-01/test.owl')
+
+        # a fresh cache is read without touching the ontologies
+        with patch.object(property_cache, '_fetch') as fetch:
+            properties = property_cache.get_properties(self.cache_file)
+            self.assertFalse(fetch.called)
+        self.assertEqual(
+            properties['ObjectProperty'],
+            {URIRef('http://purl.obolibrary.org/obo/RO_0002200')})
+
+    def test_stale_cache_used_offline(self):
+        property_cache.build(self.cache_file, self.ontologies)
+        with patch.object(
+                property_cache, '_fetch', side_effect=OSError('offline')):
+            properties = property_cache.get_properties(
+                self.cache_file, max_age=0)
+        self.assertEqual(len(properties['AnnotationProperty']), 1)
+
+    def test_truncated_cache_rebuilt(self):
+        property_cache.build(self.cache_file, self.ontologies)
+        with open(self.cache_file) as fh:
+            content = fh.read()
+        with open(self.cache_file, 'w') as fh:
+            fh.write(content[:len(content) // 2])
+        with patch.object(property_cache, 'ONTOLOGIES', self.ontologies):
+            properties = property_cache.get_properties(self.cache_file)
+        self.assertEqual(len(properties['AnnotationProperty']), 1)
+        self.assertEqual(
+            os.listdir(os.path.dirname(self.cache_file)),
+            ['property_axioms.json'])
+
+    def test_add_property_axioms(self):
+        property_cache.build(self.cache_file, self.ontologies)
+        property_cache.get_properties(self.cache_file)
+        graph = RDFGraph()
+        graph.addTriple('MGI:1', 'RO:0002200', 'HP:0000118')
+        GraphUtils.add_property_axioms(graph)
+        self.assertIn(
+            (URIRef('http://purl.obolibrary.org/obo/RO_0002200'),
+             URIRef('http://www.w3.org/1999/02/22-rdf-syntax-ns#type'),
+             URIRef('http://www.w3.org/2002/07/owl#ObjectProperty')),
+            graph)
+
+
+if __name__ == '__main__':
+    unittest.main()
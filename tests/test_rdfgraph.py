@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import unittest
+import logging
+from dipper.graph.RDFGraph import RDFGraph
+from dipper import curie_map
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+class RDFGraphTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = RDFGraph()
+        self.curie_map = curie_map.get()
+
+    def tearDown(self):
+        self.graph = None
+
+    def test_node_cache(self):
+        """
+        A curie resolved by one graph is a cache hit for the next,
+        which must still bind the prefix in its own namespace manager
+        """
+        self.graph._getNode('MGI:97486')
+        hits = RDFGraph.node_cache.hits
+        other = RDFGraph()
+        node = other._getNode('MGI:97486')
+        self.assertEqual(RDFGraph.node_cache.hits, hits + 1)
+        self.assertEqual(node, self.graph._getNode('MGI:97486'))
+        self.assertIn('MGI', dict(other.namespace_manager.namespaces()))
+
+        return
+
+    def test_curie_longest_prefix(self):
+        """
+        IRIs contract with the longest matching base IRI,
+        ie HP: and RO: rather than OBO:
+        """
+        from dipper.utils.CurieUtil import CurieUtil
+        cutil = CurieUtil(self.curie_map)
+        iris = [cutil.get_uri(c) for c in ['HP:0000118', 'OBO:RO_0002200']]
+        self.assertEqual(
+            cutil.get_curies(iris + ['urn:nothing']),
+            ['HP:0000118', 'RO:0002200', None])
+
+        return
+
+    def test_add_triples(self):
+        """
+        A batch from addTriples() gives the same graph as addTriple() calls
+        """
+        triples = [
+            ('MGI:1', 'rdf:type', 'owl:Class'),
+            ('MGI:1', 'rdfs:label', 'one', True),
+            ('MGI:1', 'owl:deprecated', True, True, 'xsd:boolean'),
+            ('MGI:1', 'rdfs:comment', None, True)]
+        for triple in triples:
+            self.graph.addTriple(*triple)
+        batch = RDFGraph()
+        batch.addTriples(triples)
+        self.assertEqual(set(batch), set(self.graph))
+        self.assertEqual(len(batch), 3)
+
+        return
+
+    def test_write_nt_parallel(self):
+        """
+        ntriples formatted in a process pool match RDFLib's serializer
+        """
+        import io
+        from dipper.utils.GraphUtils import GraphUtils
+        for i in range(100):
+            self.graph.addTriple('MGI:' + str(i), 'rdf:type', 'owl:Class')
+            self.graph.addTriple(
+                'MGI:' + str(i), 'rdfs:label', 'gène "' + str(i) + '"\n', True)
+        stream = io.BytesIO()
+        GraphUtils.write_nt_parallel(self.graph, stream, 2, chunk_size=30)
+        self.assertEqual(
+            stream.getvalue(), self.graph.serialize(format='nt'))
+
+        return
+
+    def test_predicate_counts(self):
+        """
+        The predicates counted as triples are added match a scan of the graph
+        """
+        from dipper.utils.GraphUtils import GraphUtils
+        self.graph.addTriples([
+            ('MGI:1', 'rdf:type', 'owl:Class'),
+            ('MGI:2', 'rdf:type', 'owl:Class'),
+            ('MGI:1', 'rdfs:label', 'one', True)])
+        self.graph.addTriple(
+            'MGI:2', 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type',
+            'owl:Class')
+        self.assertEqual(
+            GraphUtils.get_properties_from_graph(self.graph),
+            set(self.graph.predicates()))
+        counts = self.graph.getPredicateCounts()
+        self.assertEqual(
+            counts['http://www.w3.org/1999/02/22-rdf-syntax-ns#type'], 2)
+        self.assertEqual(len(counts), 2)
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+import os
+import tempfile
+from dipper.sources.Source import Source
+from dipper.utils import tsv
+from dipper.utils.RunMetrics import RunMetrics
+
+
+class Parser(Source):
+    def parse(self, limit=None):
+        self._process_rows(self.raw)
+
+    def _process_rows(self, raw):
+        for row in tsv.rows(raw, ['s', 'o']):
+            self.graph.addTriple(
+                row.s, 'rdfs:label', row.o, object_is_literal=True)
+
+
+class RunMetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = Parser('rdf_graph', True, 'udp')
+        self.source.raw = os.path.join(self.tmpdir, 'raw.tsv')
+        with open(self.source.raw, 'w') as fh:
+            fh.write('#s\to\n' + 'MGI:1\tone\n' * 5)
+
+    def tearDown(self):
+        for name in os.listdir(self.tmpdir):
+            os.remove(os.path.join(self.tmpdir, name))
+        os.rmdir(self.tmpdir)
+
+    def test_report(self):
+        metrics = RunMetrics(self.source, profile_dir=self.tmpdir)
+        metrics.instrument()
+        with metrics.phase('parse') as parse:
+            self.source.parse()
+        # five rows of the same triple
+        self.assertEqual((parse['rows'], parse['triples']), (5, 1))
+        self.assertGreaterEqual(parse['wall'], 0)
+        with metrics.phase('write') as write:
+            pass
+        self.assertNotIn('rows', write)
+
+        path = os.path.join(self.tmpdir, 'metrics.json')
+        metrics.write(path)
+        with open(path) as fh:
+            report = json.load(fh)
+        self.assertEqual(report['methods']['_process_rows']['calls'], 1)
+        self.assertEqual(report['methods']['_process_rows']['triples'], 1)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.tmpdir, 'udp_parse.pstats')))
+
+
+if __name__ == '__main__':
+    unittest.main()
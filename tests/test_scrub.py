@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import unittest
+import gzip
+import os
+import tempfile
+from dipper.utils import pysed
+from dipper.utils import scrub
+from dipper.sources.Source import Source
+
+
+class ScrubTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'raw.txt')
+
+    def tearDown(self):
+        for name in os.listdir(self.tmpdir):
+            os.remove(os.path.join(self.tmpdir, name))
+        os.rmdir(self.tmpdir)
+
+    def test_lines(self):
+        scrubs = [
+            scrub.sub(r'PMID([0-9]+)', r'PMID:\1'),
+            scrub.drop(r'^#'),
+            scrub.strip_cr]
+        self.assertEqual(
+            list(scrub.lines(['# header\n', 'a\tPMID123\r\n'], scrubs)),
+            ['a\tPMID:123\n'])
+
+    def test_rewrite(self):
+        with open(self.path, 'w', newline='') as fh:
+            fh.write('a\r\nb\\\r\n')
+        Source.remove_backslash_r(self.path, 'utf-8')
+        pysed.replace('\\\\', '', self.path)
+        with open(self.path, newline='') as fh:
+            self.assertEqual(fh.read(), 'a\nb\n')
+        self.assertEqual(os.listdir(self.tmpdir), ['raw.txt'])
+
+    def test_rewrite_gzip(self):
+        with gzip.open(self.path, 'wt') as fh:
+            fh.write('keep\ndrop\n')
+        scrub.rewrite(self.path, [scrub.drop('drop')], opener=gzip.open)
+        with gzip.open(self.path, 'rt') as fh:
+            self.assertEqual(fh.read(), 'keep\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import unittest
+import logging
+import io
+from dipper.graph.StreamedGraph import StreamedGraph
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+class StreamedGraphTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.triples = [
+            ('MGI:2', 'rdf:type', 'owl:Class'),
+            ('MGI:1', 'rdf:type', 'owl:Class'),
+            ('MGI:2', 'rdf:type', 'owl:Class'),
+            ('MGI:3', 'rdfs:subClassOf', 'MGI:1'),
+            ('MGI:1', 'rdf:type', 'owl:Class'),
+            ('MGI:3', 'rdf:type', 'owl:Class'),
+            ('MGI:2', 'rdfs:subClassOf', 'MGI:1'),
+        ]
+
+    def tearDown(self):
+        self.triples = None
+
+    def _stream(self, buffer_size):
+        out = io.StringIO()
+        graph = StreamedGraph(
+            file_handle=out, dedup=True, buffer_size=buffer_size)
+        for triple in self.triples:
+            graph.addTriple(*triple)
+        count = graph.finalize()
+        self.assertEqual(sum(graph.predicate_counts.values()), count)
+        return count, out.getvalue().splitlines()
+
+    def test_dedup_in_memory(self):
+        count, lines = self._stream(100)
+        self.assertEqual(count, 5)
+        self.assertEqual(lines, sorted(set(lines)))
+
+    def test_dedup_spilled_runs(self):
+        merge_width = StreamedGraph.merge_width
+        StreamedGraph.merge_width = 2
+        try:
+            count, lines = self._stream(2)
+        finally:
+            StreamedGraph.merge_width = merge_width
+        self.assertEqual(count, 5)
+        self.assertEqual(lines, self._stream(100)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import unittest
+import gzip
+import os
+import tempfile
+from dipper.utils import tsv
+
+DATA = '''#comment
+ZDB-GENE-1\tgene\tabc\tP1
+ZDB-GENE-2\tgene\t"a\tb"\tP2
+
+ZDB-GENE-3\tgene\tdéf
+'''
+
+
+class TSVTestCase(unittest.TestCase):
+
+    def setUp(self):
+        (fd, self.path) = tempfile.mkstemp(suffix='.gz')
+        os.close(fd)
+        with gzip.open(self.path, 'wt', encoding='utf-8') as fh:
+            fh.write(DATA)
+        self.columns = ['gene_id', 'so_id', 'symbol', 'uniprot_id']
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_rows(self):
+        rows = list(tsv.rows(
+            self.path, self.columns, select=['gene_id', 'symbol']))
+        self.assertEqual(
+            [(row.gene_id, row.symbol) for row in rows],
+            [('ZDB-GENE-1', 'abc'), ('ZDB-GENE-2', 'a\tb'),
+             ('ZDB-GENE-3', 'déf')])
+        self.assertEqual(rows[0]._fields, ('gene_id', 'symbol'))
+
+    def test_where_and_limit(self):
+        rows = tsv.rows(
+            self.path, self.columns, select=['uniprot_id'],
+            where={'gene_id': ['ZDB-GENE-2', 'ZDB-GENE-3']})
+        self.assertEqual([row.uniprot_id for row in rows], ['P2', ''])
+        rows = tsv.rows(self.path, self.columns, limit=1)
+        self.assertEqual(len(list(rows)), 1)
+
+    def test_header(self):
+        with open(self.path, 'w') as fh:
+            fh.write('# a header follows\nid\tname\n1\tone\n')
+        rows = list(tsv.rows(self.path, select=['name']))
+        self.assertEqual(rows[0].name, 'one')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from dipper.utils import yaml_cache
+
+
+class YamlCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'terms.yaml')
+        with open(self.path, 'w') as fh:
+            fh.write('gene: SO:0000704\n')
+        self.patcher = patch.object(
+            yaml_cache, 'CACHE_DIR', os.path.join(self.tmpdir, 'cache'))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        yaml_cache._tables.pop(os.path.abspath(self.path), None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_load(self):
+        table = yaml_cache.load(self.path)
+        self.assertEqual(table, {'gene': 'SO:0000704'})
+        self.assertIs(yaml_cache.load(self.path), table)
+
+        with open(self.path, 'w') as fh:
+            fh.write('gene: SO:0000704\nallele: GENO:0000512\n')
+        self.assertEqual(len(yaml_cache.load(self.path)), 2)
+
+    def test_pickle_used_by_next_process(self):
+        yaml_cache.load(self.path)
+        yaml_cache._tables.clear()
+        os.utime(self.path)     # touched, not changed
+        with patch.object(yaml_cache.yaml, 'load') as load:
+            self.assertEqual(
+                yaml_cache.load(self.path), {'gene': 'SO:0000704'})
+            self.assertFalse(load.called)
+
+    def test_lazy_table(self):
+        class Terms:
+            globaltcid = yaml_cache.LazyTable(self.path, yaml_cache.inverse)
+        self.assertEqual(Terms.globaltcid, {'SO:0000704': 'gene'})
+        self.assertIs(Terms().globaltcid, Terms.globaltcid)
+        # loaded once, later uses do not check the file
+        with patch.object(yaml_cache, 'load') as load:
+            self.assertEqual(Terms.globaltcid, {'SO:0000704': 'gene'})
+            self.assertFalse(load.called)
+
+
+if __name__ == '__main__':
+    unittest.main()